@@ -7,6 +7,7 @@ import DailyEarnings from './DailyEarnings';
 import PowerChart from './PowerChart';
 import BatterySOCChart from './BatterySOCChart';
 import StatisticsSection from './StatisticsSection';
+import { subscribe, onConnectionChange } from './liveSocket';
 
 // ============================================================
 // 配置 - 修改这里的 API 地址
@@ -384,35 +385,33 @@ function App() {
   const [socStartDate, setSocStartDate] = useState(getToday());
   const [socEndDate, setSocEndDate] = useState(getToday());
 
-  // 实时数据轮询
+  // 实时数据：WebSocket 推送（/api/ws 的 current 主题，只传输变化的字段）
   useEffect(() => {
-    const fetchData = async () => {
-      try {
-        const response = await fetch(`${API_BASE}/api/current`);
-        if (!response.ok) throw new Error('API 请求失败');
-        const data = await response.json();
-        setCurrentData(data);
-        setRealtimeError(null);
-        
-        setHistoricalData(prev => {
-          const newData = [...prev, {
-            time: new Date().toLocaleTimeString('zh-CN', { hour: '2-digit', minute: '2-digit' }),
-            solar: data.solar,
-            load: data.load,
-            battery: data.battery_net,
-            grid: data.grid_export - data.grid_import
-          }];
-          return newData.slice(-60);
-        });
-      } catch (err) {
-        //setError(`连接失败: ${err.message}`);
-        setRealtimeError(`连接失败: ${err.message}`);
-      }
+    const unsubscribe = subscribe(API_BASE, 'current', (data) => {
+      setCurrentData(data);
+      setRealtimeError(null);
+      
+      setHistoricalData(prev => {
+        const newData = [...prev, {
+          time: new Date().toLocaleTimeString('zh-CN', { hour: '2-digit', minute: '2-digit' }),
+          solar: data.solar,
+          load: data.load,
+          battery: data.battery_net,
+          grid: data.grid_export - data.grid_import
+        }];
+        return newData.slice(-60);
+      });
+    });
+    
+    // 断线后自动重连
+    const stopStatus = onConnectionChange(API_BASE, (connected) => {
+      setRealtimeError(connected ? null : '连接失败: 实时数据连接中断，正在重连');
+    });
+    
+    return () => {
+      stopStatus();
+      unsubscribe();
     };
-
-    fetchData();
-    const interval = setInterval(fetchData, 5000);
-    return () => clearInterval(interval);
   }, []);
 
   // 获取每日统计数据
@@ -1,13 +1,12 @@
 import React, { useState, useEffect, useRef, useCallback } from 'react';
+import { subscribe, onConnectionChange } from './liveSocket';
 
 /**
  * DailyEarnings Component
  * 
  * 显示今日ZeroHero VPP预估收益，带财神爷动画效果
  * 
- * 智能刷新策略：
- * - 活跃时段（6am-8pm）：每60秒刷新
- * - 非活跃时段：每小时刷新
+ * 数据更新：订阅 /api/ws 的 earnings 主题（收益变化时由服务器推送变化的字段）
  * 
  * 动画：只在活跃时段（6am-8pm）播放财神爷跳动和金币下落
  * 
@@ -21,74 +20,34 @@ const DailyEarnings = ({ apiBase }) => {
   const [isActive, setIsActive] = useState(false);  // 是否播放动画（收益>0.03时）
   const containerRef = useRef(null);
   const prevEarningsRef = useRef(0);
-  const intervalRef = useRef(null);
-
-  // 判断是否在活跃时段（用于刷新频率）
-  const checkActiveHours = useCallback(() => {
-    const hour = new Date().getHours();
-    return hour >= 6 && hour < 20;
-  }, []);
 
   // 判断是否播放动画（收益 > $0.03）
   const shouldAnimate = useCallback((earningsData) => {
     return earningsData?.total_earnings > 0.03;
   }, []);
 
-  // 获取当前应该使用的刷新间隔
-  const getRefreshInterval = useCallback(() => {
-    if (checkActiveHours()) {
-      return 60 * 1000;  // 活跃时段：1分钟
-    }
-    return 60 * 60 * 1000;  // 非活跃时段：1小时
-  }, [checkActiveHours]);
-
-  // 获取收益数据
-  const fetchEarnings = useCallback(async () => {
-    try {
-      const response = await fetch(`${apiBase}/api/earnings/today`);
-      if (!response.ok) throw new Error('获取收益数据失败');
-      const data = await response.json();
-      
-      prevEarningsRef.current = data.total_earnings;
-      
-      setEarnings(data);
-      setIsActive(data.total_earnings > 0.03);  // 收益>$0.03时播放动画
-      setError(null);
-    } catch (err) {
-      setError(err.message);
-    } finally {
-      setLoading(false);
-    }
-  }, [apiBase]);
-
-  // 设置智能刷新定时器
-  const setupInterval = useCallback(() => {
-    if (intervalRef.current) {
-      clearInterval(intervalRef.current);
-    }
+  // 更新收益数据
+  const applyEarnings = useCallback((data) => {
+    prevEarningsRef.current = data.total_earnings;
     
-    const interval = getRefreshInterval();
-    intervalRef.current = setInterval(() => {
-      fetchEarnings();
-      setupInterval();
-    }, interval);
-  }, [fetchEarnings, getRefreshInterval]);
+    setEarnings(data);
+    setIsActive(data.total_earnings > 0.03);  // 收益>$0.03时播放动画
+    setError(null);
+    setLoading(false);
+  }, []);
 
-  // 初始加载和定时刷新
+  // 订阅收益推送（订阅时服务器先发送当前收益）
   useEffect(() => {
-    fetchEarnings();
-    setupInterval();
-    
-    // 每小时检查一次是否需要切换刷新频率
-    const hourlyCheck = setInterval(() => {
-      setupInterval();
-    }, 60 * 60 * 1000);
+    const unsubscribe = subscribe(apiBase, 'earnings', applyEarnings);
+    const stopStatus = onConnectionChange(apiBase, (connected) => {
+      if (!connected) setError('收益数据连接中断，正在重连');
+    });
     
     return () => {
-      if (intervalRef.current) clearInterval(intervalRef.current);
-      clearInterval(hourlyCheck);
+      stopStatus();
+      unsubscribe();
     };
-  }, [fetchEarnings, setupInterval]);
+  }, [apiBase, applyEarnings]);
 
   // 格式化金额显示
   const formatCurrency = (value) => {
@@ -1,5 +1,6 @@
 import React, { useState, useEffect, useMemo, useCallback, useRef } from 'react';
 import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer, ReferenceLine } from 'recharts';
+import { subscribe } from './liveSocket';
 
 // ============================================================
 // 模块容器组件
@@ -125,25 +126,23 @@ const PowerChart = ({ apiBase }) => {
     }
   }, [apiBase]);
 
-  // 初始加载 + 每5分钟刷新
+  // 初始加载历史，之后追加 WebSocket 推送的实时数据（current 主题）
   useEffect(() => {
     fetchData();
     
-    // 计算到下一个采样间隔整点的时间
-    const now = new Date();
-    const minutes = now.getMinutes();
-    const seconds = now.getSeconds();
-    const msToNextInterval = ((sampleInterval - (minutes % sampleInterval)) * 60 - seconds) * 1000;
-    
-    // 先等到下一个整点，然后按采样间隔刷新
-    const timeout = setTimeout(() => {
-      fetchData();
-      const interval = setInterval(fetchData, sampleInterval * 60 * 1000);
-      return () => clearInterval(interval);
-    }, msToNextInterval);
+    const unsubscribe = subscribe(apiBase, 'current', (data) => {
+      if (!data.timestamp || !data.connected) return;
+      const cutoffTime = Date.now() - 24 * 60 * 60 * 1000;
+      setRawData(prev => {
+        if (prev.length > 0 && prev[prev.length - 1].timestamp >= data.timestamp) return prev;
+        const start = prev.findIndex(d => new Date(d.timestamp).getTime() >= cutoffTime);
+        return [...(start === -1 ? [] : prev.slice(start)), data];
+      });
+      setLastUpdate(new Date());
+    });
     
-    return () => clearTimeout(timeout);
-  }, [fetchData, sampleInterval]);
+    return unsubscribe;
+  }, [apiBase, fetchData]);
 
   // 按选定间隔采样处理
   const sampledData = useMemo(() => {
@@ -0,0 +1,149 @@
+/**
+ * liveSocket - /api/ws 实时数据客户端（整个页面共用一个 WebSocket）
+ *
+ * 按主题订阅：current、soc、earnings、fleet、device:<id>
+ * 服务器先发送完整快照，之后只发送变化的字段（相对于已确认的版本），
+ * 协议见 src/ws_hub.py。
+ *
+ * 用法：
+ *   const unsubscribe = subscribe(apiBase, 'current', (data) => ...);
+ *   unsubscribe();
+ *
+ * 断线后自动重连（指数退避），并重新订阅所有主题。
+ */
+
+const KEEP_VERSIONS = 8;   // 每个主题保留的快照数（作为差量基准）
+
+const sockets = new Map();   // apiBase -> LiveSocket
+
+class LiveSocket {
+  constructor(apiBase) {
+    this.url = apiBase.replace(/^http/, 'ws') + '/api/ws';
+    this.listeners = new Map();   // topic -> Set(callback)
+    this.snapshots = new Map();   // topic -> Map(version -> state)
+    this.statusListeners = new Set();   // callback(connected)
+    this.ws = null;
+    this.retryDelay = 1000;
+    this.retryTimer = null;
+  }
+
+  connect() {
+    this.retryTimer = null;
+    this.ws = new WebSocket(this.url);
+
+    this.ws.onopen = () => {
+      this.retryDelay = 1000;
+      this.snapshots.clear();
+      if (this.listeners.size > 0) {
+        this.send({ subscribe: [...this.listeners.keys()] });
+      }
+      this.statusListeners.forEach((callback) => callback(true));
+    };
+
+    this.ws.onmessage = (event) => this.handleMessage(JSON.parse(event.data));
+
+    this.ws.onclose = () => {
+      this.ws = null;
+      this.statusListeners.forEach((callback) => callback(false));
+      this.retryTimer = setTimeout(() => this.connect(), this.retryDelay);
+      this.retryDelay = Math.min(this.retryDelay * 2, 30000);
+    };
+  }
+
+  disconnect() {
+    clearTimeout(this.retryTimer);
+    this.retryTimer = null;
+    if (this.ws) {
+      this.ws.onclose = null;
+      this.ws.close();
+      this.ws = null;
+    }
+  }
+
+  send(message) {
+    if (this.ws && this.ws.readyState === WebSocket.OPEN) {
+      this.ws.send(JSON.stringify(message));
+    }
+  }
+
+  handleMessage(message) {
+    if (message.error) {
+      console.error('Live socket:', message.error);
+      return;
+    }
+
+    const { t: topic, v: version } = message;
+    if (!this.listeners.has(topic)) return;   // 已取消订阅
+    const versions = this.snapshots.get(topic) || new Map();
+    let state;
+    if (message.s) {
+      state = message.s;
+    } else {
+      const base = versions.get(message.b);
+      if (!base) {
+        // 缺少差量基准：重新订阅以获取完整快照
+        this.send({ subscribe: [topic] });
+        return;
+      }
+      state = { ...base, ...message.d };
+      (message.r || []).forEach((key) => delete state[key]);
+    }
+
+    versions.set(version, state);
+    for (const v of versions.keys()) {
+      if (versions.size <= KEEP_VERSIONS) break;
+      versions.delete(v);
+    }
+    this.snapshots.set(topic, versions);
+    this.send({ ack: { [topic]: version } });
+
+    (this.listeners.get(topic) || []).forEach((callback) => callback(state));
+  }
+
+  subscribe(topic, callback) {
+    if (!this.listeners.has(topic)) {
+      this.listeners.set(topic, new Set());
+      this.send({ subscribe: [topic] });
+    }
+    this.listeners.get(topic).add(callback);
+
+    // 已有数据时立即回调
+    const versions = this.snapshots.get(topic);
+    if (versions && versions.size > 0) {
+      callback([...versions.values()].pop());
+    }
+    if (!this.ws && !this.retryTimer) this.connect();
+
+    return () => {
+      const callbacks = this.listeners.get(topic);
+      if (!callbacks) return;
+      callbacks.delete(callback);
+      if (callbacks.size === 0) {
+        this.listeners.delete(topic);
+        this.snapshots.delete(topic);
+        this.send({ unsubscribe: [topic] });
+      }
+      if (this.listeners.size === 0) {
+        this.disconnect();
+      }
+    };
+  }
+}
+
+const getSocket = (apiBase) => {
+  if (!sockets.has(apiBase)) {
+    sockets.set(apiBase, new LiveSocket(apiBase));
+  }
+  return sockets.get(apiBase);
+};
+
+export const subscribe = (apiBase, topic, callback) => getSocket(apiBase).subscribe(topic, callback);
+
+/**
+ * 连接状态变化回调（true = 已连接，false = 断开、正在重连）
+ */
+export const onConnectionChange = (apiBase, callback) => {
+  const socket = getSocket(apiBase);
+  socket.statusListeners.add(callback);
+  return () => socket.statusListeners.delete(callback);
+};
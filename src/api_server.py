@@ -13,20 +13,41 @@ Features:
 
 import os
 import json
+import zlib
 import time
-import csv
-import glob
-from datetime import datetime, timedelta
-from threading import Thread, Lock
-from collections import defaultdict
-from flask import Flask, jsonify, request
+import atexit
+from datetime import date, datetime, timedelta
+from threading import Thread, Lock, Event, local
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
-from pymodbus.client import ModbusTcpClient
-from pymodbus.exceptions import ModbusIOException, ConnectionException
+from flask_sock import Sock
+
+# pymodbus and shared_memory are imported on first use: HTTP
+# workers never poll, and the first response should not wait for them
+# (budget: python src/check_startup.py). Import still reads config.json
+# and creates log_dir; the SQLite database and the daily rollup table
+# are opened on first use.
+from register_map import SPH_REGISTERS, POLL_REGISTERS
+from history_buffer import HistoryBuffer, to_records
+from daily_rollup import DailyRollupStore, DayAccumulator, integrate_hourly
+from storage import open_storage
+from journal import Journal
+from poll_schedule import PollScheduler, zerohero_windows
+import energy
+import downsample
+from earnings import EarningsTracker
+from rollup_tiers import RollupTiers, TIERS, select_tier, to_dicts as tier_rows
+import tariff
+from live_stream import Broadcaster
+from ws_hub import Hub, serve as serve_ws
+from state_service import StateServer, StateClient, RemoteObject, socket_path
 
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend access
+sock = Sock(app)  # WebSocket routes (/api/ws)
+app.config["SOCK_SERVER_OPTIONS"] = {"ping_interval": 25}
+STARTED_AT = time.monotonic()
 
 # ---------------------------------------------------------------------
 # Configuration
@@ -39,8 +60,10 @@ DEFAULT_CONFIG = {
         "unit_id": 1
     },
     "polling_interval": 5,
+    "poll_engine": "thread",  # "thread" (blocking pymodbus client) or "asyncio"
     "history_size": 1000,
     "log_dir": "./logs",  # Directory for monthly CSV files
+    "archive_format": "csv",  # "csv", "binary" (memory-mapped records) or "sqlite"
     "log_file": "growatt_log.csv"  # Legacy single file (optional fallback)
 }
 
@@ -54,6 +77,32 @@ if os.path.exists(CONFIG_FILE):
 log_dir = config.get("log_dir", "./logs")
 os.makedirs(log_dir, exist_ok=True)
 
+# Archive backend (monthly CSV / binary files or SQLite, see storage.py)
+storage = open_storage(config, log_dir)
+atexit.register(storage.close)
+
+# Process role (see state_service.py):
+# - "standalone": python api_server.py, polling and HTTP in one process
+# - "poller":     poller_service.py, polling only, serves its state on STATE_SOCKET
+# - "worker":     wsgi.py under gunicorn, HTTP only, state from the poller
+ROLE = os.getenv("GROWATT_ROLE", "standalone")
+STATE_SOCKET = socket_path(config)
+state_client = StateClient(STATE_SOCKET) if ROLE == "worker" else None
+state_server = None
+
+# current_data in shared memory (see shm_snapshot.py): written by the
+# poller once per cycle, read lock-free by the workers (one reader per thread)
+SNAPSHOT_SHM = config.get("snapshot_shm") or f"growatt_{zlib.crc32(os.path.abspath(STATE_SOCKET).encode()):08x}"
+snapshot_writer = None
+snapshot_readers = local()
+
+# Write-ahead journal (see journal.py): each archived sample is fsynced to
+# logs/journal.wal before the archive buffers it, and replayed on startup
+journal = None
+if config.get("journal") and ROLE != "worker":
+    journal = Journal(os.path.join(log_dir, "journal.wal"), storage, fsync=config.get("journal_fsync", True))
+    atexit.register(journal.close)
+
 # Global state
 current_data = {
     "timestamp": None,
@@ -66,14 +115,33 @@ current_data = {
     "battery_net": 0,
     "soc_inv": 0,
     "soc_bms": 0,
+    "battery_temp": None,
+    "bms_cycle_count": None,
     "connected": False
 }
 
-historical_data = []
+# In-memory history: preallocated columnar ring buffer (see history_buffer.py)
+if ROLE == "worker":
+    history = RemoteObject(state_client, "history")
+else:
+    history = HistoryBuffer(config.get("history_size", 1000))
 data_lock = Lock()
 
+# Fleet state: latest snapshot per device id, plus the aggregated site view.
+# current_data / history / CSV logs follow the primary (first) device.
+device_data = {}
+fleet_data = {
+    "timestamp": None,
+    "devices": 0,
+    "connected": 0,
+}
+FLEET_SUM_FIELDS = ["solar", "load", "grid_export", "grid_import",
+                    "battery_charge", "battery_discharge", "battery_net"]
+
 RETRY_TIMEOUT_SEC = 10
 RETRY_DELAY_SEC = 0.5
+MAX_BACKOFF_SEC = 60  # cap for per-device backoff after failed poll cycles
+ASYNC_REQUEST_TIMEOUT_SEC = 2  # per-request deadline for the asyncio engine
 
 
 # ---------------------------------------------------------------------
@@ -98,67 +166,130 @@ ZEROHERO_CONFIG = {
     },
 }
 
+# Plans for the tariff engine (tariff.py): ZeroHero plus config "tariffs"
+ZEROHERO_PLAN = tariff.zerohero_plan(ZEROHERO_CONFIG)
+TARIFF_PLANS = tariff.load_plans(config.get("tariffs"), {"zerohero": ZEROHERO_PLAN})
+
 
 # ---------------------------------------------------------------------
-# CSV File Management (Monthly Archives)
+# In-memory fallback (when no archive covers a date range)
 # ---------------------------------------------------------------------
-def get_monthly_log_file(dt=None):
-    """Get the CSV file path for a given month (YYYY-MM format)"""
-    if dt is None:
-        dt = datetime.now()
-    month_str = dt.strftime('%Y-%m')
-    return os.path.join(log_dir, f"growatt_log_{month_str}.csv")
-
-
-def get_log_files_for_date_range(start_date, end_date):
-    """Get all CSV files that may contain data for the given date range"""
-    files = []
-    
-    # Generate all months in range
-    current = start_date.replace(day=1)
-    end_month = end_date.replace(day=1)
-    
-    while current <= end_month:
-        filepath = get_monthly_log_file(current)
-        if os.path.exists(filepath):
-            files.append(filepath)
-        # Move to next month
-        if current.month == 12:
-            current = current.replace(year=current.year + 1, month=1)
-        else:
-            current = current.replace(month=current.month + 1)
+def get_memory_data(start_date, end_date):
+    """In-memory history records for start_date..end_date (inclusive)"""
+    start_ts = datetime.combine(start_date, datetime.min.time()).timestamp()
+    end_ts = datetime.combine(end_date + timedelta(days=1), datetime.min.time()).timestamp()
+    window = history.window(start_ts, end_ts)
+    # window() is inclusive; drop a sample exactly at next midnight
+    keep = window["timestamp"] < end_ts
+    return to_records(window, keep if not keep.all() else None)
+
+
+def get_memory_columns(start_date, end_date):
+    """In-memory history as (epoch seconds, {field: kW array}) for energy.py"""
+    start_ts, end_ts = energy.day_edges(start_date, end_date)[[0, -1]]
+    return energy.columns_from_window(history.window(start_ts, end_ts))
+
+
+# ---------------------------------------------------------------------
+# History downsampling (?downsample=stride|lttb|minmax, see downsample.py)
+# ---------------------------------------------------------------------
+DOWNSAMPLE_FIELDS = ["solar", "load", "grid_export", "grid_import",
+                     "battery_charge", "battery_discharge", "soc_bms"]
+
+
+def downsample_records(records, limit, mode):
+    """Exactly limit of the records (all of them if there are fewer)"""
+    if not limit or len(records) <= limit:
+        return records
+    wall, columns = energy.arrays_from_records(records, DOWNSAMPLE_FIELDS)
+    picks = downsample.indices(wall.astype("int64"), list(columns.values()), limit, mode)
+    return [records[i] for i in picks.tolist()]
+
+
+def downsample_tier(records, limit, mode):
+    """Exactly limit rollup tier buckets, preserving the bucket means"""
+    if not limit or len(records) <= limit:
+        return records
+    columns = [records[f"{field}_mean"] for field in DOWNSAMPLE_FIELDS]
+    return records[downsample.indices(records["ts"].astype("int64"), columns, limit, mode)]
+
+
+# ---------------------------------------------------------------------
+# Device list (fleet polling)
+# ---------------------------------------------------------------------
+def get_devices():
+    """
+    Normalized list of inverters to poll.
     
-    # Also check legacy single file
-    legacy_file = config.get("log_file")
-    if legacy_file and os.path.exists(legacy_file) and legacy_file not in files:
-        files.append(legacy_file)
+    Uses config["modbus"]["devices"] when present, e.g.
+        "devices": [{"id": "garage", "ip": "192.168.1.50"},
+                    {"id": "shed", "ip": "192.168.1.51", "unit_id": 2}]
+    otherwise the single legacy modbus ip/port/unit_id entry.
+    Missing port/unit_id fall back to the top-level modbus values.
+    """
+    modbus_cfg = config["modbus"]
+    devices = modbus_cfg.get("devices")
     
-    return files
+    if not devices:
+        return [{
+            "id": str(modbus_cfg.get("id", "inverter")),
+            "ip": modbus_cfg["ip"],
+            "port": modbus_cfg.get("port", 502),
+            "unit_id": modbus_cfg.get("unit_id", 1),
+        }]
+    
+    result = []
+    for i, dev in enumerate(devices):
+        result.append({
+            "id": str(dev.get("id", f"inverter{i + 1}")),
+            "ip": dev["ip"],
+            "port": dev.get("port", modbus_cfg.get("port", 502)),
+            "unit_id": dev.get("unit_id", modbus_cfg.get("unit_id", 1)),
+        })
+    return result
+
+
+def get_primary_device_id():
+    """Device whose samples feed current_data, history and the CSV archive"""
+    return get_devices()[0]["id"]
 
 
-def get_all_log_files():
-    """Get all available log files for archive listing"""
-    pattern = os.path.join(log_dir, "growatt_log_*.csv")
-    files = glob.glob(pattern)
+def read_current():
+    """
+    Copy of current_data. Workers read the poller's shared-memory snapshot
+    (no lock, no socket), falling back to the mirrored live events until
+    the poller has written one.
+    """
+    if ROLE == "worker":
+        reader = getattr(snapshot_readers, "reader", None)
+        if reader is None:
+            from shm_snapshot import SnapshotReader
+            reader = snapshot_readers.reader = SnapshotReader(SNAPSHOT_SHM)
+        data = reader.read()
+        if data is not None:
+            return data
     
-    # Extract month info
-    result = []
-    for f in sorted(files):
-        basename = os.path.basename(f)
-        try:
-            # Parse growatt_log_YYYY-MM.csv
-            month_str = basename.replace("growatt_log_", "").replace(".csv", "")
-            size = os.path.getsize(f)
-            result.append({
-                "filename": basename,
-                "path": f,
-                "month": month_str,
-                "size_mb": round(size / (1024 * 1024), 2)
-            })
-        except:
-            continue
+    with data_lock:
+        return dict(current_data)
+
+
+def update_fleet_totals():
+    """Recompute the aggregated fleet view (call with data_lock held)"""
+    snapshots = list(device_data.values())
+    online = [d for d in snapshots if d.get("connected")]
     
-    return result
+    totals = {field: round(sum(d.get(field, 0) for d in online), 3) for field in FLEET_SUM_FIELDS}
+    socs = [d["soc_bms"] for d in online if d.get("soc_bms")]
+    timestamps = [d["timestamp"] for d in snapshots if d.get("timestamp")]
+    
+    fleet_data.clear()
+    fleet_data.update(totals)
+    fleet_data.update({
+        "timestamp": max(timestamps) if timestamps else None,
+        "soc_bms_avg": round(sum(socs) / len(socs), 1) if socs else 0,
+        "devices": len(snapshots),
+        "connected": len(online),
+    })
 
 
 # ---------------------------------------------------------------------
@@ -166,6 +297,8 @@ def get_all_log_files():
 # ---------------------------------------------------------------------
 def robust_read_input_registers(client, addr, count, unit_id):
     """Read input registers with retry mechanism"""
+    from pymodbus.exceptions import ModbusIOException, ConnectionException
+    
     start = time.time()
     while True:
         if not client.connected:
@@ -187,184 +320,285 @@ def robust_read_input_registers(client, addr, count, unit_id):
         time.sleep(RETRY_DELAY_SEC)
 
 
-def read_u16(client, addr, unit_id):
-    regs = robust_read_input_registers(client, addr, 1, unit_id)
-    return None if regs is None else regs[0]
-
-
-def read_u32(client, addr, unit_id):
-    regs = robust_read_input_registers(client, addr, 2, unit_id)
-    if regs is None:
-        return None
-    hi, lo = regs
-    return (hi << 16) | lo
+# ---------------------------------------------------------------------
+# Sample processing (shared by the thread and asyncio engines)
+# ---------------------------------------------------------------------
+def record_sample(values, device_id=None):
+    """
+    Convert one register snapshot into device/fleet state, and for the
+    primary device also into current_data, history and CSV.
+    
+    values: dict from RegisterPlan.read() (scaled to W / % / °C)
+    """
+    if device_id is None:
+        device_id = get_primary_device_id()
+    is_primary = (device_id == get_primary_device_id())
+    
+    pv_w = values["pv_power"]
+    grid_w = values["grid_power"]
+    load_w = values["load_power"]
+    soc_inv = values["soc_inv"]
+    soc_bms = values["soc_bms"]
+    
+    # Convert W to kW
+    pv = (pv_w / 1000.0) if pv_w is not None else 0
+    grid = (grid_w / 1000.0) if grid_w is not None else 0
+    load_val = (load_w / 1000.0) if load_w is not None else 0
+    
+    # Calculate battery power using energy balance
+    if pv is not None and load_val is not None and grid is not None:
+        battery_net = pv - load_val - grid
+        battery_charge = max(battery_net, 0)
+        battery_discharge = max(-battery_net, 0)
+        grid_export = max(grid, 0)
+        grid_import = max(-grid, 0)
+    else:
+        battery_net = battery_charge = battery_discharge = 0
+        grid_export = max(grid, 0) if grid else 0
+        grid_import = max(-grid, 0) if grid else 0
+    
+    now = datetime.now()
+    timestamp = now.isoformat()
+    
+    snapshot = {
+        "timestamp": timestamp,
+        "solar": round(pv, 3),
+        "battery_discharge": round(battery_discharge, 3),
+        "grid_import": round(grid_import, 3),
+        "battery_charge": round(battery_charge, 3),
+        "load": round(load_val, 3),
+        "grid_export": round(grid_export, 3),
+        "battery_net": round(battery_net, 3),
+        "soc_inv": soc_inv if soc_inv else 0,
+        "soc_bms": soc_bms if soc_bms else 0,
+        "battery_temp": round(values["battery_temp"], 1) if values["battery_temp"] is not None else None,
+        "bms_cycle_count": values["bms_cycle_count"],
+        "connected": True
+    }
+    
+    # Update global state
+    with data_lock:
+        device_data[device_id] = dict(snapshot, device=device_id)
+        update_fleet_totals()
+        
+        if is_primary:
+            current_data.update(snapshot)
+    
+    # Add to history ring buffer (oldest sample is overwritten when full)
+    if is_primary:
+        history.append(now.timestamp(), snapshot)
+    
+    # Log primary device to the monthly archive, then roll it into today's
+    # energy totals and earnings
+    if is_primary:
+        (journal or storage).append(snapshot)
+        daily_rollups.add_sample(now.timestamp(), snapshot)
+        earnings_tracker.add_sample(now, snapshot)
+        rollup_tiers.add_sample(now, snapshot)
+    
+    # Push to /api/stream and /api/ws clients
+    publish_live(device_id)
+    if is_primary:
+        publish_earnings()
+    
+    print(f"📊 [{timestamp}] [{device_id}] PV={pv:.2f}kW Load={load_val:.2f}kW Grid={grid:.2f}kW Batt={battery_net:.2f}kW SOC={soc_bms}%")
 
 
-def read_s32(client, addr, unit_id):
-    val = read_u32(client, addr, unit_id)
-    if val is None:
-        return None
-    if val & 0x80000000:
-        val -= 0x100000000
-    return val
+def mark_disconnected(error, device_id=None):
+    """Flag an inverter as offline after a failed poll cycle"""
+    if device_id is None:
+        device_id = get_primary_device_id()
+    
+    print(f"❌ Error polling inverter [{device_id}]: {error}")
+    with data_lock:
+        device_data.setdefault(device_id, {"device": device_id, "timestamp": None})
+        device_data[device_id]["connected"] = False
+        update_fleet_totals()
+        if device_id == get_primary_device_id():
+            current_data["connected"] = False
+    publish_live(device_id)
 
 
 # ---------------------------------------------------------------------
 # Data polling thread
 # ---------------------------------------------------------------------
-def poll_inverter():
-    """Background thread to continuously poll inverter data"""
-    global current_data, historical_data
+def make_poll_scheduler(device_id):
+    """
+    Adaptive interval for one device (poll_schedule = "adaptive", see
+    poll_schedule.py): returns next_interval(values), or None for the
+    fixed polling_interval
+    """
+    if config.get("poll_schedule", "fixed") != "adaptive":
+        return None
+    
+    scheduler = PollScheduler(config["polling_interval"], config.get("adaptive_polling"),
+                              zerohero_windows(ZEROHERO_CONFIG))
+    last = (scheduler.interval, scheduler.reason)
+    
+    def next_interval(values):
+        nonlocal last
+        interval = scheduler.next_interval(values)
+        if (scheduler.interval, scheduler.reason) != last:
+            last = (scheduler.interval, scheduler.reason)
+            print(f"⏱ [{device_id}] Polling every {scheduler.interval}s ({scheduler.reason})")
+        return interval
     
-    ip = config["modbus"]["ip"]
-    port = config["modbus"]["port"]
-    unit_id = config["modbus"]["unit_id"]
+    return next_interval
+
+
+def poll_inverter(device=None):
+    """Background thread to continuously poll one inverter"""
+    if device is None:
+        device = get_devices()[0]
+    
+    device_id = device["id"]
+    ip = device["ip"]
+    port = device["port"]
+    unit_id = device["unit_id"]
     interval = config["polling_interval"]
     
+    from pymodbus.client import ModbusTcpClient
+    from pymodbus.exceptions import ConnectionException
+    
     client = ModbusTcpClient(ip, port=port)
+    plan = SPH_REGISTERS.plan(POLL_REGISTERS)
+    next_interval = make_poll_scheduler(device_id)
+    failures = 0
     
-    print(f"🔌 Starting Growatt polling: {ip}:{port}, interval={interval}s")
+    def read_block(addr, count):
+        return robust_read_input_registers(client, addr, count, unit_id)
+    
+    print(f"🔌 Starting Growatt polling [{device_id}]: {ip}:{port}, interval={interval}s")
+    print(f"📋 Register plan: {plan.describe()}")
     
     while True:
         try:
-            # Read all registers
-            pv_raw = read_u32(client, 1, unit_id)
-            grid_raw = read_s32(client, 1029, unit_id)
-            load_raw = read_s32(client, 1037, unit_id)
-            soc_inv = read_u16(client, 1014, unit_id)
-            soc_bms = read_u16(client, 1086, unit_id)
-            
-            # Convert to watts/kW
-            pv = (pv_raw / 10.0 / 1000.0) if pv_raw is not None else 0
-            grid = (grid_raw / 10.0 / 1000.0) if grid_raw is not None else 0
-            load_val = (load_raw / 10.0 / 1000.0) if load_raw is not None else 0
-            
-            # Calculate battery power using energy balance
-            if pv is not None and load_val is not None and grid is not None:
-                battery_net = pv - load_val - grid
-                battery_charge = max(battery_net, 0)
-                battery_discharge = max(-battery_net, 0)
-                grid_export = max(grid, 0)
-                grid_import = max(-grid, 0)
-            else:
-                battery_net = battery_charge = battery_discharge = 0
-                grid_export = max(grid, 0) if grid else 0
-                grid_import = max(-grid, 0) if grid else 0
-            
-            timestamp = datetime.now().isoformat()
-            
-            # Update global state
-            with data_lock:
-                current_data.update({
-                    "timestamp": timestamp,
-                    "solar": round(pv, 3),
-                    "battery_discharge": round(battery_discharge, 3),
-                    "grid_import": round(grid_import, 3),
-                    "battery_charge": round(battery_charge, 3),
-                    "load": round(load_val, 3),
-                    "grid_export": round(grid_export, 3),
-                    "battery_net": round(battery_net, 3),
-                    "soc_inv": soc_inv if soc_inv else 0,
-                    "soc_bms": soc_bms if soc_bms else 0,
-                    "connected": True
-                })
-                
-                # Add to historical data
-                historical_data.append(current_data.copy())
-                
-                # Keep only recent history
-                max_history = config.get("history_size", 1000)
-                if len(historical_data) > max_history:
-                    historical_data.pop(0)
-            
-            # Log to monthly CSV file
-            log_to_csv(current_data)
-            
-            print(f"📊 [{timestamp}] PV={pv:.2f}kW Load={load_val:.2f}kW Grid={grid:.2f}kW Batt={battery_net:.2f}kW SOC={soc_bms}%")
-            
+            # Read all registers (coalesced block reads, one snapshot)
+            # (values are already scaled to W / % / °C by the register map)
+            values = plan.read(read_block)
+            if all(v is None for v in values.values()):
+                raise ConnectionException(f"no response from {ip}:{port}")
+            record_sample(values, device_id)
+            failures = 0
+            if next_interval is not None:
+                interval = next_interval(values)
         except Exception as e:
-            print(f"❌ Error polling inverter: {e}")
-            with data_lock:
-                current_data["connected"] = False
+            failures += 1
+            mark_disconnected(e, device_id)
         
-        time.sleep(interval)
+        # Back off exponentially while the device keeps failing
+        time.sleep(min(interval * 2 ** failures, max(interval, MAX_BACKOFF_SEC)))
+
+
+def start_polling_threads():
+    """Start one polling thread per configured device (thread engine)"""
+    threads = []
+    for device in get_devices():
+        t = Thread(target=poll_inverter, args=(device,), daemon=True)
+        t.start()
+        threads.append(t)
+    return threads
+
+
+def poll_inverter_async():
+    """Background thread running the asyncio polling engine (poll_engine = "asyncio")"""
+    from async_poller import AsyncInverterPoller, run_fleet_forever
+    
+    modbus_cfg = config["modbus"]
+    plan = SPH_REGISTERS.plan(POLL_REGISTERS)
+    pollers = []
+    
+    for device in get_devices():
+        device_id = device["id"]
+        pollers.append(AsyncInverterPoller(
+            ip=device["ip"],
+            port=device["port"],
+            unit_id=device["unit_id"],
+            plan=plan,
+            interval=config["polling_interval"],
+            on_sample=lambda values, device_id=device_id: record_sample(values, device_id),
+            on_error=lambda error, device_id=device_id: mark_disconnected(error, device_id),
+            request_timeout=modbus_cfg.get("request_timeout", ASYNC_REQUEST_TIMEOUT_SEC),
+            retry_delay=RETRY_DELAY_SEC,
+            max_backoff=MAX_BACKOFF_SEC,
+            next_interval=make_poll_scheduler(device_id),
+        ))
+        print(f"🔌 Starting Growatt polling (asyncio) [{device_id}]: "
+              f"{device['ip']}:{device['port']}, interval={config['polling_interval']}s")
+    
+    print(f"📋 Register plan: {plan.describe()}")
+    run_fleet_forever(pollers)
+
+
+def compact_journal():
+    """Background thread folding the journal into the archive periodically"""
+    while True:
+        time.sleep(config.get("journal_compact_sec", 300))
+        try:
+            journal.compact()
+        except OSError as e:
+            print(f"⚠ Journal compaction failed: {e}")
 
 
-def log_to_csv(data):
-    """Append data to monthly CSV log file"""
-    filepath = get_monthly_log_file()
-    file_exists = os.path.exists(filepath) and os.path.getsize(filepath) > 0
-    
-    with open(filepath, 'a', newline='') as f:
-        fieldnames = ['timestamp', 'solar', 'load', 'grid_export', 'grid_import', 
-                      'battery_charge', 'battery_discharge', 'battery_net', 
-                      'soc_inv', 'soc_bms']
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        
-        if not file_exists:
-            writer.writeheader()
-        
-        writer.writerow({k: data.get(k, 0) for k in fieldnames})
+warm_started = Event()
 
 
-def read_csv_data(filepath, start_date=None, end_date=None):
-    """Read data from a CSV file with optional date filtering"""
-    data = []
-    try:
-        with open(filepath, 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                try:
-                    ts = datetime.fromisoformat(row["timestamp"])
-                    
-                    # Apply date filter if provided
-                    if start_date and ts.date() < start_date:
-                        continue
-                    if end_date and ts.date() > end_date:
-                        continue
-                    
-                    data.append({
-                        "timestamp": row["timestamp"],
-                        "solar": float(row.get("solar", 0)),
-                        "load": float(row.get("load", 0)),
-                        "grid_export": float(row.get("grid_export", 0)),
-                        "grid_import": float(row.get("grid_import", 0)),
-                        "battery_charge": float(row.get("battery_charge", 0)),
-                        "battery_discharge": float(row.get("battery_discharge", 0)),
-                        "battery_net": float(row.get("battery_net", 0)),
-                        "soc_inv": int(float(row.get("soc_inv", 0))),
-                        "soc_bms": int(float(row.get("soc_bms", 0)))
-                    })
-                except (ValueError, KeyError):
-                    continue
-    except Exception as e:
-        print(f"Error reading {filepath}: {e}")
-    
-    return data
+def warm_start():
+    """
+    Before the first poll: replay the journal into the archive, fill the
+    in-memory history from the archive tail and prime today's energy and
+    earnings accumulators, so nothing is empty after a restart
+    """
+    started = time.perf_counter()
+    if journal is not None:
+        # Samples lost from the archive's write buffers by a crash
+        replayed = journal.replay()
+        if replayed:
+            print(f"📒 Replayed {len(replayed)} journaled samples into the archive")
+            # HTTP is already served: rollups built meanwhile lack these samples
+            for day in sorted({s["timestamp"][:10] for s in replayed}):
+                daily_rollups.invalidate(date.fromisoformat(day))
+            rollup_tiers.rewind(datetime.fromisoformat(replayed[0]["timestamp"]))
+    
+    records = storage.tail(history.capacity)
+    if records:
+        timestamps = [datetime.fromisoformat(r["timestamp"]).timestamp() for r in records]
+        columns = {f: [r.get(f) or 0 for r in records] for f in history.fields if f in records[0]}
+        # Archived samples are successful reads; battery_temp etc. are not archived (unknown)
+        columns["connected"] = [1] * len(records)
+        history.extend(timestamps, columns)
+    
+    today = datetime.now().date()
+    daily_rollups.prime(today)
+    earnings_tracker.prime(today)
+    print(f"🔥 Warm start: {len(records)} samples in history, today primed "
+          f"({(time.perf_counter() - started) * 1000:.0f} ms)")
+
+
+def run_polling():
+    """Background thread: warm start, then the configured polling engine"""
+    warm_start()
+    warm_started.set()
+    if config.get("poll_engine", "thread") == "asyncio":
+        Thread(target=poll_inverter_async, daemon=True).start()
+    else:
+        start_polling_threads()
+    if journal is not None:
+        Thread(target=compact_journal, daemon=True).start()
 
 
-# ---------------------------------------------------------------------
-# ZeroHero Earnings Calculation
-# ---------------------------------------------------------------------
-def get_fit_period(hour):
+def start_polling():
     """
-    Get Feed-in Tariff period and rate for hours OUTSIDE Super Export window.
-    
-    Time periods:
-    - Peak: 16:00-18:00 (4pm-6pm), 20:00-21:00 (8pm-9pm)
-    - Off-peak: 10:00-14:00 (10am-2pm)
-    - Shoulder: All other times
+    Start polling with the configured engine (asyncio: one event loop for
+    all devices, thread: one thread per device). Returns at once: the
+    warm start runs in the background so HTTP is served meanwhile.
     """
-    rates = ZEROHERO_CONFIG["fit_rates"]
-    
-    if hour in [16, 17, 20]:  # 4pm-6pm, 8pm-9pm (excluding Super Export)
-        return "peak", rates["peak"]
-    elif 10 <= hour < 14:  # 10am-2pm
-        return "offpeak", rates["offpeak"]
-    else:
-        return "shoulder", rates["shoulder"]
+    Thread(target=run_polling, daemon=True).start()
 
 
+# ---------------------------------------------------------------------
+# ZeroHero Earnings Calculation
+# ---------------------------------------------------------------------
 def calculate_today_earnings(target_date=None):
     """
     Calculate ZeroHero VPP earnings for a specific date (default: today).
@@ -386,172 +620,175 @@ def calculate_today_earnings(target_date=None):
     if target_date is None:
         target_date = datetime.now().date()
     
-    now = datetime.now()
-    is_today = (target_date == now.date())
-    current_hour = now.hour if is_today else 24
+    # Hourly export/import for target date: live streaming state for today,
+    # otherwise from the archive (or memory)
+    live = earnings_tracker.get(target_date)
+    if live is not None:
+        data_count, hourly_export, hourly_import = live
+    elif storage.sources(target_date, target_date):
+        data_count, hourly_export, hourly_import = storage.hourly_energy(target_date)
+    else:
+        data_points = get_memory_data(target_date, target_date)
+        data_count = len(data_points)
+        hourly_export, hourly_import = integrate_hourly(data_points)
     
-    cfg = ZEROHERO_CONFIG
+    return summarize_earnings(target_date, data_count, hourly_export, hourly_import)
+
+
+def load_hourly_buckets(start_date, end_date):
+    """
+    (data point count, hourly_export, hourly_import) for every day of a
+    range, bucketing the archive by (date, hour) in a single pass.
+    """
+    if storage.sources(start_date, end_date):
+        buckets = storage.hourly_energy_range(start_date, end_date)
+    else:
+        wall, columns = energy.arrays_from_records(get_memory_data(start_date, end_date))
+        buckets = energy.hourly_by_day(wall, columns, start_date, end_date)
     
-    # Collect data points for target date
-    data_points = []
-    files = get_log_files_for_date_range(target_date, target_date)
+    # The live tracker serves today
+    return [earnings_tracker.get(start_date + timedelta(days=i)) or bucket
+            for i, bucket in enumerate(buckets)]
+
+
+def calculate_earnings_range(start_date, end_date):
+    """calculate_today_earnings() for every day of a range, in one archive pass"""
+    return summarize_earnings_range(start_date, load_hourly_buckets(start_date, end_date))
+
+
+def compare_tariffs(plans, start_date, end_date, now=None):
+    """
+    What-if comparison: price the range's hourly import/export with every
+    plan ({name: plan}); see tariff.compare(). Hours of today that have
+    not ended are left out.
+    """
+    if now is None:
+        now = datetime.now()
+    counts, export_kwh, import_kwh = tariff.hourly_matrix(load_hourly_buckets(start_date, end_date))
+    hour_mask = tariff.completed_hours(start_date, len(counts), now)
+    return tariff.compare(plans, start_date, counts, export_kwh, import_kwh, hour_mask)
+
+
+def summarize_earnings(target_date, data_count, hourly_export, hourly_import, now=None):
+    """
+    Apply the ZeroHero rules to one day's hourly grid export/import (kWh).
     
-    if files:
-        for filepath in files:
-            file_data = read_csv_data(filepath, target_date, target_date)
-            data_points.extend(file_data)
-    else:
-        # Fallback to in-memory data
-        with data_lock:
-            for d in historical_data:
-                if datetime.fromisoformat(d["timestamp"]).date() == target_date:
-                    data_points.append(d.copy())
+    For today, hours that have not completed yet are ignored.
+    """
+    return summarize_earnings_range(target_date, [(data_count, hourly_export, hourly_import)], now)[0]
+
+
+def summarize_earnings_range(start_date, buckets, now=None):
+    """
+    summarize_earnings() for consecutive days starting at start_date.
     
-    # Sort by timestamp
-    data_points.sort(key=lambda x: x["timestamp"])
+    The ZeroHero plan is compiled into per-day rate tables and every day
+    is priced in one tariff.evaluate() pass.
+    """
+    if now is None:
+        now = datetime.now()
+    cfg = ZEROHERO_CONFIG
+    window_start, window_end = cfg["zerohero_window_start"], cfg["zerohero_window_end"]
     
-    if len(data_points) < 2:
-        return {
-            "date": target_date.isoformat(),
-            "total_export_kwh": 0,
-            "zerohero_day": {
-                "qualified": False,
-                "credit": 0,
-                "reason": "Insufficient data"
-            },
-            "super_export": {"export_kwh": 0, "earnings": 0},
-            "regular_fit": {"export_kwh": 0, "earnings": 0},
-            "total_earnings": 0,
-            "data_points": len(data_points)
-        }
+    counts, export_kwh, import_kwh = tariff.hourly_matrix(buckets)
     
-    # Calculate hourly export and import
-    hourly_export = defaultdict(float)
-    hourly_import = defaultdict(float)
+    # Skip hours beyond current time (for today)
+    hour_mask = tariff.completed_hours(start_date, len(buckets), now)
+    today_index = (now.date() - start_date).days
     
-    for i in range(len(data_points) - 1):
-        curr = data_points[i]
-        next_p = data_points[i + 1]
-        
-        t1 = datetime.fromisoformat(curr["timestamp"])
-        t2 = datetime.fromisoformat(next_p["timestamp"])
+    end_date = start_date + timedelta(days=len(buckets) - 1)
+    compiled = tariff.compile_plan(ZEROHERO_PLAN, start_date, end_date)
+    priced = tariff.evaluate(compiled, import_kwh, export_kwh, hour_mask)
+    super_export = priced["bands"]["super_export"]
+    zerohero = priced["credits"]["zerohero_day"]
+    regular_fit = [band for label, band in priced["bands"].items() if label != "super_export"]
+    
+    results = []
+    for i, data_count in enumerate(counts.tolist()):
+        target_date = start_date + timedelta(days=i)
+        is_today = (i == today_index)
+        current_hour = now.hour if is_today else 24
         
-        # Skip if beyond current time (for today)
-        if is_today and t1.hour >= current_hour:
+        if data_count < 2:
+            results.append({
+                "date": target_date.isoformat(),
+                "total_export_kwh": 0,
+                "zerohero_day": {
+                    "qualified": False,
+                    "credit": 0,
+                    "reason": "Insufficient data"
+                },
+                "super_export": {"export_kwh": 0, "earnings": 0},
+                "regular_fit": {"export_kwh": 0, "earnings": 0},
+                "total_earnings": 0,
+                "data_points": data_count
+            })
             continue
         
-        interval_sec = (t2 - t1).total_seconds()
+        # ========== 1. ZEROHERO Day Credit Check ==========
+        # For today: only show "qualified" after the entire 6pm-8pm window has passed
+        zerohero_hourly_check = {}
+        for hour in range(window_start, min(window_end, current_hour)):
+            hour_import = float(import_kwh[i, hour])
+            zerohero_hourly_check[hour] = {
+                "import_kwh": round(hour_import, 4),
+                "threshold": cfg["zerohero_import_threshold"],
+                "passed": hour_import <= cfg["zerohero_import_threshold"]
+            }
         
-        # Skip invalid intervals
-        if interval_sec <= 0 or interval_sec > 600:
-            continue
+        if is_today and current_hour < window_end:
+            # Window hasn't fully completed yet - status is pending
+            zerohero_credit = 0
+            zerohero_status = "pending"
+        elif zerohero["qualified"][i]:
+            # Window complete and all hours passed
+            zerohero_credit = cfg["zerohero_day_credit"]
+            zerohero_status = "qualified"
+        else:
+            # Window complete but failed qualification
+            zerohero_credit = 0
+            zerohero_status = "not_qualified"
         
-        interval_hours = interval_sec / 3600.0
-        hour = t1.hour
+        # ========== 2. Super Export (6pm-8pm only) ==========
+        super_export_kwh = float(super_export["kwh"][i])
+        super_export_credited = float(super_export["credited_kwh"][i])
+        super_export_earnings = float(super_export["earnings"][i])
         
-        hourly_export[hour] += curr["grid_export"] * interval_hours
-        hourly_import[hour] += abs(curr["grid_import"]) * interval_hours
-    
-    # ========== 1. ZEROHERO Day Credit Check ==========
-    # For today: only show "qualified" after the entire 6pm-8pm window has passed
-    zerohero_qualified = True
-    zerohero_hourly_check = {}
-    zerohero_window_complete = False  # True only when entire window (18,19) is done
-    
-    # Check if the entire zerohero window has completed
-    if is_today:
-        # Window is complete only after 8pm (hour >= 20)
-        zerohero_window_complete = (current_hour >= cfg["zerohero_window_end"])
-    else:
-        # For past dates, window is always complete
-        zerohero_window_complete = True
-    
-    # Check each hour in the window that has passed
-    for hour in range(cfg["zerohero_window_start"], cfg["zerohero_window_end"]):
-        if is_today and hour >= current_hour:
-            # This hour hasn't completed yet
-            continue
+        # ========== 3. Regular Feed-in (outside 6pm-8pm) ==========
+        regular_fit_kwh = sum(float(band["kwh"][i]) for band in regular_fit)
+        regular_fit_earnings = sum(float(band["earnings"][i]) for band in regular_fit)
         
-        import_kwh = hourly_import.get(hour, 0)
-        passed = import_kwh <= cfg["zerohero_import_threshold"]
-        zerohero_hourly_check[hour] = {
-            "import_kwh": round(import_kwh, 4),
-            "threshold": cfg["zerohero_import_threshold"],
-            "passed": passed
-        }
-        if not passed:
-            zerohero_qualified = False
-    
-    # Determine status
-    if is_today and not zerohero_window_complete:
-        # Window hasn't fully completed yet - status is pending
-        zerohero_credit = 0
-        zerohero_status = "pending"
-    elif zerohero_qualified:
-        # Window complete and all hours passed
-        zerohero_credit = cfg["zerohero_day_credit"]
-        zerohero_status = "qualified"
-    else:
-        # Window complete but failed qualification
-        zerohero_credit = 0
-        zerohero_status = "not_qualified"
-    
-    # ========== 2. Super Export (6pm-8pm only) ==========
-    super_export_kwh = 0
-    for hour in range(cfg["zerohero_window_start"], cfg["zerohero_window_end"]):
-        if is_today and hour >= current_hour:
-            continue
-        super_export_kwh += hourly_export.get(hour, 0)
-    
-    super_export_credited = min(super_export_kwh, cfg["super_export_limit"])
-    super_export_earnings = super_export_credited * cfg["super_export_rate"]
-    
-    # ========== 3. Regular Feed-in (outside 6pm-8pm) ==========
-    regular_fit_kwh = 0
-    regular_fit_earnings = 0
-    
-    for hour, kwh in hourly_export.items():
-        # Skip Super Export window
-        if cfg["zerohero_window_start"] <= hour < cfg["zerohero_window_end"]:
-            continue
-        # Skip future hours for today
-        if is_today and hour >= current_hour:
-            continue
+        # ========== 4. Total ==========
+        total_export = float(priced["export_kwh"][i])
+        total_earnings = zerohero_credit + super_export_earnings + regular_fit_earnings
         
-        period, rate = get_fit_period(hour)
-        regular_fit_kwh += kwh
-        regular_fit_earnings += kwh * rate
-    
-    # ========== 4. Total ==========
-    total_export = sum(hourly_export.values())
-    total_earnings = zerohero_credit + super_export_earnings + regular_fit_earnings
-    
-    return {
-        "date": target_date.isoformat(),
-        "is_partial": is_today,
-        "current_hour": current_hour if is_today else None,
-        "total_export_kwh": round(total_export, 4),
-        "zerohero_day": {
-            "status": zerohero_status,
-            "qualified": zerohero_status == "qualified",
-            "credit": zerohero_credit,
-            "window": "6pm-8pm",
-            "hourly_check": zerohero_hourly_check
-        },
-        "super_export": {
-            "window": "6pm-8pm",
-            "export_kwh": round(super_export_kwh, 4),
-            "credited_kwh": round(super_export_credited, 4),
-            "rate": cfg["super_export_rate"],
-            "earnings": round(super_export_earnings, 4)
-        },
-        "regular_fit": {
-            "export_kwh": round(regular_fit_kwh, 4),
-            "earnings": round(regular_fit_earnings, 4)
-        },
-        "total_earnings": round(total_earnings, 4),
-        "data_points": len(data_points)
-    }
+        results.append({
+            "date": target_date.isoformat(),
+            "is_partial": is_today,
+            "current_hour": current_hour if is_today else None,
+            "total_export_kwh": round(total_export, 4),
+            "zerohero_day": {
+                "status": zerohero_status,
+                "qualified": zerohero_status == "qualified",
+                "credit": zerohero_credit,
+                "window": "6pm-8pm",
+                "hourly_check": zerohero_hourly_check
+            },
+            "super_export": {
+                "window": "6pm-8pm",
+                "export_kwh": round(super_export_kwh, 4),
+                "credited_kwh": round(super_export_credited, 4),
+                "rate": cfg["super_export_rate"],
+                "earnings": round(super_export_earnings, 4)
+            },
+            "regular_fit": {
+                "export_kwh": round(regular_fit_kwh, 4),
+                "earnings": round(regular_fit_earnings, 4)
+            },
+            "total_earnings": round(total_earnings, 4),
+            "data_points": data_count
+        })
+    return results
 
 
 # ---------------------------------------------------------------------
@@ -560,43 +797,140 @@ def calculate_today_earnings(target_date=None):
 @app.route('/api/status', methods=['GET'])
 def get_status():
     """Get current system status and connection state"""
-    with data_lock:
-        return jsonify({
-            "connected": current_data["connected"],
-            "timestamp": current_data["timestamp"],
-            "config": {
-                "ip": config["modbus"]["ip"],
-                "port": config["modbus"]["port"],
-                "interval": config["polling_interval"]
-            }
-        })
+    current = read_current()
+    devices = get_devices()
+    modbus_cfg = config["modbus"]
+    return jsonify({
+        "connected": current["connected"],
+        "timestamp": current["timestamp"],
+        "config": {
+            # Fleet configs may only define modbus.devices: use the primary device
+            "ip": modbus_cfg.get("ip", devices[0]["ip"]),
+            "port": modbus_cfg.get("port", devices[0]["port"]),
+            "interval": config["polling_interval"],
+            "devices": [{"id": d["id"], "ip": d["ip"], "port": d["port"]} for d in devices]
+        }
+    })
+
+
+@app.route('/api/ready', methods=['GET'])
+def get_ready():
+    """
+    Readiness probe: 200 once the poller has its first sample since
+    startup, 503 before (Docker healthcheck, load balancers)
+    """
+    current = read_current()
+    ready = current["timestamp"] is not None
+    return jsonify({
+        "ready": ready,
+        "timestamp": current["timestamp"],
+        # Workers do not warm-start; they only mirror the poller
+        "warm_start": warm_started.is_set() if ROLE != "worker" else None,
+        "uptime_sec": round(time.monotonic() - STARTED_AT, 3),
+        "role": ROLE,
+    }), 200 if ready else 503
 
 
 @app.route('/api/current', methods=['GET'])
 def get_current():
-    """Get current real-time data"""
+    """
+    Get current real-time data.
+    
+    Query parameters:
+    - device: Device id from modbus.devices (optional, defaults to the primary device)
+    """
+    device_id = request.args.get('device')
+    if device_id is None:
+        return jsonify(read_current())
+    
     with data_lock:
-        return jsonify(current_data)
+        if device_id not in device_data:
+            return jsonify({"error": f"Unknown device: {device_id}"}), 404
+        return jsonify(device_data[device_id])
+
+
+@app.route('/api/stream', methods=['GET'])
+def get_stream():
+    """
+    Server-Sent Events stream of live data (replaces polling /api/current).
+    
+    Events:
+    - current:  primary device snapshot (same format as /api/current),
+                pushed as soon as each poll completes
+    - earnings: today's earnings (same format as /api/earnings/today),
+                pushed when they change
+    
+    The latest event of each type is sent on connect. Reconnecting
+    clients (Last-Event-ID header) get the events they missed.
+    
+    Query parameters:
+    - events: Comma-separated event types to receive (optional, default all)
+    """
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    events = request.args.get('events')
+    events = set(events.split(',')) if events else None
+    
+    return Response(
+        broadcaster.subscribe(last_event_id, events),
+        mimetype='text/event-stream',
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",   # no proxy buffering (nginx)
+        }
+    )
+
+
+@sock.route('/api/ws')
+def ws_stream(ws):
+    """
+    WebSocket live data with per-topic subscriptions and delta encoding
+    (protocol: see ws_hub.py).
+    
+    Topics: current, soc, earnings, fleet, device:<id>
+    """
+    serve_ws(hub, ws)
+
+
+@app.route('/api/fleet', methods=['GET'])
+def get_fleet():
+    """Get aggregated real-time data across all devices plus per-device snapshots"""
+    with data_lock:
+        return jsonify({
+            "total": fleet_data,
+            "devices": device_data
+        })
 
 
 @app.route('/api/history', methods=['GET'])
 def get_history():
-    """Get historical data with optional filtering"""
+    """
+    Get historical data with optional filtering
+    
+    Query parameters:
+    - limit: Number of data points to return (default 100)
+    - minutes: Only the last N minutes
+    - downsample: stride (default), lttb or minmax
+    """
     limit = request.args.get('limit', type=int, default=100)
     minutes = request.args.get('minutes', type=int)
+    mode = request.args.get('downsample', 'stride')
     
-    with data_lock:
-        data = historical_data.copy()
+    if mode not in downsample.MODES:
+        return jsonify({"error": f"downsample must be one of {', '.join(downsample.MODES)}"}), 400
     
-    # Filter by time range if specified
+    # Filter by time range if specified (binary search on the timestamp column)
+    cutoff = None
     if minutes:
-        cutoff = datetime.now() - timedelta(minutes=minutes)
-        data = [d for d in data if datetime.fromisoformat(d["timestamp"]) >= cutoff]
+        cutoff = (datetime.now() - timedelta(minutes=minutes)).timestamp()
+    window = history.window(cutoff)
     
     # Limit number of results
-    if limit and len(data) > limit:
-        step = len(data) // limit
-        data = data[::step]
+    n = len(window["timestamp"])
+    indices = None
+    if limit and n > limit:
+        columns = [window[field] for field in DOWNSAMPLE_FIELDS]
+        indices = downsample.indices(window["timestamp"], columns, limit, mode)
+    data = to_records(window, indices)
     
     return jsonify({
         "count": len(data),
@@ -614,12 +948,25 @@ def get_history_range():
     - start_date: Start date in YYYY-MM-DD format (required)
     - end_date: End date in YYYY-MM-DD format (optional, defaults to start_date)
     - limit: Maximum number of data points to return (optional, default 500)
+    - resolution: auto (default), raw, 1m, 5m or 1h. auto returns raw
+      samples when they fit in limit, otherwise the finest rollup tier
+      that does (rows hold the bucket mean plus <field>_min/_max/_last)
+    - downsample: stride (default), lttb or minmax; exactly limit points
+      are returned when there are more
     
     Example: /api/history/range?start_date=2025-11-26&end_date=2025-11-26&limit=200
     """
     start_date_str = request.args.get('start_date')
     end_date_str = request.args.get('end_date', start_date_str)
     limit = request.args.get('limit', type=int, default=500)
+    resolution = request.args.get('resolution', 'auto')
+    
+    if resolution not in ('auto', 'raw', *TIERS):
+        return jsonify({"error": f"resolution must be auto, raw or one of {', '.join(TIERS)}"}), 400
+    
+    mode = request.args.get('downsample', 'stride')
+    if mode not in downsample.MODES:
+        return jsonify({"error": f"downsample must be one of {', '.join(downsample.MODES)}"}), 400
     
     if not start_date_str:
         return jsonify({"error": "start_date is required (YYYY-MM-DD)"}), 400
@@ -633,58 +980,68 @@ def get_history_range():
     if end_date < start_date:
         return jsonify({"error": "end_date cannot be before start_date"}), 400
     
-    # Get all relevant CSV files
-    files = get_log_files_for_date_range(start_date, end_date)
+    # Get all relevant archive files (or the database)
+    files = storage.sources(start_date, end_date)
     
     if not files:
         # Fallback to in-memory data
-        with data_lock:
-            data = [
-                d for d in historical_data
-                if start_date <= datetime.fromisoformat(d["timestamp"]).date() <= end_date
-            ]
+        data = downsample_records(get_memory_data(start_date, end_date), limit, mode)
         return jsonify({
             "start_date": start_date.isoformat(),
             "end_date": end_date.isoformat(),
             "count": len(data),
-            "data": data[:limit] if limit else data,
+            "data": data,
             "source": "memory"
         })
     
-    # Read from all relevant CSV files
-    all_data = []
-    for filepath in files:
-        all_data.extend(read_csv_data(filepath, start_date, end_date))
-    
-    # Sort by timestamp
-    all_data.sort(key=lambda x: x["timestamp"])
-    
-    # Downsample if needed
-    if limit and len(all_data) > limit:
-        step = len(all_data) // limit
-        all_data = all_data[::step]
+    start = datetime.combine(start_date, datetime.min.time())
+    end = datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+    if resolution == 'auto':
+        # Samples expected up to now (not the rest of today)
+        resolution = select_tier(start, min(end, datetime.now()), limit, config["polling_interval"])
+    
+    if resolution == 'raw' and mode == 'stride':
+        # Evenly spaced rows, selected in the archive backend
+        all_data = storage.read_range(start_date, end_date, limit)
+    elif resolution == 'raw':
+        all_data = downsample_records(storage.read_range(start_date, end_date), limit, mode)
+    else:
+        records = rollup_tiers.query(resolution, start, end)
+        all_data = tier_rows(downsample_tier(records, limit, mode))
     
     return jsonify({
         "start_date": start_date.isoformat(),
         "end_date": end_date.isoformat(),
         "count": len(all_data),
         "data": all_data,
-        "source": "csv",
+        "resolution": resolution,
+        "downsample": mode,
+        "source": storage.name,
         "files_queried": len(files)
     })
 
 
 @app.route('/api/daily', methods=['GET'])
 def get_daily():
-    """Calculate daily totals from historical data"""
+    """
+    Calculate daily totals from historical data
+    
+    Query parameters:
+    - date: Date in YYYY-MM-DD format (optional, defaults to today)
+    - method: "left" (default, Riemann sum) or "trapezoid"
+    """
     date_str = request.args.get('date', datetime.now().strftime('%Y-%m-%d'))
+    method = request.args.get('method', 'left')
     
     try:
         target_date = datetime.strptime(date_str, '%Y-%m-%d').date()
     except ValueError:
         return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
     
-    daily_data = calculate_daily_totals(target_date)
+    if method not in energy.METHODS:
+        return jsonify({"error": f"method must be one of {', '.join(energy.METHODS)}"}), 400
+    
+    daily_data = calculate_daily_totals(target_date, method)
     return jsonify(daily_data)
 
 
@@ -696,11 +1053,13 @@ def get_daily_range():
     Query parameters:
     - start_date: Start date in YYYY-MM-DD format (required)
     - end_date: End date in YYYY-MM-DD format (optional, defaults to today)
+    - method: "left" (default, Riemann sum) or "trapezoid"
     
     Example: /api/daily/range?start_date=2025-11-20&end_date=2025-11-26
     """
     start_date_str = request.args.get('start_date')
     end_date_str = request.args.get('end_date', datetime.now().strftime('%Y-%m-%d'))
+    method = request.args.get('method', 'left')
     
     if not start_date_str:
         return jsonify({"error": "start_date is required (YYYY-MM-DD)"}), 400
@@ -714,28 +1073,33 @@ def get_daily_range():
     if end_date < start_date:
         return jsonify({"error": "end_date cannot be before start_date"}), 400
     
-    # Limit to 90 days max
-    if (end_date - start_date).days > 90:
-        return jsonify({"error": "Date range cannot exceed 90 days"}), 400
-    
-    results = []
-    current = start_date
-    while current <= end_date:
-        daily_data = calculate_daily_totals(current)
-        results.append(daily_data)
-        current += timedelta(days=1)
+    if method not in energy.METHODS:
+        return jsonify({"error": f"method must be one of {', '.join(energy.METHODS)}"}), 400
+    
+    if method == "left":
+        # Closed days are rollup table lookups, so no range cap is needed
+        results = []
+        current = start_date
+        while current <= end_date:
+            daily_data = calculate_daily_totals(current)
+            results.append(daily_data)
+            current += timedelta(days=1)
+    else:
+        # Whole range integrated in one pass
+        results = integrate_day_range(start_date, end_date, method)
     
     return jsonify({
         "start_date": start_date.isoformat(),
         "end_date": end_date.isoformat(),
+        "method": method,
         "count": len(results),
         "data": results
     })
 
 
-def calculate_daily_totals(target_date):
+def compute_day_totals(target_date):
     """
-    Calculate daily totals from CSV files or memory.
+    Integrate one day of data into a DayAccumulator.
     
     Uses ACTUAL time intervals between consecutive data points for accurate
     kWh calculation, instead of assuming a fixed polling interval.
@@ -743,90 +1107,187 @@ def calculate_daily_totals(target_date):
     Energy (kWh) = Power (kW) × Time (hours)
     
     For each pair of consecutive readings, we use the first reading's power
-    multiplied by the actual time elapsed until the next reading.
-    """
-    totals = {
-        "date": target_date.isoformat(),
-        "solar_kwh": 0,
-        "load_kwh": 0,
-        "grid_export_kwh": 0,
-        "grid_import_kwh": 0,
-        "battery_charge_kwh": 0,
-        "battery_discharge_kwh": 0,
-        "count": 0,
-        "avg_interval_sec": 0  # For debugging
-    }
-    
-    # Collect all data for the target date
-    data_points = []
-    
-    # Get relevant CSV file(s)
-    files = get_log_files_for_date_range(target_date, target_date)
+    multiplied by the actual time elapsed until the next reading. Intervals
+    <= 0 or > 10 minutes are gaps in the data and are skipped.
+    """
+    if storage.sources(target_date, target_date):
+        return storage.day_totals(target_date)
     
-    if files:
-        for filepath in files:
-            file_data = read_csv_data(filepath, target_date, target_date)
-            data_points.extend(file_data)
+    ts, columns = get_memory_columns(target_date, target_date)
+    row = energy.integrate_periods(ts, columns, energy.day_edges(target_date, target_date))[0]
+    acc = DayAccumulator.from_row(target_date, row)
+    if len(ts):
+        acc.resume(float(ts[-1]), {f: float(col[-1]) for f, col in columns.items()})
+    return acc
+
+
+def integrate_day_range(start_date, end_date, method="left"):
+    """
+    Totals for every day of the range in one vectorized pass over the
+    archive (or memory), without the rollup table
+    """
+    if storage.sources(start_date, end_date):
+        rows = storage.integrate_days(start_date, end_date, method)
     else:
-        # Fallback to in-memory data
-        with data_lock:
-            for d in historical_data:
-                if datetime.fromisoformat(d["timestamp"]).date() == target_date:
-                    data_points.append(d.copy())
-    
-    # Sort by timestamp to ensure correct order
-    data_points.sort(key=lambda x: x["timestamp"])
-    
-    totals["count"] = len(data_points)
-    
-    if len(data_points) < 2:
-        # Not enough data points to calculate intervals
-        return totals
-    
-    # Calculate using actual time intervals
-    total_interval_sec = 0
-    interval_count = 0
+        ts, columns = get_memory_columns(start_date, end_date)
+        rows = energy.integrate_periods(ts, columns, energy.day_edges(start_date, end_date), method)
+    
+    return [DayAccumulator.from_row(start_date + timedelta(days=i), row).to_totals(method)
+            for i, row in enumerate(rows)]
+
+
+# Per-day rollup table: closed days are computed once and persisted,
+# today is updated incrementally by record_sample()
+if ROLE == "worker":
+    daily_rollups = RemoteObject(state_client, "daily_rollups")
+else:
+    daily_rollups = DailyRollupStore(os.path.join(log_dir, "daily_rollup.json"), compute_day_totals)
+
+
+def load_points_since(target_date, after=None):
+    """Data points of one day after a datetime, from the archive (or memory)"""
+    if storage.sources(target_date, target_date):
+        return storage.read_since(target_date, after)
+    points = get_memory_data(target_date, target_date)
+    if after is not None:
+        key = after.isoformat()
+        points = [p for p in points if p["timestamp"] > key]
+    return points
+
+
+if ROLE == "worker":
+    earnings_tracker = RemoteObject(state_client, "earnings_tracker")
+    rollup_tiers = RemoteObject(state_client, "rollup_tiers")
+else:
+    # Today's earnings, updated per sample by record_sample() and
+    # checkpointed so a restart only replays samples after the checkpoint
+    earnings_tracker = EarningsTracker(os.path.join(log_dir, "earnings_today.json"), load_points_since)
+    atexit.register(earnings_tracker.checkpoint)
+    
+    # 1m / 5m / 1h min/max/mean/last buckets for /api/history/range, updated
+    # per sample by record_sample() and built from the archive on first use
+    rollup_tiers = RollupTiers(log_dir, storage.read_arrays)
+
+# Live push: record_sample() publishes each state change once.
+# /api/stream (SSE) clients read a shared event buffer, /api/ws clients
+# get per-topic deltas from the hub
+broadcaster = Broadcaster()
+hub = Hub(lambda topic: topic in ("current", "soc", "earnings", "fleet")
+          or topic in {f"device:{d['id']}" for d in get_devices()})
+last_published_earnings = None
+SOC_FIELDS = ["timestamp", "soc_inv", "soc_bms", "battery_temp", "bms_cycle_count", "connected"]
+
+
+def publish_live(device_id):
+    """Push the state record_sample() / mark_disconnected() just wrote"""
+    with data_lock:
+        device = dict(device_data[device_id])
+        fleet = dict(fleet_data)
+        current = dict(current_data)
     
-    for i in range(len(data_points) - 1):
-        current = data_points[i]
-        next_point = data_points[i + 1]
-        
-        # Calculate actual time interval
-        t1 = datetime.fromisoformat(current["timestamp"])
-        t2 = datetime.fromisoformat(next_point["timestamp"])
-        interval_sec = (t2 - t1).total_seconds()
-        
-        # Skip if interval is unreasonably large (e.g., > 10 minutes = gap in data)
-        # or negative (data ordering issue)
-        if interval_sec <= 0 or interval_sec > 600:
-            continue
-        
-        interval_hours = interval_sec / 3600.0
-        
-        # Accumulate energy using current point's power × time interval
-        totals["solar_kwh"] += current["solar"] * interval_hours
-        totals["load_kwh"] += current["load"] * interval_hours
-        totals["grid_export_kwh"] += current["grid_export"] * interval_hours
-        totals["grid_import_kwh"] += abs(current["grid_import"]) * interval_hours
-        totals["battery_charge_kwh"] += current["battery_charge"] * interval_hours
-        totals["battery_discharge_kwh"] += current["battery_discharge"] * interval_hours
-        
-        total_interval_sec += interval_sec
-        interval_count += 1
+    if snapshot_writer is not None and device_id == get_primary_device_id():
+        snapshot_writer.write(current)
+    push_live(("state", device_id, device, fleet, current))
+
+
+def publish_earnings():
+    """Push today's earnings to live clients when they changed"""
+    global last_published_earnings
     
-    # Calculate average interval for debugging
-    if interval_count > 0:
-        totals["avg_interval_sec"] = round(total_interval_sec / interval_count, 1)
+    earnings = calculate_today_earnings()
+    if earnings != last_published_earnings:
+        push_live(("earnings", earnings))
+        last_published_earnings = earnings
+
+
+def push_live(event):
+    """
+    Fan one live event out to this process's SSE / WebSocket clients and,
+    in the poller, to the HTTP worker processes.
     
-    # Round all kWh values to 2 decimal places
-    totals["solar_kwh"] = round(totals["solar_kwh"], 2)
-    totals["load_kwh"] = round(totals["load_kwh"], 2)
-    totals["grid_export_kwh"] = round(totals["grid_export_kwh"], 2)
-    totals["grid_import_kwh"] = round(totals["grid_import_kwh"], 2)
-    totals["battery_charge_kwh"] = round(totals["battery_charge_kwh"], 2)
-    totals["battery_discharge_kwh"] = round(totals["battery_discharge_kwh"], 2)
+    event: ("state", device_id, device, fleet, current) or ("earnings", earnings)
+    """
+    if event[0] == "state":
+        _, device_id, device, fleet, current = event
+        hub.publish(f"device:{device_id}", device)
+        hub.publish("fleet", fleet)
+        if device_id == get_primary_device_id():
+            broadcaster.publish("current", current)
+            hub.publish("current", current)
+            hub.publish("soc", {field: current.get(field) for field in SOC_FIELDS})
+    elif event[0] == "earnings":
+        broadcaster.publish("earnings", event[1])
+        hub.publish("earnings", event[1])
+    
+    if state_server is not None:
+        state_server.publish(event)
+
+
+def live_snapshot():
+    """Events that bring a newly connected worker up to date"""
+    with data_lock:
+        events = [("state", device_id, dict(device), dict(fleet_data), dict(current_data))
+                  for device_id, device in device_data.items()]
+    if last_published_earnings is not None:
+        events.append(("earnings", last_published_earnings))
+    return events
+
+
+def apply_live_event(event):
+    """Worker: mirror a poller event into the local state, then fan it out"""
+    if event[0] == "state":
+        _, device_id, device, fleet, current = event
+        with data_lock:
+            device_data[device_id] = device
+            fleet_data.clear()
+            fleet_data.update(fleet)
+            if device_id == get_primary_device_id():
+                current_data.clear()
+                current_data.update(current)
+    push_live(event)
+
+
+def start_state_server():
+    """Poller: serve state and live events to the HTTP workers"""
+    global state_server, snapshot_writer
+    
+    state_server = StateServer(STATE_SOCKET, {
+        "history": (history, ["window", "last_timestamp"]),
+        "daily_rollups": (daily_rollups, ["get"]),
+        "earnings_tracker": (earnings_tracker, ["get"]),
+        "rollup_tiers": (rollup_tiers, ["query"]),
+    }, live_snapshot)
+    state_server.start()
+    
+    # After start(): its lock guarantees this is the only writer
+    from shm_snapshot import SnapshotWriter
+    snapshot_writer = SnapshotWriter(SNAPSHOT_SHM)
+    with data_lock:
+        snapshot_writer.write(current_data)
+    print(f"🔗 Serving state to HTTP workers on {STATE_SOCKET} (snapshot: /{SNAPSHOT_SHM})")
+
+
+def stop_state_server():
+    """Poller shutdown: remove the socket and the shared-memory snapshot"""
+    state_server.close()
+    snapshot_writer.close()
+
+
+def follow_poller():
+    """Worker: keep current_data / SSE / WebSocket clients fed from the poller"""
+    Thread(target=state_client.follow, args=(apply_live_event,), daemon=True).start()
+
+
+def calculate_daily_totals(target_date, method="left"):
+    """
+    Daily totals (kWh per channel, count, avg interval, gaps).
     
-    return totals
+    Left Riemann sums come from the rollup table; other methods
+    (energy.METHODS) are integrated from the archive on request.
+    """
+    if method == "left":
+        return daily_rollups.get(target_date)
+    return integrate_day_range(target_date, target_date, method)[0]
 
 
 # ---------------------------------------------------------------------
@@ -904,18 +1365,12 @@ def get_earnings_range():
     if end_date < start_date:
         return jsonify({"error": "end_date cannot be before start_date"}), 400
     
-    if (end_date - start_date).days > 90:
-        return jsonify({"error": "Date range cannot exceed 90 days"}), 400
-    
-    results = []
+    # One pass over the archive for the whole range, so no range cap
+    # (a financial year is fine)
+    results = calculate_earnings_range(start_date, end_date)
     total_earnings = 0
-    current = start_date
-    
-    while current <= end_date:
-        earnings = calculate_today_earnings(current)
-        results.append(earnings)
+    for earnings in results:
         total_earnings += earnings.get("total_earnings", 0)
-        current += timedelta(days=1)
     
     return jsonify({
         "start_date": start_date.isoformat(),
@@ -926,10 +1381,109 @@ def get_earnings_range():
     })
 
 
+@app.route('/api/tariffs', methods=['GET'])
+def get_tariffs():
+    """
+    List the tariff plans (ZeroHero + config "tariffs") with their hourly
+    import/export rates on a given date.
+
+    Query parameters:
+    - date: Date in YYYY-MM-DD format (optional, defaults to today)
+    """
+    date_str = request.args.get('date', datetime.now().strftime('%Y-%m-%d'))
+
+    try:
+        target_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
+
+    plans = {}
+    for name, plan in TARIFF_PLANS.items():
+        compiled = tariff.compile_plan(plan, target_date, target_date)
+        plans[name] = {
+            "plan": plan,
+            "import_rates": compiled.import_rate[0].tolist(),
+            "export_rates": compiled.export_rate[0].tolist(),
+        }
+
+    return jsonify({"date": target_date.isoformat(), "plans": plans})
+
+
+@app.route('/api/tariffs/compare', methods=['GET', 'POST'])
+def compare_tariffs_endpoint():
+    """
+    What-if comparison of tariff plans over historical usage.
+    
+    GET query parameters:
+    - start_date: Start date in YYYY-MM-DD format (required)
+    - end_date: End date in YYYY-MM-DD format (optional, defaults to today)
+    - plans: Comma-separated plan names (optional, defaults to all plans)
+    
+    POST takes the same fields as a JSON object; "plans" may be a
+    comma-separated string, a list of plan names or an object of plan
+    definitions (tariff.py format).
+    
+    Example: /api/tariffs/compare?start_date=2024-07-01&end_date=2025-06-30
+    """
+    if request.method == 'POST':
+        params = request.get_json(silent=True) or {}
+        if not isinstance(params, dict):
+            return jsonify({"error": "Request body must be a JSON object"}), 400
+        requested = params.get("plans")
+        if isinstance(requested, str):
+            requested = requested.split(",") if requested else None
+        elif isinstance(requested, list):
+            if not all(isinstance(name, str) for name in requested):
+                return jsonify({"error": "plans must be a list of plan names"}), 400
+        elif requested is not None and not isinstance(requested, dict):
+            return jsonify({"error": "plans must be a comma-separated string, a list of names "
+                                     "or an object of plan definitions"}), 400
+    else:
+        params = request.args
+        requested = params.get("plans")
+        requested = requested.split(",") if requested else None
+    
+    start_date_str = params.get('start_date')
+    end_date_str = params.get('end_date', datetime.now().strftime('%Y-%m-%d'))
+    
+    if not start_date_str:
+        return jsonify({"error": "start_date is required (YYYY-MM-DD)"}), 400
+    
+    try:
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+    except (ValueError, TypeError):
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
+    
+    if end_date < start_date:
+        return jsonify({"error": "end_date cannot be before start_date"}), 400
+    
+    try:
+        if requested is None:
+            plans = dict(TARIFF_PLANS)
+        elif isinstance(requested, dict):
+            plans = tariff.load_plans(requested)
+        else:
+            unknown = [name for name in requested if name not in TARIFF_PLANS]
+            if unknown:
+                return jsonify({"error": f"Unknown plans: {', '.join(unknown)}"}), 400
+            plans = {name: TARIFF_PLANS[name] for name in requested}
+    except ValueError as e:
+        return jsonify({"error": f"Invalid plan: {e}"}), 400
+    
+    results = compare_tariffs(plans, start_date, end_date)
+    return jsonify({
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "count": len(results),
+        "plans": results
+    })
+
+
 @app.route('/api/archives', methods=['GET'])
 def get_archives():
     """List all available archive files"""
-    archives = get_all_log_files()
+    archives = storage.list_archives()
     total_size = sum(a["size_mb"] for a in archives)
     
     return jsonify({
@@ -948,6 +1502,12 @@ def manage_config():
         return jsonify(config)
     
     elif request.method == 'POST':
+        if ROLE == "worker":
+            # Only this worker would see the change: the poller and the
+            # other workers keep the config they were started with
+            return jsonify({"error": "Restart required: under gunicorn, edit config.json and "
+                                     "restart the service"}), 409
+        
         new_config = request.json
         config.update(new_config)
         
@@ -968,14 +1528,13 @@ if __name__ == '__main__':
     parser.add_argument('--port', type=int, default=5000)
     args = parser.parse_args()
     
-    # Start polling thread
-    polling_thread = Thread(target=poll_inverter, daemon=True)
-    polling_thread.start()
+    start_polling()
     
-    # Start Flask server
+    # Start Flask server (development; see wsgi.py for production serving)
     port = int(os.getenv('PORT', args.port))
     print(f"🚀 Starting Flask API server on port {port}")
     print(f"📁 Log directory: {log_dir}")
-    print(f"📊 Archives: {len(get_all_log_files())} files")
-    print(f"💰 ZeroHero earnings API: /api/earnings/today")
-    app.run(host='0.0.0.0', port=port, debug=False)
+    print(f"📊 Archive format: {storage.name} (listing: /api/archives)")
+    print("💰 ZeroHero earnings API: /api/earnings/today")
+    print("📡 Live stream: /api/stream (SSE), /api/ws (WebSocket)")
+    app.run(host='0.0.0.0', port=port, debug=False, threaded=True)
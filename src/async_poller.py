@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Asyncio polling engine for Growatt SPH inverters.
+
+Alternative to the blocking poll_inverter thread in api_server.py
+(select with "poll_engine": "asyncio" in config.json):
+
+- Every Modbus request has its own deadline (asyncio.wait_for), and the
+  whole cycle is bounded by cycle_timeout (default: the configured
+  polling interval), so a slow inverter can delay at most one tick
+  instead of stalling for RETRY_TIMEOUT_SEC per register.
+- Retries wait with asyncio.sleep and are cancellable at any point.
+- Ticks are scheduled on a fixed grid (start + n * interval) rather than
+  "work + sleep(interval)", so sampling does not drift; overrun ticks are
+  skipped instead of bunching up.
+- on_sample runs in the loop's thread pool, so its disk I/O never
+  blocks the event loop; samples of one device stay in order.
+- next_interval (optional) sets the interval after each sample, e.g. the
+  adaptive schedule in poll_schedule.py; the next tick follows it, the
+  cycle deadline does not (a 1 s window interval must not make a slow
+  dongle time out every cycle).
+
+Run standalone against a real inverter or the local simulator:
+    python src/sph_simulator.py --port 5020 &
+    python src/async_poller.py --ip 127.0.0.1 --port 5020 --interval 1 --count 5
+"""
+
+import asyncio
+import argparse
+import time
+
+from pymodbus.client import AsyncModbusTcpClient
+from pymodbus.exceptions import ModbusIOException
+
+from register_map import SPH_REGISTERS, POLL_REGISTERS
+
+
+DEFAULT_REQUEST_TIMEOUT_SEC = 2
+DEFAULT_RETRY_DELAY_SEC = 0.5
+DEFAULT_MAX_BACKOFF_SEC = 60
+
+
+class AsyncInverterPoller:
+    """Polls one inverter on a fixed tick and hands decoded snapshots to on_sample"""
+
+    def __init__(self, ip, port, unit_id, plan, interval, on_sample, on_error=None,
+                 request_timeout=DEFAULT_REQUEST_TIMEOUT_SEC,
+                 retry_delay=DEFAULT_RETRY_DELAY_SEC,
+                 max_backoff=DEFAULT_MAX_BACKOFF_SEC,
+                 next_interval=None, cycle_timeout=None):
+        self.ip = ip
+        self.port = port
+        self.unit_id = unit_id
+        self.plan = plan
+        self.interval = interval
+        self.on_sample = on_sample
+        self.on_error = on_error
+        self.request_timeout = request_timeout
+        self.retry_delay = retry_delay
+        self.max_backoff = max_backoff
+        self.next_interval = next_interval   # callable(values) -> seconds, or None
+        self.cycle_timeout = cycle_timeout or interval
+
+        self.client = None
+        self.ticks = 0
+        self.skipped_ticks = 0
+        self.failures = 0            # consecutive failed cycles
+        self.last_cycle_sec = None   # duration of the last successful read
+        self._loop = None
+        self._task = None
+
+    # -----------------------------------------------------------------
+    # Modbus I/O
+    # -----------------------------------------------------------------
+    async def _ensure_connected(self):
+        if self.client is None:
+            # Retries are handled here, bounded by the cycle deadline
+            self.client = AsyncModbusTcpClient(
+                self.ip, port=self.port, timeout=self.request_timeout, retries=0
+            )
+        if not self.client.connected:
+            await asyncio.wait_for(self.client.connect(), timeout=self.request_timeout)
+
+    async def read_block(self, addr, count):
+        """
+        Read input registers, retrying until the enclosing cycle deadline.
+
+        Each attempt has its own request_timeout; cancellation (cycle deadline
+        or stop()) propagates immediately.
+        """
+        while True:
+            try:
+                await self._ensure_connected()
+                rr = await asyncio.wait_for(
+                    self.client.read_input_registers(address=addr, count=count, unit=self.unit_id),
+                    timeout=self.request_timeout,
+                )
+                if (not isinstance(rr, ModbusIOException)) and (not rr.isError()):
+                    return rr.registers
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass
+
+            await asyncio.sleep(self.retry_delay)
+
+    async def poll_once(self):
+        """Read one snapshot; raises asyncio.TimeoutError if it exceeds cycle_timeout"""
+        return await asyncio.wait_for(self.plan.read_async(self.read_block), timeout=self.cycle_timeout)
+
+    # -----------------------------------------------------------------
+    # Scheduling
+    # -----------------------------------------------------------------
+    async def run(self, max_ticks=None):
+        """Poll on a drift-free fixed tick until cancelled (or max_ticks reached)"""
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+
+        try:
+            while max_ticks is None or self.ticks < max_ticks:
+                started = loop.time()
+                try:
+                    values = await self.poll_once()
+                    self.last_cycle_sec = loop.time() - started
+                    self.failures = 0
+                    # Archive writes (and journal fsyncs) run on a worker
+                    # thread so a slow disk cannot delay other devices' ticks
+                    await loop.run_in_executor(None, self.on_sample, values)
+                    if self.next_interval is not None:
+                        self.interval = self.next_interval(values)
+                except asyncio.CancelledError:
+                    raise
+                except asyncio.TimeoutError:
+                    self.failures += 1
+                    self._report_error(f"poll cycle exceeded {self.cycle_timeout}s deadline")
+                except Exception as e:
+                    self.failures += 1
+                    self._report_error(e)
+
+                self.ticks += 1
+                next_tick += self.interval * (1 + self._backoff_ticks())
+                now = loop.time()
+                if now > next_tick:
+                    # Overran: skip the missed ticks but keep the original phase
+                    missed = int((now - next_tick) // self.interval) + 1
+                    self.skipped_ticks += missed
+                    next_tick += missed * self.interval
+                await asyncio.sleep(next_tick - now)
+        finally:
+            if self.client is not None:
+                self.client.close()
+                self.client = None
+
+    def _backoff_ticks(self):
+        """Whole ticks to skip after consecutive failures (exponential, capped)"""
+        if not self.failures:
+            return 0
+        max_ticks = max(int(self.max_backoff // self.interval), 1)
+        return min(2 ** self.failures - 1, max_ticks)
+
+    def _report_error(self, error):
+        if self.on_error is not None:
+            self.on_error(error)
+        else:
+            print(f"❌ Error polling inverter: {error}")
+
+    def run_forever(self):
+        """Blocking entry point for a background thread; returns after stop()"""
+        run_fleet_forever([self])
+
+    def stop(self):
+        """Cancel the poll task from any thread"""
+        if self._loop is not None and self._task is not None:
+            self._loop.call_soon_threadsafe(self._task.cancel)
+
+
+async def run_fleet(pollers, max_ticks=None):
+    """Run several pollers concurrently, each with its own connection and backoff"""
+    await asyncio.gather(*(p.run(max_ticks) for p in pollers))
+
+
+def run_fleet_forever(pollers):
+    """
+    Blocking entry point: one event loop polling every device concurrently.
+    Returns after stop() is called on any of the pollers.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        task = loop.create_task(run_fleet(pollers))
+        for p in pollers:
+            p._loop = loop
+            p._task = task
+        loop.run_until_complete(task)
+    except asyncio.CancelledError:
+        pass
+    finally:
+        loop.run_until_complete(loop.shutdown_default_executor())
+        loop.close()
+
+
+# ---------------------------------------------------------------------
+# CLI: print snapshots from an inverter or simulator
+# ---------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Growatt SPH asyncio poller")
+    parser.add_argument("--ip", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=502)
+    parser.add_argument("--unit", type=int, default=1)
+    parser.add_argument("--interval", type=float, default=5)
+    parser.add_argument("--count", type=int, default=None, help="Stop after N ticks")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_REQUEST_TIMEOUT_SEC,
+                        help="Per-request deadline in seconds")
+    args = parser.parse_args()
+
+    started = time.monotonic()
+
+    def on_sample(values):
+        print(f"[{time.monotonic() - started:8.3f}s] {values}")
+
+    poller = AsyncInverterPoller(
+        args.ip, args.port, args.unit,
+        SPH_REGISTERS.plan(POLL_REGISTERS),
+        args.interval, on_sample,
+        request_timeout=args.timeout,
+    )
+    try:
+        asyncio.run(poller.run(max_ticks=args.count))
+    except KeyboardInterrupt:
+        pass
+    print(f"ticks={poller.ticks} skipped={poller.skipped_ticks}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark: daily energy integration, per-point loop vs vectorized.
+
+Generates N days of synthetic 5-second samples (with a few gaps) and
+integrates every day:
+
+- loop:       the original calculate_daily_totals algorithm, pairwise over
+              records with datetime.fromisoformat per point
+- vectorized: energy.integrate_periods over the whole range in one pass
+
+and checks that both give the same rounded totals.
+
+Usage:
+    python src/bench_energy.py --days 30 --interval 5
+"""
+
+import argparse
+import math
+import random
+import time
+from datetime import datetime, timedelta
+
+import energy
+from daily_rollup import ENERGY_CHANNELS
+
+
+def synthetic_records(start, days, interval):
+    """read_csv_data()-style records with a diurnal solar curve and random gaps"""
+    rng = random.Random(42)
+    records = []
+    t = datetime.combine(start, datetime.min.time())
+    end = t + timedelta(days=days)
+    while t < end:
+        hour = t.hour + t.minute / 60
+        solar = max(0.0, 6 * math.sin(math.pi * (hour - 6) / 12)) if 6 <= hour <= 18 else 0.0
+        load = 0.8 + rng.random()
+        grid = solar - load - 0.5
+        records.append({
+            "timestamp": t.isoformat(),
+            "solar": round(solar, 3),
+            "load": round(load, 3),
+            "grid_export": round(max(grid, 0), 3),
+            "grid_import": round(max(-grid, 0), 3),
+            "battery_charge": 0.5,
+            "battery_discharge": 0.0,
+        })
+        step = interval + rng.uniform(-0.5, 0.5)
+        if rng.random() < 0.0002:
+            step += 900   # outage
+        t += timedelta(seconds=step)
+    return records
+
+
+def loop_totals(points):
+    """Original per-day loop (calculate_daily_totals before energy.py)"""
+    totals = {key: 0.0 for key in ENERGY_CHANNELS}
+    for i in range(len(points) - 1):
+        curr, next_p = points[i], points[i + 1]
+        t1 = datetime.fromisoformat(curr["timestamp"])
+        t2 = datetime.fromisoformat(next_p["timestamp"])
+        interval_sec = (t2 - t1).total_seconds()
+        if interval_sec <= 0 or interval_sec > 600:
+            continue
+        interval_hours = interval_sec / 3600.0
+        for key, field in ENERGY_CHANNELS.items():
+            value = abs(curr[field]) if field == "grid_import" else curr[field]
+            totals[key] += value * interval_hours
+    return {key: round(v, 2) for key, v in totals.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Energy integration benchmark")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--interval", type=float, default=5)
+    args = parser.parse_args()
+
+    start = datetime(2025, 11, 1).date()
+    end = start + timedelta(days=args.days - 1)
+    records = synthetic_records(start, args.days, args.interval)
+    print(f"{len(records)} samples over {args.days} days")
+
+    # Loop: one pass per day, as /api/daily/range did
+    started = time.perf_counter()
+    by_day = {}
+    for r in records:
+        by_day.setdefault(r["timestamp"][:10], []).append(r)
+    loop_results = [loop_totals(by_day.get((start + timedelta(days=i)).isoformat(), []))
+                    for i in range(args.days)]
+    loop_sec = time.perf_counter() - started
+
+    # Vectorized: array conversion + one integration pass
+    started = time.perf_counter()
+    ts, columns = energy.columns_from_records(records)
+    convert_sec = time.perf_counter() - started
+    started = time.perf_counter()
+    rows = energy.integrate_periods(ts, columns, energy.day_edges(start, end))
+    vector_sec = time.perf_counter() - started
+
+    vector_results = [{key: round(v, 2) for key, v in row["kwh"].items()} for row in rows]
+    mismatches = sum(a != b for a, b in zip(loop_results, vector_results))
+
+    trap_started = time.perf_counter()
+    energy.integrate_periods(ts, columns, energy.day_edges(start, end), method="trapezoid")
+    trap_sec = time.perf_counter() - trap_started
+
+    print(f"loop:       {loop_sec * 1000:8.1f} ms")
+    print(f"vectorized: {vector_sec * 1000:8.1f} ms  (+ {convert_sec * 1000:.1f} ms records -> arrays)")
+    print(f"trapezoid:  {trap_sec * 1000:8.1f} ms")
+    print(f"speedup:    {loop_sec / vector_sec:8.1f}x")
+    print(f"days with differing totals: {mismatches}")
+    print(f"gaps: {sum(r['gap_count'] for r in rows)}, "
+          f"max gap {max(r['max_gap_sec'] for r in rows):.0f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark: fleet poll cycle time vs number of devices.
+
+Starts N local SPH simulators (sph_simulator.py, one process each, with a
+per-request latency to mimic Wi-Fi dongles) and polls them:
+
+- asyncio engine: all devices concurrently in one event loop
+- sequential baseline: one blocking client per device, read one after another
+
+With concurrent sessions the fleet cycle time should stay roughly flat as
+devices are added, while the sequential baseline grows linearly.
+
+Usage:
+    python src/bench_fleet.py --devices 1 2 4 8 16 --latency 0.05 --ticks 5
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from pymodbus.client import ModbusTcpClient
+
+from async_poller import AsyncInverterPoller, run_fleet
+from register_map import SPH_REGISTERS, POLL_REGISTERS
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def wait_for_port(port, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+
+def start_simulators(ports, latency):
+    procs = []
+    for port in ports:
+        procs.append(subprocess.Popen(
+            [sys.executable, os.path.join(HERE, "sph_simulator.py"),
+             "--port", str(port), "--latency", str(latency)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        ))
+    for port in ports:
+        if not wait_for_port(port):
+            raise RuntimeError(f"simulator on port {port} did not start")
+    return procs
+
+
+def bench_async(ports, interval, ticks):
+    """Return per-tick fleet cycle times (max device read time per tick)"""
+    plan = SPH_REGISTERS.plan(POLL_REGISTERS)
+    per_tick = {}
+
+    def make_on_sample(poller_ref):
+        def on_sample(values):
+            p = poller_ref[0]
+            per_tick.setdefault(p.ticks, []).append(p.last_cycle_sec)
+        return on_sample
+
+    pollers = []
+    for port in ports:
+        ref = []
+        p = AsyncInverterPoller("127.0.0.1", port, 1, plan, interval, make_on_sample(ref))
+        ref.append(p)
+        pollers.append(p)
+
+    asyncio.run(run_fleet(pollers, max_ticks=ticks))
+    # Drop the first tick (connection setup)
+    return [max(v) for k, v in sorted(per_tick.items()) if k > 0]
+
+
+def bench_sequential(ports, ticks):
+    """Return per-cycle times reading every device one after another"""
+    plan = SPH_REGISTERS.plan(POLL_REGISTERS)
+    clients = [ModbusTcpClient("127.0.0.1", port=port) for port in ports]
+    for c in clients:
+        c.connect()
+
+    def reader(client):
+        def read_block(addr, count):
+            rr = client.read_input_registers(address=addr, count=count, unit=1)
+            return None if rr.isError() else rr.registers
+        return read_block
+
+    readers = [reader(c) for c in clients]
+    cycles = []
+    try:
+        for _ in range(ticks):
+            started = time.perf_counter()
+            for read_block in readers:
+                plan.read(read_block)
+            cycles.append(time.perf_counter() - started)
+    finally:
+        for c in clients:
+            c.close()
+    return cycles
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fleet polling benchmark")
+    parser.add_argument("--devices", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulator latency per request (s)")
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--ticks", type=int, default=5)
+    parser.add_argument("--base-port", type=int, default=15020)
+    args = parser.parse_args()
+
+    ports = [args.base_port + i for i in range(max(args.devices))]
+    print(f"Starting {len(ports)} simulators (latency {args.latency}s/request)...")
+    procs = start_simulators(ports, args.latency)
+
+    try:
+        print(f"{'devices':>8} | {'asyncio cycle (ms)':>20} | {'sequential cycle (ms)':>22}")
+        print("-" * 58)
+        for n in args.devices:
+            async_cycles = bench_async(ports[:n], args.interval, args.ticks + 1)
+            seq_cycles = bench_sequential(ports[:n], args.ticks)
+            print(f"{n:>8} | {statistics.mean(async_cycles) * 1000:>20.1f} | "
+                  f"{statistics.mean(seq_cycles) * 1000:>22.1f}")
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Benchmark: HTTP throughput of production serving (gunicorn workers + one
+poller process, wsgi.py / gunicorn.conf.py) against the Flask
+development server (python api_server.py, app.run).
+
+Both serve a temporary log directory holding --days of synthetic
+5-second samples while polling a local SPH simulator
+(sph_simulator.py). Each endpoint is loaded by --concurrency client
+threads (keep-alive where the server allows it) for --duration seconds:
+
+- /api/current
+- /api/history/range over the last day (limit 500)
+
+The load generator runs on the same machine, so on few cores it competes
+with the servers.
+
+Usage:
+    python src/bench_http.py --workers 4 --concurrency 16 --duration 10
+"""
+
+import argparse
+import http.client
+import json
+import math
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from storage import write_csv
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def write_samples(log_dir, days, interval=5):
+    """Synthetic archive: `days` days of samples ending now, one CSV per month"""
+    now = datetime.now().replace(microsecond=0)
+    t = now - timedelta(days=days)
+    months = {}
+    while t < now:
+        hour = t.hour + t.minute / 60
+        solar = max(0.0, 5 * math.sin(math.pi * (hour - 6) / 13)) if 6 <= hour <= 19 else 0.0
+        load = 0.6 + 0.4 * math.sin(hour)
+        grid = solar - load
+        months.setdefault(t.strftime("%Y-%m"), []).append({
+            "timestamp": t.isoformat(),
+            "solar": round(solar, 3),
+            "load": round(load, 3),
+            "grid_export": round(max(grid, 0), 3),
+            "grid_import": round(max(-grid, 0), 3),
+            "soc_inv": 60,
+            "soc_bms": 61,
+        })
+        t += timedelta(seconds=interval)
+    for month, records in months.items():
+        write_csv(os.path.join(log_dir, f"growatt_log_{month}.csv"), records)
+    return sum(len(r) for r in months.values())
+
+
+def wait_for_http(port, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/api/status")
+            if conn.getresponse().status == 200:
+                return True
+        except (OSError, http.client.HTTPException):
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def load(port, path, concurrency, duration):
+    """(requests/s, sorted latencies, errors) for GET path"""
+    deadline = time.monotonic() + duration
+    latencies = [[] for _ in range(concurrency)]
+    errors = [0] * concurrency
+
+    def client(i):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                conn.request("GET", path)
+                response = conn.getresponse()
+                response.read()
+                if response.status == 200:
+                    latencies[i].append(time.perf_counter() - started)
+                else:
+                    errors[i] += 1
+            except (OSError, http.client.HTTPException):
+                errors[i] += 1
+                conn.close()
+        conn.close()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    merged = sorted(x for part in latencies for x in part)
+    return len(merged) / elapsed, merged, sum(errors)
+
+
+def start_server(mode, port, env, workers):
+    if mode == "app.run":
+        cmd = [sys.executable, os.path.join(HERE, "api_server.py"), "--port", str(port)]
+    else:
+        cmd = [sys.executable, "-m", "gunicorn", "-c", os.path.join(HERE, "gunicorn.conf.py"), "wsgi:app"]
+        env = dict(env, WEB_CONCURRENCY=str(workers))
+    return subprocess.Popen(cmd, env=dict(env, PORT=str(port)),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP throughput: gunicorn + poller vs app.run")
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn worker processes")
+    parser.add_argument("--concurrency", type=int, default=16, help="Client threads")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per endpoint")
+    parser.add_argument("--days", type=int, default=7, help="Days of synthetic archive")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="growatt-bench-")
+    sim = None
+    try:
+        log_dir = os.path.join(tmp, "logs")
+        os.makedirs(log_dir)
+        samples = write_samples(log_dir, args.days)
+
+        sim_port = free_port()
+        sim = subprocess.Popen([sys.executable, os.path.join(HERE, "sph_simulator.py"), "--port", str(sim_port)],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        config_path = os.path.join(tmp, "config.json")
+        with open(config_path, "w") as f:
+            json.dump({"modbus": {"ip": "127.0.0.1", "port": sim_port, "unit_id": 1},
+                       "polling_interval": 1, "log_dir": log_dir}, f)
+        env = dict(os.environ, GROWATT_CONFIG=config_path)
+
+        today = datetime.now().date()
+        endpoints = [
+            ("/api/current", "/api/current"),
+            ("/api/history/range", f"/api/history/range?start_date={today - timedelta(days=1)}"
+                                   f"&end_date={today}&limit=500"),
+        ]
+
+        print(f"{samples} archived samples, {args.concurrency} client threads, "
+              f"{args.duration:.0f}s per endpoint, {os.cpu_count()} CPU cores\n")
+        print(f"{'server':<22} {'endpoint':<20} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+
+        for mode in ("app.run", "gunicorn"):
+            port = free_port()
+            server = start_server(mode, port, env, args.workers)
+            try:
+                if not wait_for_http(port):
+                    raise RuntimeError(f"{mode} did not start on port {port}")
+                label = mode if mode == "app.run" else f"gunicorn x{args.workers} + poller"
+                for name, path in endpoints:
+                    load(port, path, 1, 0.5)   # warm-up (tier files, caches)
+                    rate, latencies, errors = load(port, path, args.concurrency, args.duration)
+                    p50 = latencies[len(latencies) // 2] * 1000 if latencies else float("nan")
+                    p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else float("nan")
+                    print(f"{label:<22} {name:<20} {rate:8.0f} {p50:8.1f} {p99:8.1f} {errors:7d}")
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+    finally:
+        if sim is not None:
+            sim.kill()
+        shutil.rmtree(tmp, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Load test: /api/ws fan-out to many concurrent subscribers on one core.
+
+Starts a server process (Flask + flask-sock + ws_hub, pinned to one CPU
+core) that publishes a "current" snapshot every --interval seconds, and
+connects --clients WebSocket subscribers from this process. Every
+subscriber acknowledges each version, so after the first full snapshot
+it receives deltas.
+
+Reports delivery latency (publish -> frame received by the client) and
+the server's CPU time per publish. Clients run on the same machine, so
+with a single core the numbers include their cost too.
+
+Usage:
+    python src/bench_ws.py --clients 500 --publishes 20 --interval 0.5
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import simple_websocket
+
+
+# ---------------------------------------------------------------------
+# Server process
+# ---------------------------------------------------------------------
+def run_server(port, clients, publishes, interval):
+    from flask import Flask
+    from flask_sock import Sock
+    from werkzeug.serving import make_server
+    from ws_hub import Hub, serve
+
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {min(os.sched_getaffinity(0))})
+
+    app = Flask(__name__)
+    sock = Sock(app)
+    hub = Hub()
+
+    @sock.route("/api/ws")
+    def ws_stream(ws):
+        serve(hub, ws)
+
+    server = make_server("127.0.0.1", port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    snapshot = {
+        "solar": 3.2, "battery_discharge": 0.0, "grid_import": 0.0, "battery_charge": 1.1,
+        "load": 0.9, "grid_export": 1.2, "battery_net": 1.1, "soc_inv": 62, "soc_bms": 63,
+        "battery_temp": 24.5, "bms_cycle_count": 311, "connected": True,
+    }
+    hub.publish("current", dict(snapshot, timestamp=time.time()))
+
+    # Start once every client is connected and subscribed (first snapshot sent)
+    while hub.clients < clients:
+        time.sleep(0.05)
+    time.sleep(1.0)
+
+    cpu_start = time.process_time()
+    for _ in range(publishes):
+        time.sleep(interval)
+        for field in ("solar", "load", "grid_export"):
+            snapshot[field] = round(max(0.0, snapshot[field] + random.uniform(-0.2, 0.2)), 3)
+        hub.publish("current", dict(snapshot, timestamp=time.time()))
+    time.sleep(interval)
+    cpu = time.process_time() - cpu_start
+
+    print(json.dumps({"cpu_sec": cpu, "publishes": publishes}), flush=True)
+    server.shutdown()
+
+
+# ---------------------------------------------------------------------
+# Clients
+# ---------------------------------------------------------------------
+class StampedEvent(threading.Event):
+    """Records when the client's reader thread last received a message"""
+
+    def set(self):
+        self.stamp = time.time()
+        super().set()
+
+
+def wait_for_port(port, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket hub fan-out load test")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--publishes", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=0.5, help="Seconds between publishes")
+    parser.add_argument("--port", type=int, default=5098)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        run_server(args.port, args.clients, args.publishes, args.interval)
+        return 0
+
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", "--port", str(args.port),
+         "--clients", str(args.clients), "--publishes", str(args.publishes),
+         "--interval", str(args.interval)],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+    try:
+        if not wait_for_port(args.port):
+            raise RuntimeError(f"server on port {args.port} did not start")
+
+        started = time.perf_counter()
+        clients = []
+        for _ in range(args.clients):
+            ws = simple_websocket.Client.connect(f"ws://127.0.0.1:{args.port}/api/ws",
+                                                 event_class=StampedEvent)
+            ws.send(json.dumps({"subscribe": ["current"]}))
+            clients.append(ws)
+        print(f"{args.clients} clients connected in {time.perf_counter() - started:.1f}s")
+
+        latencies, sizes = [], {"full": [], "delta": []}
+        received = 0
+        for _ in range(args.publishes + 1):
+            for ws in clients:
+                text = ws.receive(timeout=10)
+                if text is None:
+                    continue
+                message = json.loads(text)
+                state = message.get("s") or message.get("d")
+                sizes["full" if "s" in message else "delta"].append(len(text))
+                if received >= args.clients:   # skip the initial snapshots
+                    latencies.append(ws.event.stamp - state["timestamp"])
+                ws.send(json.dumps({"ack": {"current": message["v"]}}))
+                received += 1
+
+        for ws in clients:
+            try:
+                ws.close()
+            except simple_websocket.ConnectionClosed:
+                pass
+        result = json.loads(server.communicate(timeout=60)[0].strip().splitlines()[-1])
+    finally:
+        if server.poll() is None:
+            server.kill()
+
+    expected = args.clients * (args.publishes + 1)
+    latencies.sort()
+    print(f"Messages: {received}/{expected} delivered"
+          f" (full {statistics.mean(sizes['full']):.0f} B"
+          + (f", delta {statistics.mean(sizes['delta']):.0f} B)" if sizes["delta"] else ")"))
+    if latencies:
+        print(f"Latency:  p50 {latencies[len(latencies) // 2] * 1000:.1f} ms"
+              f"  p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms"
+              f"  max {latencies[-1] * 1000:.1f} ms")
+    print(f"Server:   {result['cpu_sec'] / result['publishes'] * 1000:.1f} ms CPU per publish"
+          f" ({result['cpu_sec'] / result['publishes'] / args.clients * 1e6:.0f} µs per client)")
+    return 0 if received == expected else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
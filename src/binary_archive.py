@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Fixed-width binary archive: one growatt_log_YYYY-MM.bin per month.
+
+Alternative to the monthly CSV files (select with "archive_format":
+"binary" in config.json). Each sample is a 40-byte little-endian record:
+
+    ts      datetime64[us]  local wall-clock time, as written to the CSV
+    solar .. battery_net    int32  milli-kW (W); snapshots are rounded to
+                            3 decimals, so this is lossless
+    soc_inv, soc_bms        int16  %
+
+Files are appended record by record through an open handle and read
+through np.memmap, so a range query is a binary search on the ts column
+plus a slice; nothing is parsed. Whether a file is in time order is
+checked once and then only for newly appended records. Converted values are identical to read_csv_data() output.
+
+Convert existing CSV archives:
+    python src/binary_archive.py logs/            # every growatt_log_*.csv
+    python src/binary_archive.py logs/growatt_log_2025-11.csv
+"""
+
+import os
+import sys
+import csv
+import glob
+import argparse
+from datetime import datetime
+from threading import Lock
+
+import numpy as np
+
+
+MAGIC = b"GROWATT-ARCHIVE1"   # 16-byte file header (format version)
+HEADER_SIZE = len(MAGIC)
+
+POWER_FIELDS = ["solar", "load", "grid_export", "grid_import",
+                "battery_charge", "battery_discharge", "battery_net"]
+SOC_FIELDS = ["soc_inv", "soc_bms"]
+FIELDS = POWER_FIELDS + SOC_FIELDS
+
+RECORD_DTYPE = np.dtype(
+    [("ts", "<M8[us]")]
+    + [(name, "<i4") for name in POWER_FIELDS]
+    + [(name, "<i2") for name in SOC_FIELDS]
+)
+
+EMPTY = np.zeros(0, dtype=RECORD_DTYPE)
+
+
+def encode(timestamp, sample):
+    """One record from an ISO timestamp and a snapshot/CSV dict"""
+    rec = np.zeros(1, dtype=RECORD_DTYPE)
+    rec["ts"] = np.datetime64(timestamp, "us")
+    for name in POWER_FIELDS:
+        rec[name] = round(float(sample.get(name) or 0) * 1000)
+    for name in SOC_FIELDS:
+        rec[name] = int(float(sample.get(name) or 0))
+    return rec
+
+
+class ArchiveWriter:
+    """
+    Appends records to one archive at a time through an open unbuffered
+    handle (one write() per sample, visible to memmap readers at once).
+    Switching to another path (month rollover) fsyncs and closes the
+    previous file; sync() fsyncs the current one.
+    """
+
+    def __init__(self):
+        self.path = None
+        self._file = None
+        self._lock = Lock()
+
+    def append(self, path, timestamp, sample):
+        rec = encode(timestamp, sample)
+        with self._lock:
+            if path != self.path:
+                self._open(path)
+            self._file.write(rec.tobytes())
+
+    def _open(self, path):
+        self._close(sync=True)
+        f = open(path, "ab", buffering=0)
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            f.write(MAGIC)
+        else:
+            # Drop a torn record left by a crash mid-write
+            extra = (size - HEADER_SIZE) % RECORD_DTYPE.itemsize
+            if extra:
+                f.truncate(size - extra)
+        self._file, self.path = f, path
+
+    def _close(self, sync=False):
+        if self._file is not None:
+            if sync:
+                os.fsync(self._file.fileno())
+            self._file.close()
+        self._file = self.path = None
+
+    def sync(self):
+        with self._lock:
+            if self._file is not None:
+                os.fsync(self._file.fileno())
+
+    def close(self):
+        with self._lock:
+            self._close(sync=True)
+
+
+def open_archive(path):
+    """Memory-mapped read-only record array (empty if missing or invalid)"""
+    try:
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            if f.read(HEADER_SIZE) != MAGIC:
+                print(f"⚠ Not a Growatt binary archive: {path}")
+                return EMPTY
+    except OSError:
+        return EMPTY
+
+    count = (size - HEADER_SIZE) // RECORD_DTYPE.itemsize
+    if count <= 0:
+        return EMPTY
+    return np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER_SIZE, shape=(count,))
+
+
+# path -> (inode, records checked, in time order, last ts)
+_order_cache = {}
+_order_lock = Lock()
+
+
+def in_order(path, records):
+    """
+    Whether an archive's records are in time order. Cached per file, and
+    only records appended since the last call are checked.
+    """
+    try:
+        inode = os.stat(path).st_ino
+    except OSError:
+        inode = None
+    with _order_lock:
+        cached = _order_cache.get(path)
+    if cached is None or cached[0] != inode or cached[1] > len(records):
+        cached = (inode, 0, True, None)   # new, replaced or truncated file
+
+    _, checked, ordered, last = cached
+    if ordered and len(records) > checked:
+        ts = np.asarray(records["ts"][checked:])
+        ordered = bool((ts[1:] >= ts[:-1]).all()) and (last is None or ts[0] >= last)
+        last = ts[-1]
+    with _order_lock:
+        _order_cache[path] = (inode, len(records), ordered, last)
+    return ordered
+
+
+def window(records, start=None, end=None, ordered=None):
+    """
+    Records with start <= ts < end (datetime64 or datetime, either optional).
+    A slice (no copy) when the records are in time order (ordered, checked
+    here if None), a sorted copy of the matches otherwise.
+    """
+    if not len(records):
+        return records
+    ts = records["ts"]
+    start = np.datetime64(start, "us") if start is not None else None
+    end = np.datetime64(end, "us") if end is not None else None
+
+    if ordered is None:
+        ordered = len(ts) < 2 or bool((ts[1:] >= ts[:-1]).all())
+    if ordered:
+        lo = int(np.searchsorted(ts, start, side="left")) if start is not None else 0
+        hi = int(np.searchsorted(ts, end, side="left")) if end is not None else len(ts)
+        return records[lo:hi]
+
+    keep = np.ones(len(ts), dtype=bool)
+    if start is not None:
+        keep &= ts >= start
+    if end is not None:
+        keep &= ts < end
+    return np.sort(records[keep], order="ts", kind="stable")
+
+
+def read_window(path, start=None, end=None):
+    """window() of one archive file, using its cached time-order check"""
+    records = open_archive(path)
+    return window(records, start, end, in_order(path, records))
+
+
+def read_range(paths, start=None, end=None):
+    """Concatenated window() over several archives (given in time order)"""
+    parts = [read_window(p, start, end) for p in paths]
+    parts = [p for p in parts if len(p)]
+    if not parts:
+        return EMPTY
+    return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+
+def read_columns(paths, start=None, end=None, names=None):
+    """
+    (ts, {name: raw column}) over several archives, like read_range() but
+    copying only the requested columns (names defaults to FIELDS)
+    """
+    parts = [read_window(p, start, end) for p in paths]
+    parts = [p for p in parts if len(p)] or [EMPTY]
+    return (np.concatenate([p["ts"] for p in parts]),
+            {name: np.concatenate([p[name] for p in parts]) for name in (names or FIELDS)})
+
+
+def to_records(records):
+    """Convert records to the dict format returned by read_csv_data()"""
+    timestamps = [t.isoformat() for t in records["ts"].tolist()]
+    columns = [(records[name] / 1000.0).tolist() for name in POWER_FIELDS]
+    columns += [records[name].astype(np.int64).tolist() for name in SOC_FIELDS]
+    return [{"timestamp": t, **dict(zip(FIELDS, row))}
+            for t, row in zip(timestamps, zip(*columns))]
+
+
+# ---------------------------------------------------------------------
+# CSV conversion
+# ---------------------------------------------------------------------
+def convert_csv(csv_path, bin_path=None):
+    """Convert one CSV archive; returns (bin_path, record count)"""
+    if bin_path is None:
+        bin_path = os.path.splitext(csv_path)[0] + ".bin"
+
+    timestamps = []
+    columns = {name: [] for name in FIELDS}
+    with open(csv_path, "r") as f:
+        for row in csv.DictReader(f):
+            try:
+                datetime.fromisoformat(row["timestamp"])
+                values = [float(row.get(name) or 0) for name in FIELDS]
+            except (ValueError, KeyError, TypeError):
+                continue
+            timestamps.append(row["timestamp"])
+            for name, value in zip(FIELDS, values):
+                columns[name].append(value)
+
+    records = np.zeros(len(timestamps), dtype=RECORD_DTYPE)
+    records["ts"] = np.array(timestamps, dtype="M8[us]")
+    for name in POWER_FIELDS:
+        records[name] = np.round(np.array(columns[name]) * 1000)
+    for name in SOC_FIELDS:
+        records[name] = np.trunc(np.array(columns[name]))
+    records = np.sort(records, order="ts", kind="stable")
+
+    tmp = bin_path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(records.tobytes())
+    os.replace(tmp, bin_path)
+    return bin_path, len(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert Growatt CSV archives to binary")
+    parser.add_argument("paths", nargs="+", help="CSV files or log directories")
+    parser.add_argument("--force", action="store_true", help="Overwrite existing .bin files")
+    args = parser.parse_args()
+
+    csv_files = []
+    for p in args.paths:
+        if os.path.isdir(p):
+            csv_files.extend(sorted(glob.glob(os.path.join(p, "growatt_log_*.csv"))))
+        else:
+            csv_files.append(p)
+
+    for csv_path in csv_files:
+        bin_path = os.path.splitext(csv_path)[0] + ".bin"
+        if os.path.exists(bin_path) and not args.force:
+            print(f"⏭  {bin_path} exists (use --force to overwrite)")
+            continue
+        bin_path, count = convert_csv(csv_path, bin_path)
+        csv_mb = os.path.getsize(csv_path) / (1024 * 1024)
+        bin_mb = os.path.getsize(bin_path) / (1024 * 1024)
+        print(f"✓ {csv_path} -> {bin_path}: {count} records, {csv_mb:.1f} MB -> {bin_mb:.1f} MB")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
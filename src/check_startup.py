@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Startup budget check for api_server.py (run it in CI or before a
+release; exits 1 when a budget is exceeded).
+
+1. Import time: `python -X importtime -c "import api_server"` in a fresh
+   interpreter, best of --runs. Fails if the cumulative time exceeds
+   --import-budget-ms, or if a module that must be deferred to first use
+   (DEFERRED) was imported. Prints the slowest direct imports.
+2. Time to first response: starts `python api_server.py` and polls
+   /api/status until it answers 200; fails above --response-budget-ms.
+   /api/ready is reported too (it stays 503 here: no inverter).
+
+Both use a temporary log directory and an unreachable inverter address.
+
+Usage:
+    python src/check_startup.py --import-budget-ms 600 --response-budget-ms 2000
+"""
+
+import argparse
+import http.client
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Loaded on first use only (polling, poller/worker split)
+DEFERRED = ["pymodbus", "multiprocessing.shared_memory"]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def parse_importtime(stderr):
+    """[(module, self_us, cumulative_us, depth)] from -X importtime output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def measure_import(env):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import api_server"],
+                            cwd=HERE, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import api_server failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def get(port, path):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+    try:
+        conn.request("GET", path)
+        response = conn.getresponse()
+        return response.status, response.read()
+    finally:
+        conn.close()
+
+
+def measure_first_response(env, timeout=30.0):
+    """(ms until /api/status answered 200, /api/ready status)"""
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, os.path.join(HERE, "api_server.py"), "--port", str(port)],
+                              cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                status, _ = get(port, "/api/status")
+                if status == 200:
+                    elapsed = (time.perf_counter() - started) * 1000
+                    return elapsed, get(port, "/api/ready")[0]
+            except (OSError, http.client.HTTPException):
+                pass
+            time.sleep(0.01)
+        raise RuntimeError(f"api_server.py did not answer within {timeout:.0f}s")
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check api_server.py startup time budgets")
+    parser.add_argument("--import-budget-ms", type=float, default=600)
+    parser.add_argument("--response-budget-ms", type=float, default=2000)
+    parser.add_argument("--runs", type=int, default=3, help="Import measurements (best is used)")
+    parser.add_argument("--top", type=int, default=10, help="Slowest direct imports to list")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="growatt-startup-")
+    failures = []
+    try:
+        config_path = os.path.join(tmp, "config.json")
+        with open(config_path, "w") as f:
+            json.dump({"modbus": {"ip": "127.0.0.1", "port": free_port(), "unit_id": 1},
+                       "log_dir": os.path.join(tmp, "logs")}, f)
+        env = dict(os.environ, GROWATT_CONFIG=config_path, GROWATT_ROLE="standalone", PYTHONPATH=HERE)
+
+        runs = [measure_import(env) for _ in range(args.runs)]
+        best = min(runs, key=lambda rows: rows[-1][2])
+        total_ms = best[-1][2] / 1000
+        print(f"import api_server: {total_ms:.0f} ms (best of {args.runs}, budget {args.import_budget_ms:.0f} ms)")
+        direct = sorted((r for r in best if r[3] == 1), key=lambda r: r[2], reverse=True)
+        for name, _, cumulative_us, _ in direct[:args.top]:
+            print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+        if total_ms > args.import_budget_ms:
+            failures.append(f"import time {total_ms:.0f} ms > {args.import_budget_ms:.0f} ms")
+
+        imported = {r[0] for r in best}
+        eager = [m for m in DEFERRED if any(n == m or n.startswith(m + ".") for n in imported)]
+        if eager:
+            failures.append(f"imported at startup instead of on first use: {', '.join(eager)}")
+
+        response_ms, ready_status = measure_first_response(env)
+        print(f"first response (/api/status): {response_ms:.0f} ms (budget {args.response_budget_ms:.0f} ms),"
+              f" /api/ready -> {ready_status}")
+        if response_ms > args.response_budget_ms:
+            failures.append(f"first response {response_ms:.0f} ms > {args.response_budget_ms:.0f} ms")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✓ Startup within budget")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+What-if tariff comparison over the archived history (CLI for
+/api/tariffs/compare).
+
+Loads hourly grid import/export for the range once, then prices it with
+every plan (ZeroHero, config.json "tariffs", plus any plans file):
+
+    python src/compare_tariffs.py --start 2024-07-01 --end 2025-06-30
+    python src/compare_tariffs.py --start 2024-07-01 --end 2025-06-30 \
+        --plans plans.json --only zerohero,flat --monthly
+
+plans.json holds {name: plan} in the tariff.py format.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+
+
+def print_row(label, row):
+    credits = ", ".join(f"{k} {v}d" for k, v in row["credit_days"].items())
+    print(f"  {label:<12} {row['days']:4d}d  import {row['import_kwh']:9.1f} kWh ${row['import_cost']:9.2f}"
+          f"  export {row['export_kwh']:9.1f} kWh ${row['export_earnings']:8.2f}"
+          f"  supply ${row['supply_charge']:7.2f}  demand ${row['demand_charge']:7.2f}"
+          f"  credits ${row['credit_total']:7.2f}  net ${row['net_cost']:9.2f}"
+          + (f"  ({credits})" if credits else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare tariff plans over archived history")
+    parser.add_argument("--start", required=True, help="YYYY-MM-DD")
+    parser.add_argument("--end", help="YYYY-MM-DD (default: today)")
+    parser.add_argument("--config", help="config.json (default: $GROWATT_CONFIG or ./config.json)")
+    parser.add_argument("--plans", help="JSON file with extra plans {name: plan}")
+    parser.add_argument("--only", help="Comma-separated plan names to compare")
+    parser.add_argument("--monthly", action="store_true", help="Print the monthly breakdown")
+    parser.add_argument("--json", action="store_true", help="Print the raw result as JSON")
+    args = parser.parse_args()
+
+    if args.config:
+        os.environ["GROWATT_CONFIG"] = args.config
+    # Imported after GROWATT_CONFIG is set: api_server reads it on import
+    import tariff
+    import api_server
+
+    start = datetime.strptime(args.start, "%Y-%m-%d").date()
+    end = datetime.strptime(args.end, "%Y-%m-%d").date() if args.end else datetime.now().date()
+    if end < start:
+        print("❌ --end is before --start")
+        return 1
+
+    plans = dict(api_server.TARIFF_PLANS)
+    try:
+        if args.plans:
+            with open(args.plans, "r") as f:
+                plans.update(tariff.load_plans(json.load(f)))
+        if args.only:
+            names = args.only.split(",")
+            unknown = [name for name in names if name not in plans]
+            if unknown:
+                print(f"❌ Unknown plans: {', '.join(unknown)} (available: {', '.join(plans)})")
+                return 1
+            plans = {name: plans[name] for name in names}
+    except (OSError, ValueError) as e:
+        print(f"❌ Invalid plans: {e}")
+        return 1
+
+    started = time.perf_counter()
+    results = api_server.compare_tariffs(plans, start, end)
+    elapsed = time.perf_counter() - started
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+
+    print(f"{len(plans)} plans, {start} .. {end} ({(end - start).days + 1} days) in {elapsed:.2f}s\n")
+    for rank, result in enumerate(results, 1):
+        print(f"{rank}. {result['name']} ({result['label']})")
+        print_row("total", result["totals"])
+        if args.monthly:
+            for row in result["monthly"]:
+                print_row(row["month"], row)
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
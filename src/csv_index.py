@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Byte-offset day/hour index for monthly CSV archives.
+
+For growatt_log_YYYY-MM.csv a sidecar growatt_log_YYYY-MM.csv.idx maps
+each day ("2025-11-26") and hour ("2025-11-26T14") to the [start, end)
+byte range of its rows, so readers can seek() straight to the requested
+window instead of parsing the month from the first byte.
+
+- Built lazily on first query.
+- Validated against the file size/mtime on every query; if the file only
+  grew (append-only logging), the index is extended from the last indexed
+  byte instead of being rebuilt.
+- Only complete lines are indexed, so a row being written is picked up by
+  the next extension.
+- Files whose first column is not "timestamp", or whose rows are not in
+  time order, are marked unindexable and callers fall back to a full scan.
+"""
+
+import os
+import io
+import csv
+import json
+from bisect import bisect_left, bisect_right
+from threading import Lock
+
+
+INDEX_VERSION = 1
+INDEX_SUFFIX = ".idx"
+
+_cache = {}
+_cache_lock = Lock()
+
+
+def _empty_index():
+    return {
+        "version": INDEX_VERSION,
+        "indexed_size": 0,   # bytes covered by the index (complete lines only)
+        "file_size": 0,
+        "mtime": 0,
+        "header": None,
+        "usable": True,
+        "days": {},          # "YYYY-MM-DD" -> [start, end)
+        "hours": {},         # "YYYY-MM-DDTHH" -> [start, end)
+    }
+
+
+def _load_sidecar(path):
+    try:
+        with open(path + INDEX_SUFFIX, "r") as f:
+            idx = json.load(f)
+        if idx.get("version") == INDEX_VERSION:
+            return idx
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _save_sidecar(path, idx):
+    tmp = path + INDEX_SUFFIX + ".tmp"
+    try:
+        with open(tmp, "w") as f:
+            json.dump(idx, f)
+        os.replace(tmp, path + INDEX_SUFFIX)
+    except OSError as e:
+        print(f"⚠ Could not write index for {path}: {e}")
+
+
+def _extend(path, idx):
+    """Index complete lines from idx["indexed_size"] to the end of the file"""
+    days = idx["days"]
+    hours = idx["hours"]
+    last_day = max(days) if days else None
+    last_hour = max(hours) if hours else None
+
+    with open(path, "rb") as f:
+        pos = idx["indexed_size"]
+        f.seek(pos)
+
+        if pos == 0:
+            header = f.readline()
+            if not header.endswith(b"\n"):
+                return idx   # header not complete yet
+            idx["header"] = next(csv.reader([header.decode("utf-8")]))
+            if not idx["header"] or idx["header"][0] != "timestamp":
+                idx["usable"] = False
+            pos = len(header)
+
+        if not idx["usable"]:
+            idx["indexed_size"] = pos
+            return idx
+
+        for line in f:
+            if not line.endswith(b"\n"):
+                break   # partial row still being written
+            start = pos
+            pos += len(line)
+
+            ts = line.split(b",", 1)[0].decode("ascii", "ignore")
+            if len(ts) < 13:
+                continue
+            day = ts[:10]
+            hour = ts[:13]
+
+            if day in days:
+                if day != last_day:
+                    idx["usable"] = False   # out of order: can't seek safely
+                    break
+                days[day][1] = pos
+            else:
+                if last_day is not None and day < last_day:
+                    idx["usable"] = False
+                    break
+                days[day] = [start, pos]
+                last_day = day
+
+            if hour in hours and hour == last_hour:
+                hours[hour][1] = pos
+            elif hour not in hours:
+                hours[hour] = [start, pos]
+                last_hour = hour
+
+        idx["indexed_size"] = pos
+
+    return idx
+
+
+def get_index(path):
+    """
+    Return the (possibly freshly extended) index for a CSV file.
+    Persists the sidecar whenever it changes.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+
+    with _cache_lock:
+        idx = _cache.get(path) or _load_sidecar(path)
+
+        if idx is not None and idx["file_size"] == st.st_size and idx["mtime"] == st.st_mtime:
+            _cache[path] = idx
+            return idx
+
+        if idx is None or st.st_size < idx["indexed_size"]:
+            # New file, or truncated/rewritten: rebuild
+            idx = _empty_index()
+
+        idx = _extend(path, idx)
+        idx["file_size"] = st.st_size
+        idx["mtime"] = st.st_mtime
+        _cache[path] = idx
+        _save_sidecar(path, idx)
+        return idx
+
+
+def byte_range(idx, start_key, end_key, level="days"):
+    """
+    [start, end) bytes covering keys start_key..end_key (inclusive) at the
+    given level ("days": YYYY-MM-DD, "hours": YYYY-MM-DDTHH). None if empty.
+    """
+    table = idx[level]
+    keys = sorted(table)
+    lo = bisect_left(keys, start_key)
+    hi = bisect_right(keys, end_key)
+    if lo >= hi:
+        return None
+    return table[keys[lo]][0], table[keys[hi - 1]][1]
+
+
+def read_rows(path, start_key, end_key, level="days"):
+    """
+    Yield csv.DictReader rows for keys start_key..end_key only.
+    Returns None if the file can't be indexed (caller should scan it fully).
+    """
+    idx = get_index(path)
+    if idx is None or not idx["usable"] or not idx["header"]:
+        return None
+
+    rng = byte_range(idx, start_key, end_key, level)
+    if rng is None:
+        return []
+
+    start, end = rng
+    with open(path, "rb") as f:
+        f.seek(start)
+        chunk = f.read(end - start)
+    return csv.DictReader(io.StringIO(chunk.decode("utf-8"), newline=""), fieldnames=idx["header"])
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Per-day pre-aggregated energy rollups.
+
+Each day is stored once as kWh per channel, sample count, average
+interval and gap count:
+
+- Closed days (before today) are computed once from the archive and
+  persisted to a JSON table in log_dir; later lookups are dict reads.
+- Today is maintained incrementally: the poller feeds every sample in,
+  and the first sample of a day primes the row from the archive so a
+  restart mid-day does not lose the morning.
+
+Integration matches calculate_daily_totals: left Riemann sum (each
+reading's power x time until the next reading), skipping intervals that
+are <= 0 or > MAX_INTERVAL_SEC (counted as gaps). energy.py implements
+the same rules vectorized for whole days or months.
+"""
+
+import os
+import json
+from collections import defaultdict
+from datetime import datetime, date
+from threading import Lock
+
+
+MAX_INTERVAL_SEC = 600  # larger gaps are not integrated
+
+# Output key -> sample field
+ENERGY_CHANNELS = {
+    "solar_kwh": "solar",
+    "load_kwh": "load",
+    "grid_export_kwh": "grid_export",
+    "grid_import_kwh": "grid_import",
+    "battery_charge_kwh": "battery_charge",
+    "battery_discharge_kwh": "battery_discharge",
+}
+
+ROLLUP_VERSION = 2
+
+
+class DayAccumulator:
+    """Running energy totals for one day"""
+
+    def __init__(self, day):
+        self.day = day
+        self.kwh = {key: 0.0 for key in ENERGY_CHANNELS}
+        self.count = 0
+        self.interval_sec = 0.0
+        self.interval_count = 0
+        self.gap_count = 0
+        self.gap_sec = 0.0       # time covered by gaps (positive intervals only)
+        self.max_gap_sec = 0.0
+        self.last_ts = None
+        self.last_sample = None
+
+    def add(self, ts, sample):
+        """Add one reading (ts: epoch seconds, sample: dict of kW values)"""
+        if self.last_ts is not None:
+            interval_sec = ts - self.last_ts
+            if interval_sec <= 0 or interval_sec > MAX_INTERVAL_SEC:
+                self.gap_count += 1
+                if interval_sec > 0:
+                    self.gap_sec += interval_sec
+                    self.max_gap_sec = max(self.max_gap_sec, interval_sec)
+            else:
+                interval_hours = interval_sec / 3600.0
+                prev = self.last_sample
+                for key, field in ENERGY_CHANNELS.items():
+                    self.kwh[key] += prev[field] * interval_hours
+                self.interval_sec += interval_sec
+                self.interval_count += 1
+
+        self.count += 1
+        self.resume(ts, sample)
+
+    def resume(self, ts, sample):
+        """Set the reading that the next add() integrates from"""
+        self.last_ts = ts
+        self.last_sample = {field: sample.get(field, 0) or 0 for field in ENERGY_CHANNELS.values()}
+        self.last_sample["grid_import"] = abs(self.last_sample["grid_import"])
+
+    def to_totals(self, method="left"):
+        """Totals in the /api/daily response format"""
+        totals = {"date": self.day.isoformat(), "method": method}
+        totals.update({key: round(v, 2) for key, v in self.kwh.items()})
+        totals["count"] = self.count
+        totals["avg_interval_sec"] = (
+            round(self.interval_sec / self.interval_count, 1) if self.interval_count else 0
+        )
+        totals["gap_count"] = self.gap_count
+        totals["gap_sec"] = round(self.gap_sec, 1)
+        totals["max_gap_sec"] = round(self.max_gap_sec, 1)
+        return totals
+
+    def to_row(self):
+        """Persistable row (unrounded)"""
+        return {
+            "kwh": self.kwh,
+            "count": self.count,
+            "interval_sec": self.interval_sec,
+            "interval_count": self.interval_count,
+            "gap_count": self.gap_count,
+            "gap_sec": self.gap_sec,
+            "max_gap_sec": self.max_gap_sec,
+        }
+
+    @classmethod
+    def from_row(cls, day, row):
+        acc = cls(day)
+        acc.kwh.update(row["kwh"])
+        acc.count = row["count"]
+        acc.interval_sec = row["interval_sec"]
+        acc.interval_count = row["interval_count"]
+        acc.gap_count = row["gap_count"]
+        acc.gap_sec = row.get("gap_sec", 0.0)
+        acc.max_gap_sec = row.get("max_gap_sec", 0.0)
+        return acc
+
+
+def integrate_hourly(points):
+    """
+    Hourly grid export/import kWh for one day of sorted data points, keyed
+    by the hour of each interval's first reading (same interval rules as
+    DayAccumulator). Returns (hourly_export, hourly_import).
+    """
+    hourly_export = defaultdict(float)
+    hourly_import = defaultdict(float)
+
+    prev_t = prev = None
+    for point in points:
+        t = datetime.fromisoformat(point["timestamp"])
+        if prev is not None:
+            interval_sec = (t - prev_t).total_seconds()
+            if 0 < interval_sec <= MAX_INTERVAL_SEC:
+                interval_hours = interval_sec / 3600.0
+                hourly_export[prev_t.hour] += prev["grid_export"] * interval_hours
+                hourly_import[prev_t.hour] += abs(prev["grid_import"]) * interval_hours
+        prev_t, prev = t, point
+
+    return hourly_export, hourly_import
+
+
+class DailyRollupStore:
+    """
+    Persistent day -> totals table.
+
+    compute_day(day) must return a DayAccumulator built from the archive
+    (or memory) for that day; it is called once per closed day and once
+    to prime today.
+    """
+
+    def __init__(self, path, compute_day):
+        self.path = path
+        self.compute_day = compute_day
+        self._table = None     # loaded on first use, not at startup
+        self._today = None
+        self._generation = 0   # bumped by invalidate()
+        self._lock = Lock()
+
+    @property
+    def _rows(self):
+        # Only accessed with the lock held
+        if self._table is None:
+            self._table = self._load()
+        return self._table
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if data.get("version") == ROLLUP_VERSION:
+                return data.get("days", {})
+        except (ValueError, OSError) as e:
+            print(f"⚠ Ignoring unreadable rollup table {self.path}: {e}")
+        return {}
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": ROLLUP_VERSION, "days": self._rows}, f)
+        os.replace(tmp, self.path)
+
+    def add_sample(self, ts, sample):
+        """Feed one new sample (called by the poller after it is archived)"""
+        day = datetime.fromtimestamp(ts).date()
+        with self._lock:
+            if self._today is None or self._today.day != day:
+                if self._today is not None:
+                    self._close(self._today)
+                # Prime from the archive; it may already contain this sample
+                acc = self.compute_day(day)
+                if acc.last_ts is None or acc.last_ts < ts:
+                    acc.add(ts, sample)
+                self._today = acc
+                return
+            self._today.add(ts, sample)
+
+    def prime(self, day):
+        """Build today's row from the archive now instead of on the first sample"""
+        with self._lock:
+            if self._today is None or self._today.day != day:
+                if self._today is not None:
+                    self._close(self._today)
+                self._today = self.compute_day(day)
+
+    def _close(self, acc):
+        if acc.count:
+            self._rows[acc.day.isoformat()] = acc.to_row()
+            self._save()
+
+    def get(self, day):
+        """Totals for one day (today: live incremental row)"""
+        today = date.today()
+        with self._lock:
+            if day == today and self._today is not None and self._today.day == day:
+                return self._today.to_totals()
+            row = self._rows.get(day.isoformat())
+            if row is not None:
+                return DayAccumulator.from_row(day, row).to_totals()
+            generation = self._generation
+
+        if day > today:
+            return DayAccumulator(day).to_totals()
+
+        # Not cached: integrate from the archive outside the lock so the
+        # poller is not blocked while a day is parsed
+        acc = self.compute_day(day)
+        # Don't persist today (still growing) or empty days (the archive
+        # may be imported later), nor a row invalidated while it was computed
+        if day < today and acc.count:
+            with self._lock:
+                if self._generation == generation:
+                    self._rows[day.isoformat()] = acc.to_row()
+                    self._save()
+        return acc.to_totals()
+
+    def invalidate(self, day=None):
+        """Drop cached rows (one day, or all) so they are recomputed"""
+        with self._lock:
+            self._generation += 1
+            if day is None:
+                self._rows.clear()
+            else:
+                self._rows.pop(day.isoformat(), None)
+            self._save()
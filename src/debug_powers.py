@@ -4,6 +4,8 @@ from datetime import datetime
 from pymodbus.client import ModbusTcpClient
 from pymodbus.exceptions import ModbusIOException, ConnectionException
 
+from register_map import SPH_REGISTERS
+
 IP = "192.168.9.242"   # change if needed
 PORT = 502
 UNIT_ID = 1
@@ -35,30 +37,28 @@ def robust_read_input_registers(client, addr, count):
         time.sleep(RETRY_DELAY_SEC)
 
 
-def u32(client, addr):
-    """Read unsigned 32-bit (two input registers)."""
-    regs = robust_read_input_registers(client, addr, 2)
-    if regs is None:
-        return None
-    hi, lo = regs
-    return (hi << 16) | lo
+def fmt_w(raw, name):
+    """Format a raw register value alongside its scaled watts."""
+    if raw is None:
+        return "None"
+    return f"{raw} (={raw * SPH_REGISTERS[name].scale:.1f} W)"
 
 
-def s32(client, addr):
-    """Read signed 32-bit (two input registers)."""
-    val = u32(client, addr)
-    if val is None:
-        return None
-    if val & 0x80000000:
-        val -= 0x100000000
-    return val
+def to_w(raw, name):
+    """Scale a raw register value to watts."""
+    return raw * SPH_REGISTERS[name].scale if raw is not None else None
 
 
-def fmt_w(raw):
-    """Format a raw 0.1W value."""
-    if raw is None:
-        return "None"
-    return f"{raw} (={raw/10.0:.1f} W)"
+# Power registers compared by this script (see register_map.SPH_REGISTERS)
+DEBUG_REGISTERS = [
+    "pv_power",                 # 1/2
+    "load_power_40",            # 40/41
+    "load_power",               # 1037/1038
+    "inverter_load_power",      # 1032/1033
+    "grid_power",               # 1029/1030
+    "battery_charge_power",     # 116/117
+    "battery_discharge_power",  # 1009/1010
+]
 
 
 def main():
@@ -68,32 +68,32 @@ def main():
     ts = datetime.now().isoformat(timespec="seconds")
     print(f"=== Debug read @ {ts} ===")
 
+    # All candidate registers in one snapshot (raw values, scaled below)
+    plan = SPH_REGISTERS.plan(DEBUG_REGISTERS)
+    raw = plan.read(lambda addr, count: robust_read_input_registers(client, addr, count), scaled=False)
+
     # --- PV input power (1/2, 0.1 W) ---
-    pv_raw = u32(client, 1)
-    pv_w = pv_raw / 10.0 if pv_raw is not None else None
+    pv_raw = raw["pv_power"]
+    pv_w = to_w(pv_raw, "pv_power")
 
     # --- Load power: use 40/41 as main instantaneous load (0.1 W) ---
-    load_40_raw = s32(client, 40)       # "watts used on load?"
-    load_40_w = load_40_raw / 10.0 if load_40_raw is not None else None
+    load_40_raw = raw["load_power_40"]       # "watts used on load?"
+    load_40_w = to_w(load_40_raw, "load_power_40")
 
     # 1037/1038: "Total power to load" (looks similar to 40/41 for you)
-    load_1037_raw = s32(client, 1037)
-    load_1037_w = load_1037_raw / 10.0 if load_1037_raw is not None else None
+    load_1037_raw = raw["load_power"]
 
     # 1032/1033 is clearly junk on your inverter; keep for reference only
-    load_1032_raw = s32(client, 1032)
+    load_1032_raw = raw["inverter_load_power"]
 
     # --- Grid power candidate: 1029/1030 (0.1 W) ---
     # We assume: positive = import from grid
-    grid_1029_raw = s32(client, 1029)
-    grid_w = grid_1029_raw / 10.0 if grid_1029_raw is not None else None
+    grid_1029_raw = raw["grid_power"]
+    grid_w = to_w(grid_1029_raw, "grid_power")
 
     # --- Battery charge / discharge registers (raw from inverter) ---
-    chg_116_raw = s32(client, 116)      # "charge power?"
-    dis_1009_raw = s32(client, 1009)    # "Battery discharge power"
-
-    chg_116_w = chg_116_raw / 10.0 if chg_116_raw is not None else None
-    dis_1009_w = dis_1009_raw / 10.0 if dis_1009_raw is not None else None
+    chg_116_raw = raw["battery_charge_power"]      # "charge power?"
+    dis_1009_raw = raw["battery_discharge_power"]  # "Battery discharge power"
 
     # --- Estimated battery power via power balance ---
     # Convention: grid_w > 0 means importing from grid
@@ -117,15 +117,15 @@ def main():
     client.close()
 
     # --- Print results ---
-    print(f"PV (1/2) raw:           {fmt_w(pv_raw)}")
+    print(f"PV (1/2) raw:           {fmt_w(pv_raw, 'pv_power')}")
 
-    print(f"Load 40/41 raw:         {fmt_w(load_40_raw)}  <-- preferred load power")
-    print(f"Total load 1037/1038:   {fmt_w(load_1037_raw)}")
+    print(f"Load 40/41 raw:         {fmt_w(load_40_raw, 'load_power_40')}  <-- preferred load power")
+    print(f"Total load 1037/1038:   {fmt_w(load_1037_raw, 'load_power')}")
 
-    print(f"Grid 1029/1030 raw:     {fmt_w(grid_1029_raw)}  (assumed + = import)")
+    print(f"Grid 1029/1030 raw:     {fmt_w(grid_1029_raw, 'grid_power')}  (assumed + = import)")
 
-    print(f"Batt CHG reg 116/117:   {fmt_w(chg_116_raw)}")
-    print(f"Batt DIS reg 1009/1010: {fmt_w(dis_1009_raw)}")
+    print(f"Batt CHG reg 116/117:   {fmt_w(chg_116_raw, 'battery_charge_power')}")
+    print(f"Batt DIS reg 1009/1010: {fmt_w(dis_1009_raw, 'battery_discharge_power')}")
 
     print("\nEstimated battery power (from PV + Load + Grid):")
     print(f"  Batt_net_est:         {batt_net:.1f} W (charge>0, discharge<0)" if batt_net is not None else "  Batt_net_est:         None")
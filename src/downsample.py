@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Downsampling for the history endpoints (?downsample=stride|lttb|minmax).
+
+Every mode returns exactly `limit` row indices (all rows when there are
+no more than limit), sorted, so the result can index any column:
+
+- "stride": evenly spaced rows, ceil(k * n / limit) for k < limit
+- "lttb":   Largest-Triangle-Three-Buckets. The first and last rows are
+            kept, the rest is split into limit - 2 buckets and each bucket
+            keeps the row forming the largest triangle with the previous
+            pick and the mean of the next bucket. Keeps the visual shape,
+            including short spikes.
+- "minmax": limit // 2 buckets, each keeping its highest and lowest row
+            (plus the last row when limit is odd). Keeps every bucket's
+            extremes, e.g. export spikes and battery transitions.
+
+Several channels are handled together: lttb sums the triangle areas of
+every channel, minmax keeps the rows with the largest upward / downward
+deviation from the bucket mean over all channels. Channels are scaled by
+their value range so kW and % weigh the same. All modes are linear in
+the number of rows (lttb loops over buckets, not rows).
+"""
+
+import numpy as np
+
+
+MODES = ("stride", "lttb", "minmax")
+
+
+def stride_indices(n, limit):
+    """Exactly min(n, limit) evenly spaced indices"""
+    if not limit or n <= limit:
+        return np.arange(n)
+    return -((-np.arange(limit) * n) // limit)
+
+
+def _scaled(columns, n):
+    """(channels, n) float array, each channel divided by its value range"""
+    if not columns:
+        return np.zeros((1, n))
+    values = np.array([np.asarray(c, dtype=np.float64) for c in columns])
+    span = values.max(axis=1, keepdims=True) - values.min(axis=1, keepdims=True)
+    return values / np.where(span > 0, span, 1.0)
+
+
+def _bucket_edges(lo, hi, buckets):
+    """buckets + 1 edges splitting rows lo..hi-1 as evenly as possible"""
+    return lo + (np.arange(buckets + 1) * (hi - lo)) // buckets
+
+
+def lttb_indices(x, columns, limit):
+    """Largest-Triangle-Three-Buckets over x (e.g. epoch seconds) and columns"""
+    n = len(x)
+    if not limit or n <= limit:
+        return np.arange(n)
+    if limit < 3:
+        return stride_indices(n, limit)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = _scaled(columns, n)
+    edges = _bucket_edges(1, n - 1, limit - 2)
+
+    # Mean point of every bucket (the "next bucket" of the previous one);
+    # the last bucket's successor is the final row
+    sizes = np.diff(edges)
+    x_mean = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / sizes
+    y_mean = np.add.reduceat(y[:, 1:n - 1], edges[:-1] - 1, axis=1) / sizes
+    x_next = np.append(x_mean[1:], x[-1])
+    y_next = np.concatenate([y_mean[:, 1:], y[:, -1:]], axis=1)
+
+    picks = np.empty(limit, dtype=np.intp)
+    picks[0], picks[-1] = 0, n - 1
+    a = 0
+    for i in range(limit - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Twice the triangle area (a, candidate, next bucket mean), summed over channels
+        area = np.abs((x[a] - x_next[i]) * (y[:, lo:hi] - y[:, a:a + 1])
+                      - (x[a] - x[lo:hi]) * (y_next[:, i:i + 1] - y[:, a:a + 1])).sum(axis=0)
+        a = lo + int(np.argmax(area))
+        picks[i + 1] = a
+    return picks
+
+
+def minmax_indices(columns, limit):
+    """Highest and lowest row of each of limit // 2 buckets (+ last row if limit is odd)"""
+    n = len(columns[0]) if columns else 0
+    if not limit or n <= limit:
+        return np.arange(n)
+    if limit < 2:
+        return stride_indices(n, limit)
+
+    y = _scaled(columns, n)
+    buckets = limit // 2
+    # With an odd limit the last row is kept on its own
+    end = n - 1 if limit % 2 else n
+    edges = _bucket_edges(0, end, buckets)
+    starts, sizes = edges[:-1], np.diff(edges)
+    bucket = np.repeat(np.arange(buckets), sizes)
+
+    # Deviation from the bucket mean, strongest channel up / down
+    mean = np.add.reduceat(y[:, :end], starts, axis=1) / sizes
+    deviation = y[:, :end] - mean[:, bucket]
+    high = deviation.max(axis=0)
+    low = deviation.min(axis=0)
+
+    # First row reaching each bucket's extreme (linear, no sort)
+    rows = np.arange(end)
+    high_at = np.minimum.reduceat(np.where(high == np.maximum.reduceat(high, starts)[bucket], rows, end), starts)
+    low_at = np.minimum.reduceat(np.where(low == np.minimum.reduceat(low, starts)[bucket], rows, end), starts)
+
+    # Flat bucket (both extremes on one row): keep its other end instead
+    other = np.where(low_at == starts, edges[1:] - 1, starts)
+    low_at = np.where(low_at == high_at, other, low_at)
+
+    picks = np.sort(np.concatenate([high_at, low_at]))
+    if limit % 2:
+        picks = np.append(picks, n - 1)
+    return picks
+
+
+def indices(x, columns, limit, mode="stride"):
+    """
+    Row indices selected by mode (one of MODES).
+
+    x:       row positions, e.g. epoch seconds (used by lttb)
+    columns: list of value arrays to preserve (used by lttb / minmax)
+    """
+    if mode == "stride":
+        return stride_indices(len(x), limit)
+    if mode == "lttb":
+        return lttb_indices(x, columns, limit)
+    if mode == "minmax":
+        return minmax_indices(columns, limit)
+    raise ValueError(f"downsample must be one of {', '.join(MODES)}")
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Streaming state for today's ZeroHero earnings.
+
+/api/earnings/today used to re-read and re-integrate the whole day on
+every request. Instead the poller feeds each sample into an
+EarningsAccumulator that keeps the per-hour grid export/import buckets
+(the only inputs of the ZeroHero rules: window qualification, super
+export cap, regular FIT), so the endpoint only summarizes 24 buckets.
+
+- Same interval rules as integrate_hourly() in daily_rollup.py: each
+  interval is credited to the hour of its first reading, intervals <= 0
+  or > MAX_INTERVAL_SEC are skipped.
+- The state is checkpointed to a small JSON file every
+  CHECKPOINT_INTERVAL_SEC; after a restart only the samples archived after
+  the checkpoint are replayed.
+"""
+
+import os
+import json
+import time
+from collections import defaultdict
+from datetime import datetime
+from threading import Lock
+
+from daily_rollup import MAX_INTERVAL_SEC
+
+
+CHECKPOINT_INTERVAL_SEC = 60
+CHECKPOINT_VERSION = 1
+
+
+class EarningsAccumulator:
+    """Hourly grid export/import kWh for one day, updated per sample"""
+
+    def __init__(self, day):
+        self.day = day
+        self.hourly_export = defaultdict(float)
+        self.hourly_import = defaultdict(float)
+        self.count = 0
+        self.last_time = None        # naive local datetime of the last reading
+        self.last_export = 0.0
+        self.last_import = 0.0
+
+    def add(self, t, sample):
+        """Add one reading (t: naive local datetime, sample: dict of kW values)"""
+        if self.last_time is not None:
+            interval_sec = (t - self.last_time).total_seconds()
+            if 0 < interval_sec <= MAX_INTERVAL_SEC:
+                interval_hours = interval_sec / 3600.0
+                hour = self.last_time.hour
+                self.hourly_export[hour] += self.last_export * interval_hours
+                self.hourly_import[hour] += self.last_import * interval_hours
+
+        self.count += 1
+        self.last_time = t
+        self.last_export = sample.get("grid_export", 0) or 0
+        self.last_import = abs(sample.get("grid_import", 0) or 0)
+
+    def to_row(self):
+        return {
+            "day": self.day.isoformat(),
+            # JSON keys are strings; lists keep the bucket insertion order
+            "hourly_export": list(self.hourly_export.items()),
+            "hourly_import": list(self.hourly_import.items()),
+            "count": self.count,
+            "last_time": self.last_time.isoformat() if self.last_time else None,
+            "last_export": self.last_export,
+            "last_import": self.last_import,
+        }
+
+    @classmethod
+    def from_row(cls, row):
+        acc = cls(datetime.fromisoformat(row["day"]).date())
+        acc.hourly_export.update((int(h), kwh) for h, kwh in row["hourly_export"])
+        acc.hourly_import.update((int(h), kwh) for h, kwh in row["hourly_import"])
+        acc.count = row["count"]
+        acc.last_time = datetime.fromisoformat(row["last_time"]) if row["last_time"] else None
+        acc.last_export = row["last_export"]
+        acc.last_import = row["last_import"]
+        return acc
+
+
+class EarningsTracker:
+    """
+    Today's EarningsAccumulator plus its checkpoint file.
+
+    load_since(day, after) must return the archived records of that day
+    with a timestamp after the given datetime (all of them if after is None),
+    sorted by time; it is used to rebuild today after a restart.
+    """
+
+    def __init__(self, path, load_since):
+        self.path = path
+        self.load_since = load_since
+        self._today = None
+        self._last_checkpoint = 0.0
+        self._lock = Lock()
+
+    def _load_checkpoint(self, day):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if data.get("version") == CHECKPOINT_VERSION and data["row"]["day"] == day.isoformat():
+                return EarningsAccumulator.from_row(data["row"])
+        except (OSError, ValueError, KeyError) as e:
+            if os.path.exists(self.path):
+                print(f"⚠ Ignoring unreadable earnings checkpoint {self.path}: {e}")
+        return None
+
+    def _save_checkpoint(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": CHECKPOINT_VERSION, "row": self._today.to_row()}, f)
+        os.replace(tmp, self.path)
+        self._last_checkpoint = time.monotonic()
+
+    def _prime(self, day):
+        """Checkpoint (if it is for this day) plus the archive after it"""
+        acc = self._load_checkpoint(day) or EarningsAccumulator(day)
+        for point in self.load_since(day, acc.last_time):
+            acc.add(datetime.fromisoformat(point["timestamp"]), point)
+        return acc
+
+    def prime(self, day):
+        """Load today from the checkpoint and archive now instead of on the first sample"""
+        with self._lock:
+            if self._today is None or self._today.day != day:
+                if self._today is not None:
+                    self._save_checkpoint()
+                self._today = self._prime(day)
+
+    def add_sample(self, t, sample):
+        """Feed one new sample (called by the poller after it is archived)"""
+        with self._lock:
+            if self._today is None or self._today.day != t.date():
+                if self._today is not None:
+                    self._save_checkpoint()
+                # The archive may already contain this sample
+                self._today = self._prime(t.date())
+                if self._today.last_time is not None and self._today.last_time >= t:
+                    return
+            self._today.add(t, sample)
+
+            if time.monotonic() - self._last_checkpoint >= CHECKPOINT_INTERVAL_SEC:
+                self._save_checkpoint()
+
+    def get(self, day):
+        """(count, hourly_export, hourly_import) for day if it is live, else None"""
+        with self._lock:
+            acc = self._today
+            if acc is None or acc.day != day:
+                return None
+            return acc.count, dict(acc.hourly_export), dict(acc.hourly_import)
+
+    def checkpoint(self):
+        with self._lock:
+            if self._today is not None:
+                self._save_checkpoint()
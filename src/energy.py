@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Vectorized energy integration over timestamp/power arrays.
+
+Same rules as DayAccumulator (daily_rollup.py), but one NumPy pass over a
+day, a month or any range split into periods:
+
+- intervals are np.diff(ts); intervals <= 0 or > MAX_INTERVAL_SEC are
+  gaps and are not integrated
+- "left": each reading's power x time until the next reading (the
+  Riemann sum used by the rest of the server)
+- "trapezoid": mean of both readings x interval
+- abs() is applied to grid_import only
+- intervals that cross a period boundary (e.g. midnight) belong to neither
+  period, just as a per-day loop never pairs the last reading of one day
+  with the first of the next
+
+Results use the DayAccumulator row format plus gap statistics, so
+DayAccumulator.from_row() accepts them directly.
+"""
+
+from datetime import datetime
+
+import numpy as np
+
+from daily_rollup import ENERGY_CHANNELS, MAX_INTERVAL_SEC
+
+
+METHODS = ("left", "trapezoid")
+
+US_PER_HOUR = 3600 * 1_000_000
+
+
+def local_epoch(wall):
+    """
+    Epoch seconds for naive local wall-clock datetime64 values (what
+    datetime.timestamp() returns for the archive timestamps).
+    """
+    wall = np.asarray(wall, dtype="M8[us]")
+    if not len(wall):
+        return np.zeros(0)
+
+    seconds = (wall - np.datetime64(0, "us")).astype(np.int64) / 1e6
+    first, last = wall[0].item(), wall[-1].item()
+    offset = first.timestamp() - seconds[0]
+    if abs(last.timestamp() - seconds[-1] - offset) < 1e-3:
+        # Same UTC offset at both ends: no DST change in between
+        return seconds + offset
+    # Range spans a DST change: convert each value
+    return np.array([t.timestamp() for t in wall.tolist()])
+
+
+def arrays_from_records(records, fields=None):
+    """
+    (wall-clock datetime64, {field: float64 array}) from read_csv_data()-style
+    records; fields defaults to the ENERGY_CHANNELS fields
+    """
+    wall = np.array([r["timestamp"] for r in records], dtype="M8[us]")
+    columns = {
+        field: np.fromiter((r.get(field, 0) or 0 for r in records), dtype=np.float64, count=len(records))
+        for field in (fields or ENERGY_CHANNELS.values())
+    }
+    return wall, columns
+
+
+def columns_from_records(records):
+    """(epoch seconds, {field: float64 array}) from read_csv_data()-style records"""
+    wall, columns = arrays_from_records(records)
+    return local_epoch(wall), columns
+
+
+def columns_from_window(window):
+    """
+    (epoch seconds, {field: float64 array}) from HistoryBuffer.window(),
+    rounded to 3 decimals like history_buffer.to_records()
+    """
+    columns = {
+        field: np.round(window[field].astype(np.float64), 3)
+        for field in ENERGY_CHANNELS.values()
+    }
+    return window["timestamp"], columns
+
+
+def integrate_periods(ts, columns, edges, method="left"):
+    """
+    Integrate every period [edges[i], edges[i + 1]) of sorted samples.
+
+    ts:      epoch seconds (sorted)
+    columns: {field: power array in kW} for the ENERGY_CHANNELS fields
+    edges:   period boundaries in epoch seconds (len(edges) - 1 periods)
+
+    Returns one row per period:
+        {"kwh": {key: kWh}, "count", "interval_sec", "interval_count",
+         "gap_count", "gap_sec", "max_gap_sec"}
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}")
+
+    ts = np.asarray(ts, dtype=np.float64)
+    edges = np.asarray(edges, dtype=np.float64)
+    n_periods = len(edges) - 1
+
+    # Period of every sample (-1 / n_periods: outside all periods)
+    period = np.searchsorted(edges, ts, side="right") - 1
+    inside = (period >= 0) & (period < n_periods)
+    counts = np.bincount(period[inside], minlength=n_periods)
+
+    # Intervals, assigned to the period of their first reading
+    dt = np.diff(ts)
+    p = period[:-1]
+    same = (p == period[1:]) & (p >= 0) & (p < n_periods)
+    valid = same & (dt > 0) & (dt <= MAX_INTERVAL_SEC)
+    gap = same & ~valid
+    hours = np.where(valid, dt, 0.0) / 3600.0
+    p_valid = np.where(same, p, 0)
+
+    def per_period(weights, mask):
+        return np.bincount(p_valid[mask], weights=weights[mask], minlength=n_periods)
+
+    kwh = {}
+    for key, field in ENERGY_CHANNELS.items():
+        power = np.asarray(columns[field], dtype=np.float64)
+        if field == "grid_import":
+            power = np.abs(power)
+        if method == "left":
+            interval_kwh = power[:-1] * hours
+        else:
+            interval_kwh = (power[:-1] + power[1:]) * 0.5 * hours
+        kwh[key] = per_period(interval_kwh, valid)
+
+    interval_sec = per_period(dt, valid)
+    interval_count = np.bincount(p_valid[valid], minlength=n_periods)
+    gap_count = np.bincount(p_valid[gap], minlength=n_periods)
+    positive_gap = gap & (dt > 0)
+    gap_sec = per_period(dt, positive_gap)
+    max_gap_sec = np.zeros(n_periods)
+    np.maximum.at(max_gap_sec, p_valid[positive_gap], dt[positive_gap])
+
+    return [{
+        "kwh": {key: float(kwh[key][i]) for key in ENERGY_CHANNELS},
+        "count": int(counts[i]),
+        "interval_sec": float(interval_sec[i]),
+        "interval_count": int(interval_count[i]),
+        "gap_count": int(gap_count[i]),
+        "gap_sec": float(gap_sec[i]),
+        "max_gap_sec": float(max_gap_sec[i]),
+    } for i in range(n_periods)]
+
+
+def integrate(ts, columns, method="left"):
+    """Integrate all samples as one period"""
+    if not len(ts):
+        return integrate_periods(np.zeros(0), columns, [0.0, 1.0], method)[0]
+    return integrate_periods(ts, columns, [ts[0], np.nextafter(ts[-1], np.inf)], method)[0]
+
+
+def hourly_by_day(wall, columns, start_date, end_date):
+    """
+    Hourly grid export/import kWh for every day of the range in one pass
+    (same rules as daily_rollup.integrate_hourly(), applied per day).
+
+    wall:    naive local wall-clock datetime64 values (sorted)
+    columns: {field: kW array} with grid_export and grid_import
+
+    Returns [(data point count, hourly_export, hourly_import), ...] per day;
+    the dicts only hold hours with at least one integrated interval.
+    """
+    first_day = np.datetime64(start_date, "D").astype(np.int64)
+    n_days = int(np.datetime64(end_date, "D").astype(np.int64) - first_day) + 1
+
+    # Integer microseconds: much cheaper than datetime64 unit conversions
+    us = np.asarray(wall, dtype="M8[us]").view(np.int64)
+    slots = us // US_PER_HOUR - first_day * 24     # (day, hour) as day * 24 + hour
+    day = slots // 24
+    inside = (day >= 0) & (day < n_days)
+    counts = np.bincount(day[inside], minlength=n_days)
+
+    # Interval i is credited to the hour of reading i, within its day
+    dt = np.diff(us) / 1e6
+    valid = ((day[:-1] == day[1:]) & inside[:-1]
+             & (dt > 0) & (dt <= MAX_INTERVAL_SEC))
+    slot = slots[:-1][valid]
+    hours = dt[valid] / 3600.0
+
+    export_kwh = np.asarray(columns["grid_export"], dtype=np.float64)[:-1][valid] * hours
+    import_kwh = np.abs(np.asarray(columns["grid_import"], dtype=np.float64))[:-1][valid] * hours
+    n_slots = n_days * 24
+    export_sum = np.bincount(slot, weights=export_kwh, minlength=n_slots)
+    import_sum = np.bincount(slot, weights=import_kwh, minlength=n_slots)
+    used = np.bincount(slot, minlength=n_slots) > 0
+
+    results = []
+    for i in range(n_days):
+        hours_used = np.flatnonzero(used[i * 24:(i + 1) * 24])
+        results.append((
+            int(counts[i]),
+            {int(h): float(export_sum[i * 24 + h]) for h in hours_used},
+            {int(h): float(import_sum[i * 24 + h]) for h in hours_used},
+        ))
+    return results
+
+
+def day_edges(start_date, end_date):
+    """Local-midnight boundaries (epoch seconds) for start_date..end_date"""
+    days = np.arange(np.datetime64(start_date, "D"), np.datetime64(end_date, "D") + 2)
+    return np.array([datetime.combine(d, datetime.min.time()).timestamp() for d in days.tolist()])
@@ -8,6 +8,9 @@ from datetime import datetime
 from pymodbus.client import ModbusTcpClient
 from pymodbus.exceptions import ModbusIOException, ConnectionException
 
+from register_map import SPH_REGISTERS, POLL_REGISTERS
+from log_sink import LogSink
+
 
 # ---------------------------------------------------------------------
 # Default configuration (used if no config file is found)
@@ -22,6 +25,9 @@ DEFAULT_CONFIG = {
     "output": {
         "mode": "log",    # options: log | mqtt | both
         "log_file": "growatt_log.csv",
+        "log_batch_size": 10,       # rows per write (log_sink.py)
+        "log_flush_interval": 300,  # seconds a row may wait; bounds crash loss
+        "log_fsync": False,
         "mqtt": {
             "enabled": False,
             "host": "127.0.0.1",
@@ -116,28 +122,6 @@ def robust_read_input_registers(client, addr, count, unit_id):
         time.sleep(RETRY_DELAY_SEC)
 
 
-def read_input_u32(client, addr, unit_id):
-    regs = robust_read_input_registers(client, addr, 2, unit_id)
-    if regs is None:
-        return None
-    hi, lo = regs
-    return (hi << 16) | lo
-
-
-def read_input_s32(client, addr, unit_id):
-    v = read_input_u32(client, addr, unit_id)
-    if v is None:
-        return None
-    if v & 0x80000000:
-        v -= 0x100000000
-    return v
-
-
-def read_input_u16(client, addr, unit_id):
-    regs = robust_read_input_registers(client, addr, 1, unit_id)
-    return None if regs is None else regs[0]
-
-
 # ---------------------------------------------------------------------
 # Logging utilities
 # ---------------------------------------------------------------------
@@ -162,12 +146,6 @@ def ensure_log_header(path):
         print(f"✔ Created log file with header: {path}")
 
 
-def append_log_row(path, row):
-    with open(path, "a", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(row)
-
-
 # ---------------------------------------------------------------------
 # MQTT support
 # ---------------------------------------------------------------------
@@ -231,31 +209,39 @@ def main():
 
     mqtt_client = MQTTClientWrapper(mqtt_cfg)
 
+    log_sink = None
     if output_mode in ("log", "both"):
         ensure_log_header(log_path)
+        log_sink = LogSink(
+            LOG_HEADER,
+            batch_size=cfg["output"].get("log_batch_size", 10),
+            flush_interval=cfg["output"].get("log_flush_interval", 300),
+            fsync=cfg["output"].get("log_fsync", False),
+        )
 
     client = ModbusTcpClient(ip, port=port)
+    plan = SPH_REGISTERS.plan(POLL_REGISTERS)
+
+    def read_block(addr, count):
+        return robust_read_input_registers(client, addr, count, unit_id)
 
     print(f"Growatt Monitor started. Sampling every {interval} seconds...")
     print(f"Modbus: {ip}:{port}, UnitID={unit_id}")
     print(f"Output mode: {output_mode}")
+    print(f"Register plan: {plan.describe()}")
     print("----------------------------------------------")
 
     try:
         while True:
             ts = datetime.now().isoformat(timespec="seconds")
 
-            # PV
-            pv_raw = read_input_u32(client, 1, unit_id)
-            pv = pv_raw / 10.0 if pv_raw is not None else None
-
-            # Grid
-            grid_raw = read_input_s32(client, 1029, unit_id)
-            grid = grid_raw / 10.0 if grid_raw is not None else None
+            # All registers in one snapshot (coalesced block reads)
+            values = plan.read(read_block)
 
-            # Load
-            load_raw = read_input_s32(client, 1037, unit_id)
-            load = load_raw / 10.0 if load_raw is not None else None
+            # PV / Grid / Load (W, scaled by the register map)
+            pv = values["pv_power"]
+            grid = values["grid_power"]
+            load = values["load_power"]
 
             # Battery (energy balance)
             if pv is not None and load is not None and grid is not None:
@@ -266,8 +252,8 @@ def main():
                 net = charge = discharge = None
 
             # SOC
-            soc_inv = read_input_u16(client, 1014, unit_id)
-            soc_bms = read_input_u16(client, 1086, unit_id)
+            soc_inv = values["soc_inv"]
+            soc_bms = values["soc_bms"]
 
             # Print summary line
             print(
@@ -283,7 +269,7 @@ def main():
                     charge, discharge, net,
                     soc_inv, soc_bms
                 ]
-                append_log_row(log_path, row)
+                log_sink.write(log_path, row)
 
             # Publish MQTT
             if output_mode in ("mqtt", "both"):
@@ -304,6 +290,8 @@ def main():
     except KeyboardInterrupt:
         print("\nUser interrupted. Exiting...")
     finally:
+        if log_sink is not None:
+            log_sink.close()
         client.close()
 
 
@@ -5,6 +5,8 @@ import argparse
 from pymodbus.client import ModbusTcpClient
 from pymodbus.exceptions import ModbusIOException, ConnectionException
 
+from register_map import SPH_REGISTERS, POLL_REGISTERS
+
 
 # ---------------------------------------------------------------------
 # Default configuration (used if no config.json is provided)
@@ -97,28 +99,6 @@ def robust_read_input_registers(client, addr, count, unit_id, timeout, delay):
         time.sleep(delay)
 
 
-def read_input_u16(client, addr, unit_id, timeout, delay):
-    regs = robust_read_input_registers(client, addr, 1, unit_id, timeout, delay)
-    return None if regs is None else regs[0]
-
-
-def read_input_u32(client, addr, unit_id, timeout, delay):
-    regs = robust_read_input_registers(client, addr, 2, unit_id, timeout, delay)
-    if regs is None:
-        return None
-    hi, lo = regs
-    return (hi << 16) | lo
-
-
-def read_input_s32(client, addr, unit_id, timeout, delay):
-    val = read_input_u32(client, addr, unit_id, timeout, delay)
-    if val is None:
-        return None
-    if val & 0x80000000:
-        val -= 0x100000000
-    return val
-
-
 # ---------------------------------------------------------------------
 # Reader demo: prints a single snapshot of inverter values
 # ---------------------------------------------------------------------
@@ -134,23 +114,20 @@ def read_once(cfg):
 
     print(f"\nReading Growatt inverter @ {ip}:{port} (unit {unit_id})…")
 
-    # PV input power
-    pv_raw = read_input_u32(client, 1, unit_id, timeout, delay)
-    pv = pv_raw / 10 if pv_raw is not None else None
-
-    # Grid power (+ import, – export)
-    grid_raw = read_input_s32(client, 1029, unit_id, timeout, delay)
-    grid = grid_raw / 10 if grid_raw is not None else None
-
-    # Load power
-    load_raw = read_input_s32(client, 1037, unit_id, timeout, delay)
-    load = load_raw / 10 if load_raw is not None else None
+    # One snapshot of all registers (coalesced block reads)
+    plan = SPH_REGISTERS.plan(POLL_REGISTERS)
+    values = plan.read(
+        lambda addr, count: robust_read_input_registers(client, addr, count, unit_id, timeout, delay)
+    )
 
-    # Battery SOC (inverter)
-    soc_inv = read_input_u16(client, 1014, unit_id, timeout, delay)
+    # PV input power / grid power (+ export, – import) / load power, in W
+    pv = values["pv_power"]
+    grid = values["grid_power"]
+    load = values["load_power"]
 
-    # Battery SOC (BMS)
-    soc_bms = read_input_u16(client, 1086, unit_id, timeout, delay)
+    # Battery SOC (inverter / BMS)
+    soc_inv = values["soc_inv"]
+    soc_bms = values["soc_bms"]
 
     # Energy balance battery power
     if pv is not None and load is not None and grid is not None:
@@ -171,6 +148,8 @@ def read_once(cfg):
     print(f"Battery Net Charging:  {batt_net} W")
     print(f"SOC (Inverter 1014):   {soc_inv} %")
     print(f"SOC (BMS 1086):        {soc_bms} %")
+    print(f"Battery Temp (1040):   {values['battery_temp']} °C")
+    print(f"BMS Cycles (1095):     {values['bms_cycle_count']}")
     print("-------------------------\n")
 
 
@@ -0,0 +1,84 @@
+"""
+gunicorn settings for production serving:
+
+    gunicorn -c src/gunicorn.conf.py wsgi:app
+
+Starts the poller process (poller_service.py) once in the gunicorn
+master, then the HTTP workers (wsgi.py). Environment:
+
+- PORT:             listen port (default 5002)
+- WEB_CONCURRENCY:  worker processes (default 2)
+- GUNICORN_THREADS: threads per worker (default 32); every open
+                    /api/stream or /api/ws connection holds one
+- GROWATT_POLLER:   "external" when the poller runs as its own service
+
+Do not enable preload_app: each worker starts its own live-event thread
+when it imports wsgi.py.
+"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+from state_service import socket_path
+
+POLLER_START_TIMEOUT_SEC = 30
+
+pythonpath = HERE
+bind = f"0.0.0.0:{os.getenv('PORT', '5002')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "32"))
+
+poller = None
+
+
+def load_config():
+    path = os.getenv("GROWATT_CONFIG", "./config.json")
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return {}
+
+
+def poller_ready(path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+def on_starting(server):
+    global poller
+    if os.getenv("GROWATT_POLLER", "spawn") == "external":
+        return
+
+    path = socket_path(load_config())
+    poller = subprocess.Popen([sys.executable, os.path.join(HERE, "poller_service.py")])
+
+    # Workers retry, but start serving with the poller's state in place
+    deadline = time.monotonic() + POLLER_START_TIMEOUT_SEC
+    while not poller_ready(path) and time.monotonic() < deadline:
+        if poller.poll() is not None:
+            raise RuntimeError(f"poller exited with code {poller.returncode}")
+        time.sleep(0.1)
+    server.log.info("Poller started (pid %s, %s)", poller.pid, path)
+
+
+def on_exit(server):
+    if poller is not None and poller.poll() is None:
+        poller.terminate()
+        try:
+            poller.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            poller.kill()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Fixed-size columnar ring buffer for in-memory history.
+
+Replaces the list-of-dicts historical_data in api_server.py:
+
+- Preallocated NumPy columns: float64 epoch-seconds timestamps plus one
+  float32 column per field (56 bytes/sample, ~5.6 MB for 100k samples).
+  Records keep every field of the old list-of-dicts history: battery_temp
+  and bms_cycle_count are NaN when unknown (None in records), connected
+  is 0/1.
+- O(1) append, no per-sample Python objects.
+- O(log n) time-window lookup by binary search on the timestamp column.
+- window() copies the matching rows while holding the lock (one slice
+  per column, two when the range wraps around the physical end of the
+  ring), so later appends can never change a result being read.
+"""
+
+from datetime import datetime
+from threading import Lock
+
+import numpy as np
+
+
+# Fields kept per sample (same as the CSV archive columns)
+HISTORY_FIELDS = [
+    "solar",
+    "load",
+    "grid_export",
+    "grid_import",
+    "battery_charge",
+    "battery_discharge",
+    "battery_net",
+    "soc_inv",
+    "soc_bms",
+    "battery_temp",
+    "bms_cycle_count",
+    "connected",
+]
+
+# Fields serialized as integers in records
+INT_FIELDS = {"soc_inv", "soc_bms", "bms_cycle_count"}
+# Fields that may be unknown: stored as NaN, serialized as None
+OPTIONAL_FIELDS = {"battery_temp", "bms_cycle_count"}
+BOOL_FIELDS = {"connected"}
+
+
+def _missing(name):
+    return np.nan if name in OPTIONAL_FIELDS else 0
+
+
+class HistoryBuffer:
+    def __init__(self, capacity, fields=HISTORY_FIELDS):
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+
+        self.capacity = int(capacity)
+        self.fields = list(fields)
+        self.timestamps = np.zeros(self.capacity, dtype=np.float64)
+        self.columns = {name: np.zeros(self.capacity, dtype=np.float32) for name in self.fields}
+
+        self._next = 0      # physical index of the next write
+        self._size = 0
+        self._lock = Lock()
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self):
+        return self.timestamps.nbytes + sum(c.nbytes for c in self.columns.values())
+
+    def append(self, ts, sample):
+        """Append one sample (ts: epoch seconds, sample: dict of field values)"""
+        with self._lock:
+            i = self._next
+            self.timestamps[i] = ts
+            for name, col in self.columns.items():
+                value = sample.get(name)
+                col[i] = _missing(name) if value is None else value
+            self._next = (i + 1) % self.capacity
+            if self._size < self.capacity:
+                self._size += 1
+
+    def extend(self, timestamps, columns):
+        """
+        Append many samples at once, oldest first (timestamps: epoch seconds,
+        columns: {field: values}; missing fields are 0, or NaN for
+        OPTIONAL_FIELDS). Only the newest capacity samples are kept.
+        """
+        timestamps = np.asarray(timestamps, dtype=np.float64)[-self.capacity:]
+        n = len(timestamps)
+        if not n:
+            return
+        with self._lock:
+            idx = (self._next + np.arange(n)) % self.capacity
+            self.timestamps[idx] = timestamps
+            for name, col in self.columns.items():
+                values = columns.get(name)
+                col[idx] = np.asarray(values, dtype=np.float64)[-n:] if values is not None else _missing(name)
+            self._next = (self._next + n) % self.capacity
+            self._size = min(self._size + n, self.capacity)
+
+    def clear(self):
+        with self._lock:
+            self._next = 0
+            self._size = 0
+
+    def _segments(self):
+        """Physical (start, stop) slices in chronological order"""
+        if self._size < self.capacity:
+            return [(0, self._size)]
+        if self._next == 0:
+            return [(0, self.capacity)]
+        return [(self._next, self.capacity), (0, self._next)]
+
+    def last_timestamp(self):
+        with self._lock:
+            if not self._size:
+                return None
+            return float(self.timestamps[(self._next - 1) % self.capacity])
+
+    def window(self, start=None, end=None):
+        """
+        Columns for start <= ts <= end (epoch seconds, either bound optional),
+        oldest first, as {"timestamp": array, field: array, ...}.
+        """
+        with self._lock:
+            parts = []
+            for a, b in self._segments():
+                ts = self.timestamps[a:b]
+                lo = a + (int(np.searchsorted(ts, start, side="left")) if start is not None else 0)
+                hi = a + (int(np.searchsorted(ts, end, side="right")) if end is not None else b - a)
+                if hi > lo:
+                    parts.append((lo, hi))
+
+            if len(parts) == 1:
+                lo, hi = parts[0]
+                # Copied under the lock: append() overwrites the oldest rows
+                # once the ring is full
+                result = {"timestamp": self.timestamps[lo:hi].copy()}
+                result.update({name: col[lo:hi].copy() for name, col in self.columns.items()})
+                return result
+
+            result = {"timestamp": np.concatenate([self.timestamps[lo:hi] for lo, hi in parts])
+                      if parts else self.timestamps[:0]}
+            for name, col in self.columns.items():
+                result[name] = (np.concatenate([col[lo:hi] for lo, hi in parts])
+                                if parts else col[:0])
+            return result
+
+
+def to_records(window, indices=None):
+    """
+    Convert window() columns to the JSON record format used by the API:
+    [{"timestamp": ISO string, "solar": kW, ..., "soc_bms": int}, ...]
+
+    indices optionally selects rows (e.g. after downsampling).
+    """
+    ts = window["timestamp"]
+    if indices is not None:
+        ts = ts[indices]
+
+    columns = {}
+    for name, col in window.items():
+        if name == "timestamp":
+            continue
+        if indices is not None:
+            col = col[indices]
+        if name in BOOL_FIELDS:
+            columns[name] = (col != 0).tolist()
+        elif name in OPTIONAL_FIELDS:
+            values = np.round(col.astype(np.float64), 3)
+            known = ~np.isnan(values)
+            if name in INT_FIELDS:
+                values = np.where(known, values, 0).astype(np.int64)
+            columns[name] = [v if k else None for v, k in zip(values.tolist(), known.tolist())]
+        elif name in INT_FIELDS:
+            columns[name] = col.astype(np.int64).tolist()
+        else:
+            columns[name] = np.round(col.astype(np.float64), 3).tolist()
+
+    timestamps = [datetime.fromtimestamp(t).isoformat() for t in ts.tolist()]
+    names = list(columns)
+    values = [columns[n] for n in names]
+    return [{"timestamp": t, **dict(zip(names, row))} for t, row in zip(timestamps, zip(*values))]
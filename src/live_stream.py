@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Server-Sent Events fan-out for /api/stream.
+
+The poller publishes every event once: it is serialized to SSE text and
+appended, with a sequence number, to one shared ring buffer. Connected
+clients wait on the buffer's condition and write the pre-serialized
+events they have not sent yet, so an event costs one wake-up and one
+socket write per client, and clients never cause Modbus traffic.
+
+- A new client first gets the latest event of every type (current
+  snapshot, today's earnings), then live events.
+- EventSource reconnects with Last-Event-ID; missed events still in the
+  buffer are replayed, a client that fell further behind (or reconnects
+  after a server restart) gets the latest event of every type instead.
+- A comment line is sent every KEEPALIVE_SEC so proxies keep the
+  connection open and disconnected clients are noticed.
+"""
+
+import json
+from collections import deque
+from threading import Condition
+
+
+BUFFER_SIZE = 256        # events kept for Last-Event-ID replay
+KEEPALIVE_SEC = 15
+RETRY_MS = 3000          # EventSource reconnect delay
+
+
+def format_event(seq, event, data):
+    payload = json.dumps(data, separators=(",", ":"))
+    return f"id: {seq}\nevent: {event}\ndata: {payload}\n\n".encode()
+
+
+class Broadcaster:
+    """Single-producer broadcast buffer of SSE events"""
+
+    def __init__(self, size=BUFFER_SIZE):
+        self._events = deque(maxlen=size)   # (seq, event type, SSE bytes)
+        self._latest = {}                   # event type -> (seq, SSE bytes)
+        self._seq = 0
+        self._cond = Condition()
+        self.clients = 0
+
+    def publish(self, event, data):
+        """Send one event (JSON-serializable data) to every client"""
+        with self._cond:
+            self._seq += 1
+            message = format_event(self._seq, event, data)
+            self._events.append((self._seq, event, message))
+            self._latest[event] = (self._seq, message)
+            self._cond.notify_all()
+
+    def _latest_since(self, last_seq, events):
+        return [message for seq, message in sorted(
+            (seq, message) for event, (seq, message) in self._latest.items()
+            if seq > last_seq and (events is None or event in events))]
+
+    def _since(self, last_seq, events):
+        """Messages after last_seq (call with the condition held)"""
+        if last_seq >= self._seq:
+            return []
+        first = self._events[0][0]
+        if last_seq < first - 1:
+            # Missed events already dropped from the buffer
+            return self._latest_since(last_seq, events)
+        return [message for seq, event, message in list(self._events)[last_seq - first + 1:]
+                if events is None or event in events]
+
+    def subscribe(self, last_event_id=None, events=None, keepalive=KEEPALIVE_SEC):
+        """
+        SSE byte chunks for one client (a generator for a streaming
+        response). events optionally limits the event types sent.
+        """
+        with self._cond:
+            self.clients += 1
+            if last_event_id is None or last_event_id > self._seq:
+                backlog = self._latest_since(0, events)
+            else:
+                backlog = self._since(last_event_id, events)
+            last = self._seq
+
+        try:
+            yield f"retry: {RETRY_MS}\n\n".encode()
+            for message in backlog:
+                yield message
+            while True:
+                with self._cond:
+                    if self._seq == last:
+                        self._cond.wait(keepalive)
+                    messages = self._since(last, events)
+                    last = self._seq
+                if messages:
+                    yield b"".join(messages)
+                else:
+                    yield b": keepalive\n\n"
+        finally:
+            with self._cond:
+                self.clients -= 1
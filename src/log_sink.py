@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Buffered CSV log writer with a dedicated I/O thread.
+
+The poller hands rows to write(), which only appends them to a bounded
+queue and never touches the disk. A writer thread keeps the current
+file open (monthly archives roll over when the path changes), and writes
+the queued rows in one batch once batch_size rows are waiting or the
+oldest has waited flush_interval seconds; with fsync=True every batch is
+also fsync()ed. On an SD-card Raspberry Pi this replaces an
+open/stat/append/close per poll with one write per batch.
+
+Crash loss is bounded: a hard kill loses at most the rows not yet
+written, i.e. batch_size rows or flush_interval seconds of polling,
+whichever is smaller. Without fsync, rows already written can still be
+lost on power failure until the OS writes its page cache back (typically
+within 30 seconds on Linux); flush(sync=True) fsyncs on demand (the
+journal compactor, journal.py). close() (atexit) writes everything queued.
+
+If the queue holds max_queue rows (the disk stalled or failed), the
+oldest rows are dropped and counted in `dropped` so the poller never
+blocks.
+"""
+
+import csv
+import os
+import time
+from collections import deque
+from threading import Condition, Thread
+
+
+class LogSink:
+    """
+    Asynchronous append-only CSV writer.
+
+    header:  first row of every new (empty) file, or None
+    """
+
+    def __init__(self, header=None, batch_size=12, flush_interval=30.0, fsync=False, max_queue=1000):
+        self.header = header
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.max_queue = max_queue
+
+        self.dropped = 0
+        self._queue = deque()          # (path, row)
+        self._in_flight = None         # batch taken by the writer, not yet written
+        self._queued = 0               # rows ever queued
+        self._written = 0              # rows ever written (or dropped)
+        self._first_queued_at = None
+        self._flush_requested = False
+        self._sync_requested = False
+        self._syncs = 0                # completed flush(sync=True) requests
+        self._closing = False
+        self._cond = Condition()
+        self._thread = None
+
+        self._path = None
+        self._file = None
+        self._writer = None
+
+    # -----------------------------------------------------------------
+    # Poller side
+    # -----------------------------------------------------------------
+    def write(self, path, row):
+        """Queue one row (list of values) for the CSV file at path"""
+        with self._cond:
+            if self._thread is None:
+                # Started on first use: processes that only read never get one
+                self._thread = Thread(target=self._run, name="log-sink", daemon=True)
+                self._thread.start()
+            if len(self._queue) >= self.max_queue:
+                self._queue.popleft()
+                self.dropped += 1
+                self._written += 1
+                if self.dropped == 1 or self.dropped % 100 == 0:
+                    print(f"⚠ Log queue full, {self.dropped} rows dropped")
+            self._queue.append((path, row))
+            self._queued += 1
+            if self._first_queued_at is None:
+                # Starts the flush_interval timer
+                self._first_queued_at = time.monotonic()
+                self._cond.notify_all()
+            elif len(self._queue) >= self.batch_size:
+                self._cond.notify_all()
+
+    def flush(self, timeout=10.0, sync=False):
+        """
+        Write every queued row now and wait for it (readers whose range
+        reaches oldest_pending() call this first); sync=True also fsyncs
+        the open file
+        """
+        with self._cond:
+            target = self._queued
+            if self._thread is None or (self._written >= target and not sync):
+                return True
+            self._flush_requested = True
+            if sync:
+                self._sync_requested = True
+                syncs = self._syncs + 1
+                done = lambda: self._written >= target and self._syncs >= syncs
+            else:
+                done = lambda: self._written >= target
+            self._cond.notify_all()
+            return self._cond.wait_for(done, timeout)
+
+    def oldest_pending(self):
+        """(path, row) of the oldest row not yet written, or None"""
+        with self._cond:
+            if self._in_flight:
+                return self._in_flight[0]
+            return self._queue[0] if self._queue else None
+
+    def close(self):
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout=10.0)
+
+    # -----------------------------------------------------------------
+    # Writer thread
+    # -----------------------------------------------------------------
+    def _due(self):
+        if self._closing or self._flush_requested or len(self._queue) >= self.batch_size:
+            return True
+        return (self._first_queued_at is not None
+                and time.monotonic() - self._first_queued_at >= self.flush_interval)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not (self._queue and self._due()) and not self._closing and not self._sync_requested:
+                    timeout = None
+                    if self._first_queued_at is not None:
+                        timeout = max(0.0, self._first_queued_at + self.flush_interval - time.monotonic())
+                    self._cond.wait(timeout)
+                batch = list(self._queue)
+                self._in_flight = batch
+                self._queue.clear()
+                self._first_queued_at = None
+                self._flush_requested = False
+                sync, self._sync_requested = self._sync_requested, False
+                closing = self._closing
+
+            try:
+                if batch:
+                    self._write_batch(batch)
+                if sync and self._file is not None:
+                    os.fsync(self._file.fileno())
+            except OSError as e:
+                print(f"⚠ Log write failed ({e}), {len(batch)} rows lost")
+                self._close_file()
+
+            with self._cond:
+                self._in_flight = None
+                self._written += len(batch)
+                self._syncs += sync
+                self._cond.notify_all()
+                if closing and not self._queue:
+                    break
+        self._close_file()
+
+    def _write_batch(self, batch):
+        for path, row in batch:
+            if path != self._path:
+                self._open(path)
+            self._writer.writerow(row)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def _open(self, path):
+        # Month rollover (or a different file): finish the previous one,
+        # durably, since a later flush(sync=True) only covers the new file
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._close_file()
+        self._file = open(path, "a", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._path = path
+        if self.header and self._file.tell() == 0:
+            self._writer.writerow(self.header)
+
+    def _close_file(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+        self._path = self._file = self._writer = None
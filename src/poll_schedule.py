@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Adaptive polling interval ("poll_schedule": "adaptive" in config.json).
+
+With the fixed schedule every device is read every polling_interval
+seconds all day. The adaptive schedule spends the dongle's Modbus
+bandwidth where it affects earnings:
+
+- Windows: inside a configured time window the interval is fixed to the
+  window's interval. By default that is the ZEROHERO window
+  (ZEROHERO_CONFIG zerohero_window_start..end, 18:00-20:00) at 1 s,
+  where 0.03 kWh of import in an hour decides the day credit. Polling
+  switches to the window interval lead_sec before it starts, and a
+  relaxed interval is cut short so the window is never entered late.
+- Outside windows the interval starts at polling_interval. At night
+  (solar below idle_solar_kw) it doubles with every steady sample up to
+  max_interval. Any sample where grid or battery power moved by
+  change_threshold_kw or more since the previous one snaps it back to
+  polling_interval. In daylight it stays at polling_interval.
+
+Options ("adaptive_polling" in config.json, all optional):
+
+    {"max_interval": 60, "change_threshold_kw": 0.3, "idle_solar_kw": 0.05,
+     "lead_sec": 120,
+     "windows": [{"start": 18, "end": 20, "interval": 1, "label": "zerohero"}]}
+
+Window hours are [start, end) local time and may wrap midnight.
+"""
+
+from datetime import datetime, timedelta
+
+
+DEFAULTS = {
+    "max_interval": 60,          # seconds, quiet nights
+    "change_threshold_kw": 0.3,  # grid / battery step that resets the interval
+    "idle_solar_kw": 0.05,       # below this it is night: relaxing allowed
+    "lead_sec": 120,             # start window polling this early
+}
+
+
+def zerohero_windows(zerohero_config, interval=1):
+    """Default windows: the ZEROHERO credit / Super Export window"""
+    return [{
+        "start": zerohero_config["zerohero_window_start"],
+        "end": zerohero_config["zerohero_window_end"],
+        "interval": interval,
+        "label": "zerohero",
+    }]
+
+
+def _in_hours(hour, start, end):
+    if start <= end:
+        return start <= hour < end
+    return hour >= start or hour < end   # wraps midnight
+
+
+class PollScheduler:
+    """
+    Interval to wait before the next poll of one device.
+
+    next_interval(values, now) is called after each successful read with
+    the decoded register values (W); reason is a short label for logs.
+    """
+
+    def __init__(self, base_interval, options=None, windows=None):
+        options = dict(DEFAULTS, **(options or {}))
+        self.base_interval = base_interval
+        self.max_interval = max(options["max_interval"], base_interval)
+        self.change_threshold_w = options["change_threshold_kw"] * 1000
+        self.idle_solar_w = options["idle_solar_kw"] * 1000
+        self.lead = timedelta(seconds=options["lead_sec"])
+        self.windows = options.get("windows", windows or [])
+
+        self.interval = base_interval
+        self.reason = "base"
+        self._last = None   # (grid W, battery W) of the previous sample
+
+    def active_window(self, now):
+        """Window covering now (or starting within lead_sec), else None"""
+        soon = now + self.lead
+        for window in self.windows:
+            for t in (now, soon):
+                if _in_hours(t.hour + t.minute / 60, window["start"], window["end"]):
+                    return window
+        return None
+
+    def seconds_to_next_window(self, now):
+        """Seconds until the lead time of the nearest window start (None without windows)"""
+        best = None
+        for window in self.windows:
+            start = (now.replace(hour=0, minute=0, second=0, microsecond=0)
+                     + timedelta(hours=window["start"]) - self.lead)
+            if start <= now:
+                start += timedelta(days=1)
+            seconds = (start - now).total_seconds()
+            best = seconds if best is None else min(best, seconds)
+        return best
+
+    def next_interval(self, values, now=None):
+        now = now or datetime.now()
+
+        pv, grid, load = values.get("pv_power"), values.get("grid_power"), values.get("load_power")
+        changed = False
+        if None not in (pv, grid, load):
+            battery = pv - load - grid
+            if self._last is not None:
+                changed = max(abs(grid - self._last[0]), abs(battery - self._last[1])) >= self.change_threshold_w
+            self._last = (grid, battery)
+
+        window = self.active_window(now)
+        if window is not None:
+            self.interval, self.reason = window["interval"], window.get("label", "window")
+            return self.interval
+
+        if changed or pv is None or pv >= self.idle_solar_w:
+            self.interval = self.base_interval
+            self.reason = "changing" if changed else "base"
+        else:
+            self.interval = min(max(self.interval * 2, self.base_interval), self.max_interval)
+            self.reason = "idle"
+
+        # Never sleep into a window
+        until_window = self.seconds_to_next_window(now)
+        if until_window is not None and until_window < self.interval:
+            return max(until_window, 1.0)
+        return self.interval
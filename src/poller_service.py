@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Dedicated poller process for production serving.
+
+Polls the inverter(s), archives samples and keeps the in-memory state,
+which HTTP workers (wsgi.py under gunicorn) read over a Unix socket
+(state_service.py). Only one poller can run per socket, so adding HTTP
+workers never adds Modbus traffic.
+
+gunicorn.conf.py starts it automatically; to run it as its own service
+instead (e.g. a separate container), start it directly and set
+GROWATT_POLLER=external for gunicorn:
+
+    GROWATT_CONFIG=config.json python src/poller_service.py
+"""
+
+import os
+import signal
+import sys
+import threading
+
+
+def main():
+    # Read by api_server on import
+    os.environ["GROWATT_ROLE"] = "poller"
+    import api_server
+
+    try:
+        api_server.start_state_server()
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 1
+
+    # SIGTERM from gunicorn / docker: exit normally so atexit checkpoints run
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+
+    api_server.start_polling()
+    print(f"📁 Log directory: {api_server.log_dir}")
+    stop.wait()
+
+    api_server.stop_state_server()
+    print("🛑 Poller stopped")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
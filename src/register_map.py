@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Declarative Growatt SPH register map.
+
+Every register the project reads is described once here: address, width,
+signedness, scale, unit and function code. Pollers build a RegisterPlan from
+the map instead of hard-coding addresses and /10 scaling in each script.
+
+The map can also be extended from docs/registers.md (same format that
+dump_registers.parse_registers_md understands), so undocumented registers
+can be polled without code changes.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from register_plan import MAX_BLOCK_REGS, RegisterPlan
+
+
+# kind -> (struct code, width in registers)
+KIND_LAYOUT = {
+    "u16": ("H", 1),
+    "s16": ("h", 1),
+    "u32": ("I", 2),
+    "s32": ("i", 2),
+}
+
+
+@dataclass(frozen=True)
+class Register:
+    name: str            # key in decoded results
+    addr: int            # first register
+    kind: str = "u16"    # u16 | s16 | u32 | s32 (32-bit values are hi word first)
+    scale: float = 1     # engineering value = raw * scale
+    unit: str = ""
+    fc: int = 4          # 3 = holding, 4 = input
+    desc: str = ""
+
+    def __post_init__(self):
+        if self.kind not in KIND_LAYOUT:
+            raise ValueError(f"Unknown register kind for {self.name}: {self.kind}")
+
+    @property
+    def width(self) -> int:
+        return KIND_LAYOUT[self.kind][1]
+
+    @property
+    def signed(self) -> bool:
+        return self.kind.startswith("s")
+
+    @property
+    def struct_code(self) -> str:
+        return KIND_LAYOUT[self.kind][0]
+
+
+class RegisterMap:
+    """Name -> Register lookup with helpers to build read plans"""
+
+    def __init__(self, registers: Iterable[Register]):
+        self._regs: Dict[str, Register] = {}
+        for r in registers:
+            self._regs[r.name] = r
+
+    def __getitem__(self, name: str) -> Register:
+        return self._regs[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._regs
+
+    def __iter__(self):
+        return iter(self._regs.values())
+
+    def __len__(self) -> int:
+        return len(self._regs)
+
+    def names(self) -> List[str]:
+        return list(self._regs)
+
+    def select(self, names: Iterable[str]) -> List[Register]:
+        return [self._regs[n] for n in names]
+
+    def plan(self, names: Iterable[str], max_count: int = MAX_BLOCK_REGS) -> RegisterPlan:
+        """Build a coalesced read plan for the given register names"""
+        return RegisterPlan(self.select(names), max_count)
+
+    def merged(self, other: "RegisterMap") -> "RegisterMap":
+        """Return a new map with other's registers added (other wins on name clashes)"""
+        return RegisterMap(list(self) + list(other))
+
+    def find(self, fc: int, addr: int) -> Optional[Register]:
+        for r in self._regs.values():
+            if r.fc == fc and r.addr == addr:
+                return r
+        return None
+
+    @classmethod
+    def from_registers_md(cls, path: str, base: Optional["RegisterMap"] = None) -> "RegisterMap":
+        """
+        Load a map from registers.md.
+
+        Entries spanning exactly two registers ("40 & 41") become u32 values,
+        everything else becomes one u16 per register. When an entry starts at
+        an address already typed in base (e.g. 1029 grid power), the base
+        definition is used instead, so scale and sign are kept.
+        """
+        from dump_registers import parse_registers_md
+
+        prefix = {3: "holding", 4: "input"}
+        regs: List[Register] = list(base) if base is not None else []
+
+        for d in parse_registers_md(path):
+            if base is not None and base.find(d.fc, d.start) is not None:
+                continue
+
+            count = d.end - d.start + 1
+            if count == 2:
+                regs.append(Register(f"{prefix[d.fc]}_{d.start}", d.start, "u32",
+                                     fc=d.fc, desc=d.desc))
+                continue
+
+            for addr in range(d.start, d.end + 1):
+                regs.append(Register(f"{prefix[d.fc]}_{addr}", addr, "u16",
+                                     fc=d.fc, desc=d.desc))
+
+        return cls(regs)
+
+
+# ---------------------------------------------------------------------
+# Growatt SPH input registers (FC04)
+# ---------------------------------------------------------------------
+SPH_REGISTERS = RegisterMap([
+    Register("pv_power", 1, "u32", 0.1, "W", desc="PV input power"),
+    Register("load_power_40", 40, "s32", 0.1, "W", desc="Watts used on load? (40-41)"),
+    Register("battery_charge_power", 116, "s32", 0.1, "W", desc="Charge power? (116-117)"),
+    Register("battery_discharge_power", 1009, "s32", 0.1, "W", desc="Battery discharge power"),
+    Register("soc_inv", 1014, "u16", 1, "%", desc="Battery SOC reported by inverter"),
+    Register("ac_power_to_user", 1015, "u32", 0.1, "W", desc="AC power to user"),
+    Register("grid_power", 1029, "s32", 0.1, "W", desc="Grid power (+ export / - import)"),
+    Register("inverter_load_power", 1032, "s32", 0.1, "W", desc="Inverter power to load"),
+    Register("load_power", 1037, "s32", 0.1, "W", desc="Total power to load"),
+    Register("battery_temp", 1040, "s16", 0.1, "°C", desc="Battery temperature"),
+    Register("soc_bms", 1086, "u16", 1, "%", desc="Battery SOC reported by BMS"),
+    Register("bms_cycle_count", 1095, "u16", 1, "", desc="BMS battery cycle count"),
+])
+
+# Registers read on every poll cycle (2 block reads: 1-2, 1014-1095)
+POLL_REGISTERS = [
+    "pv_power",
+    "grid_power",
+    "load_power",
+    "soc_inv",
+    "soc_bms",
+    "battery_temp",
+    "bms_cycle_count",
+]
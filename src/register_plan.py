@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Coalesced Modbus register reads for Growatt SPH inverters.
+
+A RegisterPlan takes a list of register definitions (see register_map.py),
+merges them into the fewest contiguous block reads (the SPH answers at most
+125 registers per request) and decodes every value from the returned buffers.
+
+Decoding is compiled once per plan: each block gets a precomputed big-endian
+struct format with pad bytes over the gaps, so a poll is one unpack per block
+plus one precomputed scale conversion per value - no per-field type branching.
+
+Usage:
+    plan = SPH_REGISTERS.plan(POLL_REGISTERS)
+    values = plan.read(lambda addr, count: robust_read_input_registers(client, addr, count, unit_id))
+    values["grid_power"]  # scaled value in W, or None if its block failed
+"""
+
+import struct
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+
+# Largest block the SPH accepts in a single FC03/FC04 request
+MAX_BLOCK_REGS = 125
+
+
+@dataclass
+class Block:
+    start: int
+    count: int
+    fields: list = field(default_factory=list)
+
+
+def plan_blocks(fields, max_count: int = MAX_BLOCK_REGS) -> List[Block]:
+    """
+    Merge fields into the fewest contiguous blocks of at most max_count registers.
+
+    Fields are sorted by address and packed greedily from the left, which is
+    optimal for covering sorted intervals with fixed-size windows.
+    """
+    blocks: List[Block] = []
+    for f in sorted(fields, key=lambda f: f.addr):
+        if f.width > max_count:
+            raise ValueError(f"Register {f.name} is wider than {max_count} registers")
+
+        end = f.addr + f.width - 1
+        if blocks and end - blocks[-1].start + 1 <= max_count:
+            blk = blocks[-1]
+            blk.count = max(blk.count, end - blk.start + 1)
+            blk.fields.append(f)
+        else:
+            blocks.append(Block(start=f.addr, count=f.width, fields=[f]))
+    return blocks
+
+
+def scale_converter(scale):
+    """
+    Build the raw -> engineering value callable for a scale factor.
+
+    Fractional scales divide by the exact reciprocal (raw / 10 rather than
+    raw * 0.1) so values like 0.3 W don't pick up float noise in logs.
+    """
+    if scale == 1:
+        return int
+    if scale < 1:
+        return float(round(1 / scale, 9)).__rtruediv__
+    return float(scale).__mul__
+
+
+def compile_block(blk: Block):
+    """
+    Compile a block into (struct, names, converters) layers.
+
+    Non-overlapping fields share one struct format; a field that overlaps an
+    earlier one (e.g. the same address decoded as u32 and s32) goes into an
+    extra layer so every format stays a straight left-to-right walk.
+    """
+    layers: List[list] = []
+    for f in blk.fields:
+        for layer in layers:
+            last = layer[-1]
+            if last.addr + last.width <= f.addr:
+                layer.append(f)
+                break
+        else:
+            layers.append([f])
+
+    compiled = []
+    for layer in layers:
+        fmt = ">"
+        pos = blk.start
+        for f in layer:
+            gap = f.addr - pos
+            if gap:
+                fmt += f"{gap * 2}x"
+            fmt += f.struct_code
+            pos = f.addr + f.width
+        compiled.append((
+            struct.Struct(fmt),
+            tuple(f.name for f in layer),
+            tuple(scale_converter(f.scale) for f in layer),
+        ))
+    return compiled
+
+
+class RegisterPlan:
+    """Precomputed block layout and decoders for a fixed set of registers"""
+
+    def __init__(self, fields, max_count: int = MAX_BLOCK_REGS):
+        fields = list(fields)
+        names = [f.name for f in fields]
+        if len(names) != len(set(names)):
+            raise ValueError("Register names must be unique")
+
+        fcs = {f.fc for f in fields}
+        if len(fcs) > 1:
+            raise ValueError("A plan can only cover one function code")
+
+        self.fields = fields
+        self.fc = fcs.pop() if fcs else 4
+        self.blocks = plan_blocks(fields, max_count)
+        self._names = tuple(names)
+        self._compiled = [
+            (blk, struct.Struct(f">{blk.count}H"), compile_block(blk))
+            for blk in self.blocks
+        ]
+
+    def read(self, read_block: Callable[[int, int], Optional[List[int]]],
+             scaled: bool = True) -> Dict[str, Optional[float]]:
+        """
+        Execute the plan.
+
+        read_block(addr, count) must return the register list or None on failure.
+        Registers in a failed (or short) block decode to None.
+        Pass scaled=False to get the raw integers instead of engineering units.
+        """
+        values: Dict[str, Optional[float]] = dict.fromkeys(self._names)
+        for blk, buf_struct, layers in self._compiled:
+            regs = read_block(blk.start, blk.count)
+            self._decode_block(values, blk, buf_struct, layers, regs, scaled)
+        return values
+
+    async def read_async(self, read_block, scaled: bool = True) -> Dict[str, Optional[float]]:
+        """Same as read(), for a coroutine read_block(addr, count)"""
+        values: Dict[str, Optional[float]] = dict.fromkeys(self._names)
+        for blk, buf_struct, layers in self._compiled:
+            regs = await read_block(blk.start, blk.count)
+            self._decode_block(values, blk, buf_struct, layers, regs, scaled)
+        return values
+
+    @staticmethod
+    def _decode_block(values, blk, buf_struct, layers, regs, scaled):
+        if regs is None or len(regs) < blk.count:
+            return
+
+        buf = buf_struct.pack(*regs[:blk.count])
+        for st, names, converters in layers:
+            raw = st.unpack_from(buf)
+            if scaled:
+                values.update(zip(names, [conv(v) for conv, v in zip(converters, raw)]))
+            else:
+                values.update(zip(names, raw))
+
+    def describe(self) -> str:
+        """Human readable summary, e.g. for startup logs"""
+        spans = [f"{b.start}-{b.start + b.count - 1}" for b in self.blocks]
+        return f"{len(self.fields)} fields in {len(self.blocks)} reads ({', '.join(spans)})"
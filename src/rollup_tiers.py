@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Downsampled history tiers: 1-minute, 5-minute and hourly buckets.
+
+/api/history/range used to load every raw sample of the range and keep
+every Nth one, which wastes the parse work on long ranges and drops
+peaks. Each tier stores per bucket the sample count and, per channel,
+min / max / mean / last, so a multi-week chart is a few hundred
+pre-aggregated rows.
+
+Files: growatt_rollup_<tier>_YYYY-MM.bin in log_dir. A 24-byte header
+(magic + covered_until) is followed by fixed-width records keyed by the
+bucket's wall-clock start (like the archive timestamps). covered_until is
+the time up to which archived samples have been aggregated into the file.
+
+- The poller feeds every sample in (add_sample()); each tier keeps its
+  current bucket in memory and appends it when the next bucket starts.
+- Months are built from the archive the first time they are queried, and
+  after a restart the gap since covered_until is aggregated from the
+  archive before live samples continue.
+
+The files are derived data: delete them to rebuild.
+"""
+
+import os
+from datetime import datetime, timedelta
+from threading import Lock
+
+import numpy as np
+
+from binary_archive import FIELDS
+
+
+TIERS = {"1m": 60, "5m": 300, "1h": 3600}   # finest first
+STATS = ("min", "max", "mean", "last")
+
+MAGIC = b"GROWATT-ROLLUP01"
+HEADER_DTYPE = np.dtype([("magic", "S16"), ("covered_until", "<M8[s]")])
+HEADER_SIZE = HEADER_DTYPE.itemsize
+
+RECORD_DTYPE = np.dtype(
+    [("ts", "<M8[s]"), ("count", "<i4")]
+    + [(f"{field}_{stat}", "<f4") for field in FIELDS for stat in STATS]
+)
+
+EMPTY = np.zeros(0, dtype=RECORD_DTYPE)
+
+
+def bucket_start(t, width):
+    """Start of the width-second bucket holding naive datetime t"""
+    seconds = t.hour * 3600 + t.minute * 60 + t.second
+    return t.replace(microsecond=0) - timedelta(seconds=seconds % width)
+
+
+def month_start(t):
+    return datetime(t.year, t.month, 1)
+
+
+def next_month(t):
+    return datetime(t.year + 1, 1, 1) if t.month == 12 else datetime(t.year, t.month + 1, 1)
+
+
+def aggregate(wall, columns, width):
+    """
+    Bucket records from wall-clock datetime64 values (sorted) and
+    {field: array}; consecutive samples with the same bucket start form
+    one bucket
+    """
+    if not len(wall):
+        return EMPTY
+    seconds = np.asarray(wall).astype("M8[s]").view(np.int64)
+    bucket = seconds - seconds % width
+    starts = np.flatnonzero(np.diff(bucket, prepend=bucket[0] - 1))
+    ends = np.append(starts[1:], len(bucket))
+    counts = ends - starts
+
+    records = np.zeros(len(starts), dtype=RECORD_DTYPE)
+    records["ts"] = bucket[starts].view("M8[s]")
+    records["count"] = counts
+    for field in FIELDS:
+        column = np.asarray(columns[field], dtype=np.float64)
+        records[f"{field}_min"] = np.minimum.reduceat(column, starts)
+        records[f"{field}_max"] = np.maximum.reduceat(column, starts)
+        records[f"{field}_mean"] = np.add.reduceat(column, starts) / counts
+        records[f"{field}_last"] = column[ends - 1]
+    return records
+
+
+def to_dicts(records):
+    """
+    API rows: the mean under the plain field name (so charts can use tier
+    rows like raw samples) plus <field>_min / _max / _last and count
+    """
+    timestamps = [t.isoformat() for t in records["ts"].tolist()]
+    names = [name for name in RECORD_DTYPE.names if name not in ("ts", "count")]
+    keys = [name[:-len("_mean")] if name.endswith("_mean") else name for name in names]
+    columns = [np.round(records[name].astype(np.float64), 3).tolist() for name in names]
+    counts = records["count"].tolist()
+    return [{"timestamp": t, "count": n, **dict(zip(keys, row))}
+            for t, n, row in zip(timestamps, counts, zip(*columns))]
+
+
+# ---------------------------------------------------------------------
+# Tier files
+# ---------------------------------------------------------------------
+def read_tier(path):
+    """(covered_until datetime or None, memory-mapped records)"""
+    try:
+        size = os.path.getsize(path)
+        header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+    except OSError:
+        return None, EMPTY
+    if not len(header) or header["magic"][0] != MAGIC:
+        print(f"⚠ Ignoring invalid rollup file {path}")
+        return None, EMPTY
+
+    covered = header["covered_until"][0].astype("M8[us]").item()
+    count = (size - HEADER_SIZE) // RECORD_DTYPE.itemsize
+    if count <= 0:
+        return covered, EMPTY
+    return covered, np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER_SIZE, shape=(count,))
+
+
+def append_tier(path, records, covered_until):
+    """Append buckets and advance covered_until (header written last)"""
+    if not os.path.exists(path):
+        with open(path, "wb") as f:
+            header = np.zeros(1, dtype=HEADER_DTYPE)
+            header["magic"] = MAGIC
+            f.write(header.tobytes())
+
+    _, existing = read_tier(path)
+    keep = len(existing)
+    if keep and len(records):
+        # Buckets past the old covered_until (from an interrupted write)
+        # are replaced
+        keep = int(np.searchsorted(existing["ts"], records["ts"][0], side="left"))
+    del existing
+
+    with open(path, "r+b") as f:
+        f.truncate(HEADER_SIZE + keep * RECORD_DTYPE.itemsize)
+        f.seek(0, os.SEEK_END)
+        f.write(np.asarray(records, dtype=RECORD_DTYPE).tobytes())
+        f.flush()
+        f.seek(len(MAGIC))
+        f.write(np.array([covered_until], dtype="M8[s]").tobytes())
+
+
+class OpenBucket:
+    """A tier's current (incomplete) bucket, updated per sample"""
+
+    def __init__(self, start):
+        self.start = start
+        self.count = 0
+        self.min = {}
+        self.max = {}
+        self.total = {}
+        self.last = {}
+
+    @classmethod
+    def from_record(cls, start, record):
+        bucket = cls(start)
+        bucket.count = int(record["count"])
+        for field in FIELDS:
+            bucket.min[field] = float(record[f"{field}_min"])
+            bucket.max[field] = float(record[f"{field}_max"])
+            bucket.total[field] = float(record[f"{field}_mean"]) * bucket.count
+            bucket.last[field] = float(record[f"{field}_last"])
+        return bucket
+
+    def add(self, sample):
+        for field in FIELDS:
+            value = float(sample.get(field) or 0)
+            if self.count:
+                self.min[field] = min(self.min[field], value)
+                self.max[field] = max(self.max[field], value)
+                self.total[field] += value
+            else:
+                self.min[field] = self.max[field] = self.total[field] = value
+            self.last[field] = value
+        self.count += 1
+
+    def to_record(self):
+        record = np.zeros(1, dtype=RECORD_DTYPE)
+        record["ts"] = np.datetime64(self.start, "s")
+        record["count"] = self.count
+        for field in FIELDS:
+            record[f"{field}_min"] = self.min[field]
+            record[f"{field}_max"] = self.max[field]
+            record[f"{field}_mean"] = self.total[field] / self.count
+            record[f"{field}_last"] = self.last[field]
+        return record
+
+
+# ---------------------------------------------------------------------
+# Tier set
+# ---------------------------------------------------------------------
+class RollupTiers:
+    """
+    All tiers of one archive.
+
+    read_arrays(start_date, end_date, fields) must return the archive as
+    (wall-clock datetime64, {field: array}) for the inclusive date range,
+    sorted (Storage.read_arrays()).
+    """
+
+    def __init__(self, log_dir, read_arrays):
+        self.log_dir = log_dir
+        self.read_arrays = read_arrays
+        self._open = {}          # tier -> OpenBucket
+        self._primed = False
+        self._lock = Lock()
+
+    def path(self, tier, month):
+        return os.path.join(self.log_dir, f"growatt_rollup_{tier}_{month:%Y-%m}.bin")
+
+    def _boundary(self, tier, now):
+        """Buckets before this are closed: the live bucket, or the current one"""
+        live = self._open.get(tier)
+        return live.start if live is not None else bucket_start(now, TIERS[tier])
+
+    def _build(self, month, targets):
+        """
+        Aggregate archived samples for the month's tier files up to
+        targets[tier]: {tier: (covered_until read, records, new covered_until)}.
+        Reads files and the archive only, so it runs without the lock.
+        """
+        pending = {}
+        for tier, target in targets.items():
+            covered, _ = read_tier(self.path(tier, month))
+            covered = covered or month
+            target = min(target, next_month(month))
+            if covered < target:
+                pending[tier] = (covered, target)
+        if not pending:
+            return {}
+
+        start = min(c for c, _ in pending.values())
+        end = max(t for _, t in pending.values())
+        wall, columns = self.read_arrays(start.date(), (end - timedelta(microseconds=1)).date(), FIELDS)
+        wall = np.asarray(wall, dtype="M8[us]")
+        built = {}
+        for tier, (covered, target) in pending.items():
+            keep = (wall >= np.datetime64(covered, "us")) & (wall < np.datetime64(target, "us"))
+            records = aggregate(wall[keep], {f: np.asarray(columns[f])[keep] for f in FIELDS}, TIERS[tier])
+            built[tier] = (covered, records, target)
+        return built
+
+    def _commit(self, month, built):
+        """Append _build() results (call with the lock held); files changed meanwhile are left alone"""
+        for tier, (covered, records, target) in built.items():
+            current, _ = read_tier(self.path(tier, month))
+            if (current or month) == covered:
+                append_tier(self.path(tier, month), records, target)
+
+    def _catch_up(self, month, targets):
+        """Build and append in one go (call with the lock held)"""
+        self._commit(month, self._build(month, targets))
+
+    def _prime(self, t):
+        """First live sample: catch up the month, then rebuild the open buckets"""
+        starts = {tier: bucket_start(t, width) for tier, width in TIERS.items()}
+        self._catch_up(month_start(t), starts)
+
+        # Archived samples of the current buckets (t itself is added by the caller)
+        earliest = min(starts.values())
+        wall, columns = self.read_arrays(earliest.date(), t.date(), FIELDS)
+        wall = np.asarray(wall, dtype="M8[us]")
+        for tier, start in starts.items():
+            covered, _ = read_tier(self.path(tier, month_start(t)))
+            if covered is not None and covered > start:
+                continue   # already built past this bucket; resumes with the next one
+            keep = (wall >= np.datetime64(start, "us")) & (wall < np.datetime64(t, "us"))
+            records = aggregate(wall[keep], {f: np.asarray(columns[f])[keep] for f in FIELDS}, TIERS[tier])
+            self._open[tier] = OpenBucket.from_record(start, records[0]) if len(records) else OpenBucket(start)
+
+    def rewind(self, t):
+        """
+        Drop buckets from t (naive datetime) on, so they are rebuilt from
+        the archive: samples before covered_until were added to it late
+        (journal replay)
+        """
+        with self._lock:
+            for tier, width in TIERS.items():
+                start = bucket_start(t, width)
+                month = month_start(start)
+                while month <= datetime.now():
+                    path = self.path(tier, month)
+                    covered, records = read_tier(path)
+                    if covered is not None and covered > start:
+                        keep = int(np.searchsorted(records["ts"], np.datetime64(start, "s"), side="left"))
+                        del records
+                        with open(path, "r+b") as f:
+                            f.truncate(HEADER_SIZE + keep * RECORD_DTYPE.itemsize)
+                            f.seek(len(MAGIC))
+                            f.write(np.array([max(start, month)], dtype="M8[s]").tobytes())
+                    month = next_month(month)
+            # Open buckets are rebuilt from the archive by the next sample
+            self._open = {}
+            self._primed = False
+
+    def add_sample(self, t, sample):
+        """Feed one new sample (t: naive local datetime; called after it is archived)"""
+        with self._lock:
+            if not self._primed:
+                self._prime(t)
+                self._primed = True
+            for tier, width in TIERS.items():
+                start = bucket_start(t, width)
+                live = self._open.get(tier)
+                if live is not None and start != live.start:
+                    if live.count:
+                        append_tier(self.path(tier, month_start(live.start)), live.to_record(),
+                                    live.start + timedelta(seconds=width))
+                    live = None
+                if live is None:
+                    covered, _ = read_tier(self.path(tier, month_start(start)))
+                    if covered is not None and covered > start:
+                        continue
+                    live = self._open[tier] = OpenBucket(start)
+                live.add(sample)
+
+    def query(self, tier, start, end, now=None):
+        """Tier records with start <= bucket start < end (naive datetimes)"""
+        if now is None:
+            now = datetime.now()
+        with self._lock:
+            targets = {t: self._boundary(t, now) for t in TIERS}
+
+        parts = []
+        month = month_start(start)
+        while month < end:
+            # Build every tier of the month at once (one archive read),
+            # outside the lock so add_sample() is never kept waiting
+            built = self._build(month, targets)
+            with self._lock:
+                self._commit(month, built)
+                _, records = read_tier(self.path(tier, month))
+                if len(records):
+                    ts = records["ts"]
+                    lo = int(np.searchsorted(ts, np.datetime64(start, "s"), side="left"))
+                    hi = int(np.searchsorted(ts, np.datetime64(end, "s"), side="left"))
+                    parts.append(np.array(records[lo:hi]))
+            month = next_month(month)
+
+        with self._lock:
+            live = self._open.get(tier)
+            if live is not None and live.count and start <= live.start < end:
+                parts.append(live.to_record())
+
+        parts = [p for p in parts if len(p)]
+        if not parts:
+            return EMPTY
+        return np.concatenate(parts)
+
+
+def select_tier(start, end, limit, raw_interval):
+    """
+    Resolution for a chart of at most limit points over [start, end): raw
+    samples if they fit, else the finest tier whose bucket count fits
+    (hourly when none does; the caller strides that down)
+    """
+    span = (end - start).total_seconds()
+    if not limit or span / raw_interval <= limit:
+        return "raw"
+    for tier, width in TIERS.items():
+        if span / width <= limit:
+            return tier
+    return list(TIERS)[-1]
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Seqlock snapshot of current_data in shared memory.
+
+The poller writes the primary device's snapshot once per poll cycle; any
+number of processes (the gunicorn HTTP workers) read it without locks
+or socket round trips, so /api/current scales with the worker count and
+never waits for the poller.
+
+Layout (multiprocessing.shared_memory, fixed size):
+
+    seq       <u8   even: stable, odd: write in progress
+    instance  <u8   random id of the writer, 0 once it has closed
+    record    SNAPSHOT_DTYPE (one row, the current_data fields)
+
+Writer: seq += 1 (odd), copy the record, seq += 1 (even). Reader: read
+seq, copy the record, read seq again; the copy is torn-free when both
+reads are the same even number, otherwise it retries. There is a single
+writer. The sequence stores are aligned 8-byte writes issued in program
+order, which x86-64 preserves; CPython cannot emit memory barriers, so on
+weakly ordered CPUs (ARM) this relies on the interpreter work between
+the stores.
+
+Readers re-attach when the writer closes (instance 0) and every
+REATTACH_SEC, so a restarted poller's new segment is picked up.
+"""
+
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+SNAPSHOT_DTYPE = np.dtype([
+    ("timestamp", "S32"),              # ISO string, b"" = None
+    ("solar", "<f8"),
+    ("battery_discharge", "<f8"),
+    ("grid_import", "<f8"),
+    ("battery_charge", "<f8"),
+    ("load", "<f8"),
+    ("grid_export", "<f8"),
+    ("battery_net", "<f8"),
+    ("soc_inv", "<i4"),
+    ("soc_bms", "<i4"),
+    ("battery_temp", "<f8"),           # NaN = None
+    ("bms_cycle_count", "<i4"),        # -1 = None
+    ("connected", "?"),
+])
+HEADER_SIZE = 16                       # seq + instance
+SIZE = HEADER_SIZE + SNAPSHOT_DTYPE.itemsize
+
+READ_RETRIES = 100
+REATTACH_SEC = 5.0
+
+
+# Stored in place of None
+NONE_VALUES = {"battery_temp": np.nan, "bms_cycle_count": -1}
+
+
+def to_record(data):
+    record = np.zeros(1, dtype=SNAPSHOT_DTYPE)
+    for name in SNAPSHOT_DTYPE.names:
+        value = data.get(name)
+        if name == "timestamp":
+            value = (value or "").encode()
+        elif value is None:
+            value = NONE_VALUES.get(name, 0)
+        record[name] = value
+    return record
+
+
+def from_record(record):
+    data = {}
+    for name in SNAPSHOT_DTYPE.names:
+        value = record[name].item()
+        if name == "timestamp":
+            value = value.decode() or None
+        elif name in NONE_VALUES and (value != value or value == NONE_VALUES[name]):
+            value = None   # NaN != NaN
+        data[name] = value
+    return data
+
+
+def _attach(name):
+    """Open an existing segment without handing it to this process's resource tracker"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: the tracker would unlink the writer's segment when
+        # this reader exits
+        from multiprocessing import resource_tracker
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class SnapshotWriter:
+    """Single writer (the poller process)"""
+
+    def __init__(self, name):
+        self.name = name
+        try:
+            # Left over from a poller that did not shut down cleanly
+            stale = _attach(name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=SIZE)
+        self.header = np.ndarray((2,), dtype="<u8", buffer=self.shm.buf)
+        self.record = np.ndarray((1,), dtype=SNAPSHOT_DTYPE, buffer=self.shm.buf, offset=HEADER_SIZE)
+        self.header[0] = 0
+        self.header[1] = int.from_bytes(os.urandom(8), "little") | 1
+
+    def write(self, data):
+        record = to_record(data)
+        self.header[0] += 1          # odd: readers retry
+        self.record[:] = record
+        self.header[0] += 1
+
+    def close(self):
+        self.header[1] = 0           # readers re-attach
+        del self.header, self.record
+        self.shm.close()
+        self.shm.unlink()
+
+
+class SnapshotReader:
+    """
+    Lock-free reader; read() returns None until a writer has written.
+    Not thread-safe: use one reader per thread.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.shm = None
+        self.instance = 0
+        self.attached_at = 0.0
+
+    def _reattach(self):
+        self._detach()
+        try:
+            self.shm = _attach(self.name)
+        except FileNotFoundError:
+            return False
+        self.header = np.ndarray((2,), dtype="<u8", buffer=self.shm.buf)
+        self.record = np.ndarray((1,), dtype=SNAPSHOT_DTYPE, buffer=self.shm.buf, offset=HEADER_SIZE)
+        self.instance = int(self.header[1])
+        self.attached_at = time.monotonic()
+        return True
+
+    def _detach(self):
+        if self.shm is not None:
+            del self.header, self.record
+            self.shm.close()
+            self.shm = None
+
+    def read(self):
+        now = time.monotonic()
+        if (self.shm is None or int(self.header[1]) != self.instance or self.instance == 0
+                or now - self.attached_at > REATTACH_SEC):
+            if not self._reattach():
+                return None
+
+        for _ in range(READ_RETRIES):
+            before = int(self.header[0])
+            if not before & 1:
+                record = self.record.copy()
+                if int(self.header[0]) == before:
+                    return from_record(record[0]) if before else None
+            # Writer in progress (possibly preempted): let it finish
+            time.sleep(0)
+        return None
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Local Growatt SPH simulator built on pymodbus's bundled TCP server.
+
+Serves the input registers in register_map.POLL_REGISTERS with plausible,
+slowly changing values so the pollers can be exercised without hardware.
+--latency adds a per-request delay to mimic a Wi-Fi dongle.
+
+Usage:
+    python src/sph_simulator.py --port 5020 --latency 0.05
+    python src/async_poller.py --ip 127.0.0.1 --port 5020 --interval 1
+"""
+
+import asyncio
+import argparse
+import math
+import time
+
+from pymodbus.datastore import (
+    ModbusSequentialDataBlock,
+    ModbusServerContext,
+    ModbusSlaveContext,
+)
+from pymodbus.server import StartAsyncTcpServer
+
+from register_map import SPH_REGISTERS
+
+
+REGISTER_SPACE = 1125  # SPH answers 0-124 and 1000-1124
+
+
+class SlowDataBlock(ModbusSequentialDataBlock):
+    """Data block that sleeps before every read to emulate link latency"""
+
+    def __init__(self, address, values, latency=0.0):
+        super().__init__(address, values)
+        self.latency = latency
+
+    def getValues(self, address, count=1):
+        if self.latency:
+            time.sleep(self.latency)
+        return super().getValues(address, count)
+
+
+def encode(name, value):
+    """Engineering value -> list of raw registers for a register_map entry"""
+    reg = SPH_REGISTERS[name]
+    raw = int(round(value / reg.scale))
+    if reg.width == 1:
+        return [raw & 0xFFFF]
+    raw &= 0xFFFFFFFF
+    return [raw >> 16, raw & 0xFFFF]
+
+
+def build_context(latency=0.0):
+    block = SlowDataBlock(0, [0] * REGISTER_SPACE, latency=latency)
+    slave = ModbusSlaveContext(ir=block, hr=ModbusSequentialDataBlock(0, [0] * REGISTER_SPACE),
+                               zero_mode=True)
+    return ModbusServerContext(slaves=slave, single=True), block
+
+
+def write_snapshot(block, t):
+    """Fill the data block with a snapshot for time t (seconds)"""
+    pv = max(0.0, 4000 * math.sin(t / 600.0))
+    load = 800 + 300 * math.sin(t / 45.0)
+    grid = pv - load - 500   # + export / - import
+    snapshot = {
+        "pv_power": pv,
+        "grid_power": grid,
+        "load_power": load,
+        "soc_inv": 80,
+        "soc_bms": 79,
+        "battery_temp": 25.3,
+        "bms_cycle_count": 312,
+    }
+    for name, value in snapshot.items():
+        block.setValues(SPH_REGISTERS[name].addr, encode(name, value))
+
+
+async def update_forever(block, period=1.0):
+    started = time.monotonic()
+    while True:
+        write_snapshot(block, time.monotonic() - started + 600)
+        await asyncio.sleep(period)
+
+
+async def serve(host, port, latency):
+    context, block = build_context(latency)
+    write_snapshot(block, 600)
+    updater = asyncio.create_task(update_forever(block))
+    try:
+        await StartAsyncTcpServer(context=context, address=(host, port))
+    finally:
+        updater.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Growatt SPH Modbus TCP simulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5020)
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Seconds of delay added to every read request")
+    args = parser.parse_args()
+
+    print(f"Growatt SPH simulator on {args.host}:{args.port} (latency {args.latency}s)")
+    try:
+        asyncio.run(serve(args.host, args.port, args.latency))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Poller / HTTP worker split for production serving (poller_service.py,
+wsgi.py, gunicorn.conf.py).
+
+Exactly one poller process owns the Modbus connections and the in-memory
+state: the history ring buffer, today's energy and earnings accumulators
+and the open rollup-tier buckets. HTTP worker processes reach it over a
+Unix socket:
+
+- call():   request / response reads such as history.window(), made
+            through RemoteObject proxies that have the same methods as
+            the local objects, so endpoint code does not change
+- follow(): a long-lived stream of the live events record_sample()
+            publishes; workers apply them to their own current_data /
+            device_data / fleet_data and SSE / WebSocket clients
+
+Messages are length-prefixed pickles. The socket is created mode 0600 in
+the log directory and only exposes the methods it was given.
+"""
+
+import fcntl
+import os
+import pickle
+import socket
+import socketserver
+import struct
+import time
+from collections import deque
+from threading import Condition, Lock, Thread, local
+
+
+HEADER = struct.Struct("!I")
+CALL_TIMEOUT_SEC = 60        # first use of a rollup tier may read a month of archive
+FOLLOW_BACKLOG = 1000        # live events queued per worker before it is dropped
+FOLLOW_RETRY_SEC = 2
+
+
+def socket_path(config):
+    """Poller socket for a config (state_socket, default <log_dir>/poller.sock)"""
+    return config.get("state_socket") or os.path.join(config.get("log_dir", "./logs"), "poller.sock")
+
+
+def send_message(sock, obj):
+    data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    sock.sendall(HEADER.pack(len(data)) + data)
+
+
+def recv_message(f):
+    """Read one message from a socket's buffered reader (sock.makefile("rb"))"""
+    header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ConnectionError("state socket closed")
+    (size,) = HEADER.unpack(header)
+    data = f.read(size)
+    if len(data) < size:
+        raise ConnectionError("state socket closed")
+    return pickle.loads(data)
+
+
+# ---------------------------------------------------------------------
+# Poller side
+# ---------------------------------------------------------------------
+class Follower:
+    """Live events waiting to be sent to one worker"""
+
+    def __init__(self):
+        self.events = deque()
+        self.overflow = False
+        self.cond = Condition()
+
+    def put(self, event):
+        with self.cond:
+            if len(self.events) >= FOLLOW_BACKLOG:
+                self.overflow = True
+            else:
+                self.events.append(event)
+            self.cond.notify()
+
+    def take(self):
+        with self.cond:
+            while not self.events and not self.overflow:
+                self.cond.wait()
+            if self.overflow:
+                # The worker reconnects and starts again from a snapshot
+                raise ConnectionError("worker fell behind")
+            events = list(self.events)
+            self.events.clear()
+            return events
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        state = self.server.state
+        while True:
+            try:
+                request = recv_message(self.rfile)
+            except (OSError, ConnectionError, pickle.UnpicklingError):
+                return
+            if request == ("follow",):
+                state.serve_follower(self.connection)
+                return
+
+            name, method, args, kwargs = request
+            try:
+                obj, methods = state.objects[name]
+                if method not in methods:
+                    raise AttributeError(f"{name}.{method} is not served")
+                response = ("ok", getattr(obj, method)(*args, **kwargs))
+            except Exception as e:
+                response = ("error", e)
+            try:
+                try:
+                    send_message(self.connection, response)
+                except (pickle.PicklingError, TypeError, AttributeError) as e:
+                    send_message(self.connection, ("error", RuntimeError(f"{name}.{method}: {e}")))
+            except OSError:
+                return
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class StateServer:
+    """
+    Serves the poller's state to worker processes.
+
+    objects:  {name: (object, [method names workers may call])}
+    snapshot: callable returning the live events that bring a newly
+              connected worker up to date
+    """
+
+    def __init__(self, path, objects, snapshot):
+        self.path = path
+        self.objects = objects
+        self.snapshot = snapshot
+        self._followers = set()
+        self._lock = Lock()
+        self._server = None
+        self._lock_file = None
+
+    def start(self):
+        # One poller per socket: a second one would poll the inverter again
+        self._lock_file = open(self.path + ".lock", "w")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            raise RuntimeError(f"another poller is already serving {self.path}")
+
+        if os.path.exists(self.path):
+            os.unlink(self.path)   # stale socket from a previous run
+        old_umask = os.umask(0o177)
+        try:
+            self._server = _UnixServer(self.path, _Handler)
+        finally:
+            os.umask(old_umask)
+        self._server.state = self
+        Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+    def publish(self, event):
+        """Queue one live event for every connected worker"""
+        with self._lock:
+            followers = list(self._followers)
+        for follower in followers:
+            follower.put(event)
+
+    def serve_follower(self, sock):
+        follower = Follower()
+        # Subscribe before the snapshot: an event in between is sent twice,
+        # never lost (applying a state event is idempotent)
+        with self._lock:
+            self._followers.add(follower)
+        try:
+            for event in self.snapshot():
+                send_message(sock, event)
+            while True:
+                for event in follower.take():
+                    send_message(sock, event)
+        except (OSError, ConnectionError):
+            pass
+        finally:
+            with self._lock:
+                self._followers.discard(follower)
+
+
+# ---------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------
+class StateClient:
+    """Connection to the poller (one socket per thread for calls)"""
+
+    def __init__(self, path, timeout=CALL_TIMEOUT_SEC):
+        self.path = path
+        self.timeout = timeout
+        self._local = local()
+
+    def _connect(self, timeout):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        return sock, sock.makefile("rb")
+
+    def _disconnect(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            conn[1].close()
+            conn[0].close()
+
+    def call(self, name, method, *args, **kwargs):
+        """obj.method(*args, **kwargs) in the poller process"""
+        for attempt in range(2):
+            try:
+                if getattr(self._local, "conn", None) is None:
+                    self._local.conn = self._connect(self.timeout)
+                sock, f = self._local.conn
+                send_message(sock, (name, method, args, kwargs))
+                status, value = recv_message(f)
+                break
+            except OSError as e:
+                # Retry once on a fresh connection (poller restarted)
+                self._disconnect()
+                if attempt:
+                    raise ConnectionError(f"Poller not reachable at {self.path}: {e}")
+        if status == "error":
+            raise value
+        return value
+
+    def follow(self, handle):
+        """Call handle(event) for every live event, reconnecting forever (run in a thread)"""
+        while True:
+            try:
+                sock, f = self._connect(None)
+                try:
+                    send_message(sock, ("follow",))
+                    while True:
+                        handle(recv_message(f))
+                finally:
+                    f.close()
+                    sock.close()
+            except OSError as e:
+                print(f"⚠ Live state from poller lost ({e}), reconnecting")
+            time.sleep(FOLLOW_RETRY_SEC)
+
+
+class RemoteObject:
+    """Proxy calling the methods of a StateServer object"""
+
+    def __init__(self, client, name):
+        self._client = client
+        self._name = name
+
+    def __getattr__(self, method):
+        def call(*args, **kwargs):
+            return self._client.call(self._name, method, *args, **kwargs)
+        return call
@@ -0,0 +1,837 @@
+#!/usr/bin/env python3
+"""
+Pluggable archive storage for the API server.
+
+Backends (select with "archive_format" in config.json):
+
+- "csv":    monthly growatt_log_YYYY-MM.csv files (day-indexed, see csv_index.py)
+- "binary": monthly growatt_log_YYYY-MM.bin files (memory-mapped, see
+            binary_archive.py); months without a .bin fall back to CSV
+- "sqlite": one SQLite database in WAL mode with a samples table keyed
+            on timestamp. Poller writes are batched, and daily totals and
+            hourly export/import are computed in SQL (LEAD() over the
+            timestamp index), so query latency stays bounded as the
+            archive grows to years. Set "csv_export": true to keep writing
+            the monthly CSVs as well.
+
+Every backend returns records in the read_csv_data() format:
+    {"timestamp": ISO string, "solar": kW, ..., "soc_inv": int, "soc_bms": int}
+
+Import existing archives into SQLite / export a range back to CSV:
+    python src/storage.py import logs/ --db logs/growatt.db
+    python src/storage.py export --db logs/growatt.db --start 2025-11-01 --end 2025-11-30 --out nov.csv
+"""
+
+import os
+import csv
+import glob
+import time
+import sqlite3
+import argparse
+from datetime import datetime, timedelta
+from threading import Lock, local
+
+import csv_index
+import energy
+import binary_archive
+from log_sink import LogSink
+from downsample import stride_indices
+from daily_rollup import DayAccumulator, ENERGY_CHANNELS, MAX_INTERVAL_SEC
+
+
+CSV_FIELDNAMES = ['timestamp', 'solar', 'load', 'grid_export', 'grid_import',
+                  'battery_charge', 'battery_discharge', 'battery_net',
+                  'soc_inv', 'soc_bms']
+SAMPLE_FIELDS = CSV_FIELDNAMES[1:]
+GRID_FIELDS = ["grid_export", "grid_import"]   # inputs of the earnings rules
+
+
+# ---------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------
+def iter_months(start_date, end_date):
+    """First day of every month in the given date range"""
+    current = start_date.replace(day=1)
+    end_month = end_date.replace(day=1)
+
+    while current <= end_month:
+        yield current
+        # Move to next month
+        if current.month == 12:
+            current = current.replace(year=current.year + 1, month=1)
+        else:
+            current = current.replace(month=current.month + 1)
+
+
+def archive_bounds(start_date=None, end_date=None):
+    """[start, end) datetimes covering start_date..end_date (either optional)"""
+    start = datetime.combine(start_date, datetime.min.time()) if start_date else None
+    end = datetime.combine(end_date + timedelta(days=1), datetime.min.time()) if end_date else None
+    return start, end
+
+
+def read_csv_data(filepath, start_date=None, end_date=None, since=None):
+    """
+    Read data from a CSV file with optional date filtering.
+
+    With a date filter, the file's day index (csv_index) is used to seek
+    straight to the requested days; unindexable files are scanned fully.
+    since (datetime) starts reading at that hour instead, via the hour
+    index; rows before it in the same hour are still returned.
+    """
+    data = []
+    try:
+        rows = None
+        if since is not None:
+            end_key = end_date.isoformat() + "T23" if end_date else "9999"
+            rows = csv_index.read_rows(filepath, since.strftime("%Y-%m-%dT%H"), end_key, level="hours")
+        elif start_date or end_date:
+            start_key = start_date.isoformat() if start_date else ""
+            end_key = end_date.isoformat() if end_date else "9999"
+            rows = csv_index.read_rows(filepath, start_key, end_key)
+
+        if rows is not None:
+            parse_csv_rows(rows, data, start_date, end_date)
+        else:
+            with open(filepath, 'r') as f:
+                parse_csv_rows(csv.DictReader(f), data, start_date, end_date)
+    except Exception as e:
+        print(f"Error reading {filepath}: {e}")
+
+    return data
+
+
+def parse_csv_rows(rows, data, start_date=None, end_date=None):
+    """Append parsed CSV rows within the date filter to data"""
+    for row in rows:
+        try:
+            ts = datetime.fromisoformat(row["timestamp"])
+
+            # Apply date filter if provided
+            if start_date and ts.date() < start_date:
+                continue
+            if end_date and ts.date() > end_date:
+                continue
+
+            data.append({
+                "timestamp": row["timestamp"],
+                "solar": float(row.get("solar", 0)),
+                "load": float(row.get("load", 0)),
+                "grid_export": float(row.get("grid_export", 0)),
+                "grid_import": float(row.get("grid_import", 0)),
+                "battery_charge": float(row.get("battery_charge", 0)),
+                "battery_discharge": float(row.get("battery_discharge", 0)),
+                "battery_net": float(row.get("battery_net", 0)),
+                "soc_inv": int(float(row.get("soc_inv", 0))),
+                "soc_bms": int(float(row.get("soc_bms", 0)))
+            })
+        except (ValueError, KeyError, TypeError):
+            continue
+
+
+def read_csv_tail(filepath, n, block_size=65536):
+    """
+    Last n data rows of a CSV archive, read in blocks backwards from the
+    end of the file (the rest of the month is never parsed)
+    """
+    data = []
+    try:
+        with open(filepath, "rb") as f:
+            header = f.readline().decode()
+            start = f.tell()
+            pos = f.seek(0, os.SEEK_END)
+            chunks = []
+            newlines = 0
+            # n + 1 newlines: the first block line may be a partial row
+            while pos > start and newlines <= n:
+                size = min(block_size, pos - start)
+                pos -= size
+                f.seek(pos)
+                chunks.append(f.read(size))
+                newlines += chunks[-1].count(b"\n")
+
+        lines = b"".join(reversed(chunks)).decode().splitlines()
+        if pos > start:
+            lines = lines[1:]
+        fieldnames = next(csv.reader([header]), None)
+        if n > 0 and fieldnames:
+            parse_csv_rows(csv.DictReader(lines[-n:], fieldnames=fieldnames), data)
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"Error reading {filepath}: {e}")
+
+    return data
+
+
+def write_csv(filepath, records, write_header=True):
+    """Append records to a CSV file in the archive column layout"""
+    with open(filepath, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDNAMES)
+        if write_header:
+            writer.writeheader()
+        for data in records:
+            writer.writerow({k: data.get(k, 0) for k in CSV_FIELDNAMES})
+
+
+# ---------------------------------------------------------------------
+# Backend interface
+# ---------------------------------------------------------------------
+class Storage:
+    """
+    Archive backend. Subclasses implement append(), sources(), read_range()
+    and list_archives(); the energy queries have generic implementations
+    on top of read_range() that backends may override.
+    """
+
+    name = None
+
+    def append(self, sample):
+        """Archive one snapshot (dict with an ISO "timestamp")"""
+        raise NotImplementedError
+
+    def flush(self):
+        """Make buffered samples durable and visible to queries"""
+
+    def sync(self):
+        """flush(), then fsync so every appended sample survives power loss (journal.py)"""
+        self.flush()
+
+    def close(self):
+        self.flush()
+
+    def sources(self, start_date, end_date):
+        """Files/databases that may hold data for the date range (empty: none)"""
+        raise NotImplementedError
+
+    def read_range(self, start_date, end_date, limit=None):
+        """
+        Sorted records for start_date..end_date (inclusive). With limit,
+        exactly limit evenly spaced records are returned
+        (downsample.stride_indices()).
+        """
+        raise NotImplementedError
+
+    def day_points(self, day):
+        """Sorted records for one day"""
+        return self.read_range(day, day)
+
+    def tail(self, n):
+        """The newest n records, oldest first (warm start of the in-memory history)"""
+        raise NotImplementedError
+
+    def read_since(self, day, after=None):
+        """Sorted records of one day with a timestamp after `after` (all if None)"""
+        points = self.day_points(day)
+        if after is None:
+            return points
+        # ISO timestamps of one day compare correctly as strings
+        key = after.isoformat()
+        return [p for p in points if p["timestamp"] > key]
+
+    def read_arrays(self, start_date, end_date, fields=None):
+        """
+        (wall-clock datetime64, {field: kW array}) for start_date..end_date;
+        fields defaults to the energy channels
+        """
+        return energy.arrays_from_records(self.read_range(start_date, end_date), fields)
+
+    def read_columns(self, start_date, end_date):
+        """(epoch seconds, {field: kW array}) for start_date..end_date"""
+        wall, columns = self.read_arrays(start_date, end_date)
+        return energy.local_epoch(wall), columns
+
+    def integrate_days(self, start_date, end_date, method="left"):
+        """Energy rows (energy.integrate_periods) for every day of the range, in one pass"""
+        ts, columns = self.read_columns(start_date, end_date)
+        return energy.integrate_periods(ts, columns, energy.day_edges(start_date, end_date), method)
+
+    def day_totals(self, day):
+        """DayAccumulator for one day (left Riemann sum)"""
+        ts, columns = self.read_columns(day, day)
+        row = energy.integrate_periods(ts, columns, energy.day_edges(day, day))[0]
+        acc = DayAccumulator.from_row(day, row)
+        if len(ts):
+            acc.resume(float(ts[-1]), {f: float(col[-1]) for f, col in columns.items()})
+        return acc
+
+    def hourly_energy(self, day):
+        """(data point count, hourly_export, hourly_import) for one day"""
+        return self.hourly_energy_range(day, day)[0]
+
+    def hourly_energy_range(self, start_date, end_date):
+        """hourly_energy() for every day of the range, in one pass over the archive"""
+        wall, columns = self.read_arrays(start_date, end_date, GRID_FIELDS)
+        return energy.hourly_by_day(wall, columns, start_date, end_date)
+
+    def list_archives(self):
+        """Archive listing for /api/archives"""
+        raise NotImplementedError
+
+
+# ---------------------------------------------------------------------
+# Monthly files (CSV / binary)
+# ---------------------------------------------------------------------
+class FileStorage(Storage):
+    """Monthly CSV or binary archive files in log_dir"""
+
+    def __init__(self, log_dir, archive_format="csv", legacy_file=None, sink=None):
+        self.log_dir = log_dir
+        self.name = archive_format
+        self.legacy_file = legacy_file
+        # CSV rows go through a batched writer thread (log_sink.py)
+        self.sink = sink or LogSink(CSV_FIELDNAMES)
+        # Binary records go through one open handle (binary_archive.py)
+        self.writer = binary_archive.ArchiveWriter()
+
+    def monthly_log_file(self, dt=None):
+        """Get the CSV file path for a given month (YYYY-MM format)"""
+        if dt is None:
+            dt = datetime.now()
+        month_str = dt.strftime('%Y-%m')
+        return os.path.join(self.log_dir, f"growatt_log_{month_str}.csv")
+
+    def monthly_archive_file(self, dt=None):
+        """Get the binary archive path for a given month (YYYY-MM format)"""
+        return os.path.splitext(self.monthly_log_file(dt))[0] + ".bin"
+
+    def append(self, sample):
+        if self.name == "binary":
+            dt = datetime.fromisoformat(sample["timestamp"])
+            path = self.monthly_archive_file(dt)
+            if path != self.writer.path and not os.path.exists(path):
+                self.merge_csv_month(dt, path)
+            self.writer.append(path, sample["timestamp"], sample)
+        else:
+            self.log_to_csv(sample)
+
+    def merge_csv_month(self, dt, path):
+        """
+        Start a month's .bin from its CSV rows: once the .bin exists,
+        sources() no longer reads the CSV
+        """
+        csv_path = self.monthly_log_file(dt)
+        if not os.path.exists(csv_path):
+            return
+        self.sink.flush()
+        _, count = binary_archive.convert_csv(csv_path, path)
+        print(f"✓ {count} rows of {os.path.basename(csv_path)} copied into {os.path.basename(path)}")
+
+    def log_to_csv(self, data):
+        """Queue data for its month's CSV log file (written in batches by the sink)"""
+        self.sink.write(self.monthly_log_file(datetime.fromisoformat(data["timestamp"])),
+                        [data.get(k, 0) for k in CSV_FIELDNAMES])
+
+    def flush(self):
+        self.sink.flush()
+
+    def sync(self):
+        self.sink.flush(sync=True)
+        self.writer.sync()
+
+    def close(self):
+        self.sink.close()
+        self.writer.close()
+
+    def sources(self, start_date, end_date):
+        """
+        Get all archive files that may contain data for the given date range.
+
+        With archive_format "binary", a month's .bin file is used when present
+        (months not yet converted fall back to their CSV).
+        """
+        # Queries see every logged sample: write the queued rows first, but
+        # only if the range reaches them (older ranges keep the batching)
+        pending = self.sink.oldest_pending()
+        if pending is not None and pending[1][0] < archive_bounds(end_date=end_date)[1].isoformat():
+            self.flush()
+        files = []
+
+        for month in iter_months(start_date, end_date):
+            if self.name == "binary":
+                filepath = self.monthly_archive_file(month)
+                if os.path.exists(filepath):
+                    files.append(filepath)
+                    continue
+            filepath = self.monthly_log_file(month)
+            if os.path.exists(filepath):
+                files.append(filepath)
+
+        # Also check legacy single file
+        legacy_file = self.legacy_file
+        if legacy_file and os.path.exists(legacy_file) and legacy_file not in files:
+            files.append(legacy_file)
+
+        return files
+
+    def tail(self, n):
+        self.flush()
+        records = []
+        month = datetime.now()
+        # Back from the current month until n records or a month without archive
+        while len(records) < n:
+            sources = [f for f in self.sources(month.date(), month.date()) if f != self.legacy_file]
+            if not sources:
+                break
+            wanted = n - len(records)
+            if sources[0].endswith(".bin"):
+                part = binary_archive.to_records(binary_archive.open_archive(sources[0])[-wanted:])
+            else:
+                part = read_csv_tail(sources[0], wanted)
+            records = part + records
+            month = month.replace(day=1) - timedelta(days=1)
+        return records
+
+    def read_file(self, filepath, start_date=None, end_date=None):
+        """Read data from a CSV or binary archive with optional date filtering"""
+        if filepath.endswith(".bin"):
+            records = binary_archive.read_window(filepath, *archive_bounds(start_date, end_date))
+            return binary_archive.to_records(records)
+        return read_csv_data(filepath, start_date, end_date)
+
+    def read_since(self, day, after=None):
+        if after is None:
+            return self.day_points(day)
+
+        data = []
+        for filepath in self.sources(day, day):
+            if filepath.endswith(".bin"):
+                records = binary_archive.read_window(filepath, after, archive_bounds(day, day)[1])
+                data.extend(binary_archive.to_records(records))
+            else:
+                data.extend(read_csv_data(filepath, day, day, since=after))
+
+        key = after.isoformat()
+        data = [p for p in data if p["timestamp"] > key]
+        data.sort(key=lambda x: x["timestamp"])
+        return data
+
+    def read_range(self, start_date, end_date, limit=None):
+        files = self.sources(start_date, end_date)
+
+        if files and all(f.endswith(".bin") for f in files):
+            # Binary archives: slice the mmapped records and stride before
+            # converting, so only the returned rows are materialized
+            records = binary_archive.read_range(files, *archive_bounds(start_date, end_date))
+            if limit and len(records) > limit:
+                records = records[stride_indices(len(records), limit)]
+            return binary_archive.to_records(records)
+
+        # Read from all relevant archive files
+        all_data = []
+        for filepath in files:
+            all_data.extend(self.read_file(filepath, start_date, end_date))
+
+        # Sort by timestamp
+        all_data.sort(key=lambda x: x["timestamp"])
+
+        # Downsample if needed
+        if limit and len(all_data) > limit:
+            all_data = [all_data[i] for i in stride_indices(len(all_data), limit).tolist()]
+        return all_data
+
+    def read_arrays(self, start_date, end_date, fields=None):
+        files = self.sources(start_date, end_date)
+        if not (files and all(f.endswith(".bin") for f in files)):
+            return super().read_arrays(start_date, end_date, fields)
+
+        # Straight from the mmapped records, no per-row conversion
+        wall, raw = binary_archive.read_columns(files, *archive_bounds(start_date, end_date),
+                                                fields or list(ENERGY_CHANNELS.values()))
+        # Power is stored in milli-kW, SOC in %
+        return wall, {f: column / 1000.0 if f in binary_archive.POWER_FIELDS else column.astype(float)
+                      for f, column in raw.items()}
+
+    def list_archives(self):
+        """Get all available log files (CSV and binary) for archive listing"""
+        pattern = os.path.join(self.log_dir, "growatt_log_*.*")
+        files = [f for f in glob.glob(pattern) if f.endswith((".csv", ".bin"))]
+
+        # Extract month info
+        result = []
+        for f in sorted(files):
+            basename = os.path.basename(f)
+            try:
+                # Parse growatt_log_YYYY-MM.csv
+                month_str, ext = os.path.splitext(basename.replace("growatt_log_", ""))
+                size = os.path.getsize(f)
+                result.append({
+                    "filename": basename,
+                    "path": f,
+                    "month": month_str,
+                    "format": "binary" if ext == ".bin" else "csv",
+                    "size_mb": round(size / (1024 * 1024), 2)
+                })
+            except:
+                continue
+
+        return result
+
+
+# ---------------------------------------------------------------------
+# SQLite
+# ---------------------------------------------------------------------
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    ts REAL PRIMARY KEY,            -- epoch seconds (datetime.timestamp())
+    timestamp TEXT NOT NULL,        -- local ISO timestamp, as in the CSV archive
+    solar REAL, load REAL, grid_export REAL, grid_import REAL,
+    battery_charge REAL, battery_discharge REAL, battery_net REAL,
+    soc_inv INTEGER, soc_bms INTEGER
+)
+"""
+
+INSERT_SQL = (
+    f"INSERT OR IGNORE INTO samples (ts, timestamp, {', '.join(SAMPLE_FIELDS)}) "
+    f"VALUES ({', '.join('?' * (len(SAMPLE_FIELDS) + 2))})"
+)
+
+# Samples with the interval to the next one (left Riemann sum, as DayAccumulator)
+INTERVALS_CTE = f"""
+WITH s AS (
+    SELECT *, LEAD(ts) OVER (ORDER BY ts) - ts AS dt
+    FROM samples WHERE ts >= :start AND ts < :end
+), valid AS (
+    SELECT *, CASE WHEN dt > 0 AND dt <= {MAX_INTERVAL_SEC} THEN dt END AS vdt FROM s
+), v AS (
+    SELECT *, vdt / 3600.0 AS dh FROM valid
+)
+"""
+
+# abs() on grid_import only, matching DayAccumulator
+_energy_expr = {
+    field: f"abs({field})" if field == "grid_import" else field
+    for field in ENERGY_CHANNELS.values()
+}
+
+DAY_TOTALS_SQL = INTERVALS_CTE + f"""
+SELECT COUNT(*),
+       {', '.join(f'TOTAL({_energy_expr[f]} * dh)' for f in ENERGY_CHANNELS.values())},
+       TOTAL(vdt),
+       COUNT(dh),
+       COUNT(dt) - COUNT(dh),
+       TOTAL(CASE WHEN dt > 0 AND vdt IS NULL THEN dt END),
+       COALESCE(MAX(CASE WHEN dt > 0 AND vdt IS NULL THEN dt END), 0.0)
+FROM v
+"""
+
+# Hourly export/import for every day of a range; intervals never cross midnight
+HOURLY_RANGE_SQL = f"""
+WITH s AS (
+    SELECT substr(timestamp, 1, 10) AS day,
+           CAST(substr(timestamp, 12, 2) AS INTEGER) AS hour,
+           grid_export, grid_import,
+           LEAD(ts) OVER (PARTITION BY substr(timestamp, 1, 10) ORDER BY ts) - ts AS dt
+    FROM samples WHERE ts >= :start AND ts < :end
+), v AS (
+    SELECT *, CASE WHEN dt > 0 AND dt <= {MAX_INTERVAL_SEC} THEN dt / 3600.0 END AS dh
+    FROM s
+)
+SELECT day, hour, TOTAL(grid_export * dh), TOTAL(abs(grid_import) * dh)
+FROM v WHERE dh IS NOT NULL
+GROUP BY day, hour ORDER BY day, hour
+"""
+
+
+def _day_bounds(start_date, end_date):
+    start, end = archive_bounds(start_date, end_date)
+    return {"start": start.timestamp(), "end": end.timestamp()}
+
+
+def _row_to_record(row):
+    record = {"timestamp": row[0]}
+    record.update(zip(SAMPLE_FIELDS, row[1:]))
+    return record
+
+
+class SqliteStorage(Storage):
+    """
+    Samples table in one SQLite database (WAL mode).
+
+    append() buffers samples and commits them in one transaction every
+    batch_size samples or flush_interval seconds; queries flush first, so
+    they always see every sample. Readers use one connection per thread.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path, batch_size=12, flush_interval=30, csv_export=None):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.csv_export = csv_export   # optional FileStorage also written to
+
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self._write_lock = Lock()
+        self._local = local()
+        self._schema_lock = Lock()
+        self._schema_ready = False   # database opened on first use, not at startup
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute(SCHEMA)
+                    self._schema_ready = True
+        return conn
+
+    @staticmethod
+    def _row(sample):
+        return (datetime.fromisoformat(sample["timestamp"]).timestamp(), sample["timestamp"],
+                *(sample.get(f, 0) or 0 for f in SAMPLE_FIELDS))
+
+    def append(self, sample):
+        with self._write_lock:
+            self._pending.append(self._row(sample))
+            due = (len(self._pending) >= self.batch_size
+                   or time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+        if self.csv_export is not None:
+            self.csv_export.append(sample)
+
+    def insert_many(self, records):
+        """Insert records in one transaction (duplicate timestamps are ignored)"""
+        rows = [self._row(r) for r in records]
+        with self._write_lock:
+            self._commit(rows)
+        return len(rows)
+
+    def _commit(self, rows):
+        if not rows:
+            return
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(INSERT_SQL, rows)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def flush(self):
+        with self._write_lock:
+            rows, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+            self._commit(rows)
+
+    def sync(self):
+        self.flush()
+        # synchronous=NORMAL commits are not fsynced; a checkpoint syncs the
+        # WAL and copies it into the database
+        self._conn().execute("PRAGMA wal_checkpoint(FULL)")
+        if self.csv_export is not None:
+            self.csv_export.sync()
+
+    def sources(self, start_date, end_date):
+        return [self.path]
+
+    def read_range(self, start_date, end_date, limit=None):
+        self.flush()
+        conn = self._conn()
+        params = _day_bounds(start_date, end_date)
+        columns = ", ".join(["timestamp"] + SAMPLE_FIELDS)
+
+        count = 0
+        if limit:
+            (count,) = conn.execute(
+                "SELECT COUNT(*) FROM samples WHERE ts >= :start AND ts < :end", params
+            ).fetchone()
+
+        if not limit or count <= limit:
+            rows = conn.execute(
+                f"SELECT {columns} FROM samples WHERE ts >= :start AND ts < :end ORDER BY ts",
+                params,
+            )
+        else:
+            # Same rows as downsample.stride_indices(): row rn is
+            # ceil(k * count / limit) for some k exactly when
+            # (rn * limit) % count < limit
+            rows = conn.execute(
+                f"SELECT {columns} FROM ("
+                f"  SELECT *, ROW_NUMBER() OVER (ORDER BY ts) - 1 AS rn"
+                f"  FROM samples WHERE ts >= :start AND ts < :end"
+                f") WHERE (rn * :limit) % :count < :limit ORDER BY ts",
+                dict(params, limit=limit, count=count),
+            )
+        return [_row_to_record(row) for row in rows]
+
+    def tail(self, n):
+        self.flush()
+        rows = self._conn().execute(
+            f"SELECT timestamp, {', '.join(SAMPLE_FIELDS)} FROM samples ORDER BY ts DESC LIMIT ?", (n,)
+        ).fetchall()
+        return [_row_to_record(row) for row in reversed(rows)]
+
+    def read_since(self, day, after=None):
+        if after is None:
+            return self.day_points(day)
+        self.flush()
+        params = dict(_day_bounds(day, day), after=after.timestamp())
+        rows = self._conn().execute(
+            f"SELECT timestamp, {', '.join(SAMPLE_FIELDS)} FROM samples "
+            f"WHERE ts >= :start AND ts < :end AND ts > :after ORDER BY ts",
+            params,
+        )
+        return [_row_to_record(row) for row in rows]
+
+    def day_totals(self, day):
+        self.flush()
+        conn = self._conn()
+        params = _day_bounds(day, day)
+        row = conn.execute(DAY_TOTALS_SQL, params).fetchone()
+
+        count, *kwh, interval_sec, interval_count, gap_count, gap_sec, max_gap_sec = row
+        acc = DayAccumulator.from_row(day, {
+            "kwh": dict(zip(ENERGY_CHANNELS, kwh)),
+            "count": count,
+            "interval_sec": interval_sec,
+            "interval_count": interval_count,
+            "gap_count": gap_count,
+            "gap_sec": gap_sec,
+            "max_gap_sec": max_gap_sec,
+        })
+
+        # Last reading, so the accumulator can continue with live samples
+        last = conn.execute(
+            f"SELECT ts, {', '.join(SAMPLE_FIELDS)} FROM samples "
+            f"WHERE ts >= :start AND ts < :end ORDER BY ts DESC LIMIT 1",
+            params,
+        ).fetchone()
+        if last is not None:
+            acc.resume(last[0], dict(zip(SAMPLE_FIELDS, last[1:])))
+        return acc
+
+    def hourly_energy_range(self, start_date, end_date):
+        self.flush()
+        conn = self._conn()
+        params = _day_bounds(start_date, end_date)
+        days = [(start_date + timedelta(days=i)).isoformat()
+                for i in range((end_date - start_date).days + 1)]
+        results = {day: (0, {}, {}) for day in days}
+
+        for day, count in conn.execute(
+            "SELECT substr(timestamp, 1, 10) AS day, COUNT(*) FROM samples "
+            "WHERE ts >= :start AND ts < :end GROUP BY day", params
+        ):
+            if day in results:
+                results[day] = (count, {}, {})
+
+        for day, hour, export_kwh, import_kwh in conn.execute(HOURLY_RANGE_SQL, params):
+            if day in results:
+                results[day][1][hour] = export_kwh
+                results[day][2][hour] = import_kwh
+        return [results[day] for day in days]
+
+    def list_archives(self):
+        self.flush()
+        size = os.path.getsize(self.path)
+        for suffix in ("-wal",):
+            if os.path.exists(self.path + suffix):
+                size += os.path.getsize(self.path + suffix)
+
+        rows = self._conn().execute(
+            "SELECT substr(timestamp, 1, 7) AS month, COUNT(*) FROM samples GROUP BY month ORDER BY month"
+        ).fetchall()
+        total = sum(n for _, n in rows) or 1
+        return [{
+            "filename": os.path.basename(self.path),
+            "path": self.path,
+            "month": month,
+            "format": "sqlite",
+            "rows": n,
+            # Share of the database file, by row count
+            "size_mb": round(size * n / total / (1024 * 1024), 2)
+        } for month, n in rows]
+
+    def close(self):
+        self.flush()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+        if self.csv_export is not None:
+            self.csv_export.close()
+
+
+# ---------------------------------------------------------------------
+# Factory / CLI
+# ---------------------------------------------------------------------
+def open_storage(config, log_dir):
+    """Create the backend selected by config["archive_format"]"""
+    archive_format = config.get("archive_format", "csv")
+    legacy_file = config.get("log_file")
+
+    sink = LogSink(
+        CSV_FIELDNAMES,
+        batch_size=config.get("log_batch_size", 12),
+        flush_interval=config.get("log_flush_interval", 30),
+        fsync=config.get("log_fsync", False),
+    )
+
+    if archive_format == "sqlite":
+        csv_export = FileStorage(log_dir, "csv", legacy_file, sink) if config.get("csv_export") else None
+        return SqliteStorage(
+            config.get("sqlite_path") or os.path.join(log_dir, "growatt.db"),
+            batch_size=config.get("sqlite_batch_size", 12),
+            csv_export=csv_export,
+        )
+    if archive_format not in ("csv", "binary"):
+        raise ValueError(f"Unknown archive_format: {archive_format}")
+    return FileStorage(log_dir, archive_format, legacy_file, sink)
+
+
+def import_files(db, paths):
+    """Import CSV/binary archives (files or log directories) into SQLite"""
+    files = []
+    for p in paths:
+        if os.path.isdir(p):
+            files.extend(sorted(glob.glob(os.path.join(p, "growatt_log_*.csv"))))
+            files.extend(sorted(glob.glob(os.path.join(p, "growatt_log_*.bin"))))
+        else:
+            files.append(p)
+
+    reader = FileStorage(os.path.dirname(db.path) or ".")
+    for filepath in files:
+        started = time.perf_counter()
+        records = reader.read_file(filepath)
+        db.insert_many(records)
+        print(f"✓ {filepath}: {len(records)} records in {time.perf_counter() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Growatt archive storage tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_import = sub.add_parser("import", help="Import CSV/binary archives into SQLite")
+    p_import.add_argument("paths", nargs="+", help="Archive files or log directories")
+    p_import.add_argument("--db", default="./logs/growatt.db")
+
+    p_export = sub.add_parser("export", help="Export a date range from SQLite to CSV")
+    p_export.add_argument("--db", default="./logs/growatt.db")
+    p_export.add_argument("--start", required=True, help="YYYY-MM-DD")
+    p_export.add_argument("--end", help="YYYY-MM-DD (default: start)")
+    p_export.add_argument("--out", required=True)
+
+    args = parser.parse_args()
+    db = SqliteStorage(args.db)
+    try:
+        if args.command == "import":
+            import_files(db, args.paths)
+        else:
+            start = datetime.strptime(args.start, "%Y-%m-%d").date()
+            end = datetime.strptime(args.end, "%Y-%m-%d").date() if args.end else start
+            records = db.read_range(start, end)
+            write_csv(args.out, records, write_header=not os.path.exists(args.out))
+            print(f"✓ {len(records)} records -> {args.out}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+Tariff engine: retail plans compiled into dense per-day rate tables.
+
+A plan is a dict (config.json "tariffs" section, or zerohero_plan()):
+
+    {
+      "name": "Flat + demand",
+      "supply_charge": 1.10,                 # $/day
+      "import": [rule, ...],                 # $/kWh
+      "export": [rule, ...],                 # $/kWh feed-in
+      "credits": [credit, ...],              # daily credits for low import
+      "demand": {"rate": 0.25, "hours": [16, 21], "days": ["weekday"]},
+      "holidays": ["2025-12-25", "2025-12-26"]
+    }
+
+rule:    {"rate": 0.45, "hours": [16, 21], "days": ["weekday"],
+          "label": "peak", "daily_cap_kwh": 10}
+         - hours is [start, end) and may wrap midnight ([21, 7]); without
+           hours or days a rule applies all day, every day
+         - later rules override earlier ones, so list the all-day rate first
+         - days: "weekday", "weekend", "holiday" or "mon".."sun"; public
+           holidays are not weekdays and also match "weekend" rules
+         - daily_cap_kwh (export only): kWh per day credited for the label,
+           the rest of that label's export earns nothing
+credit:  {"label": "zerohero_day", "amount": 1.00, "hours": [18, 20],
+          "max_import_kwh": 0.03, "days": [...]}
+         paid when every hour of the window imports <= max_import_kwh
+demand:  $/kW per day on the highest hourly import inside its hours (kWh
+         in one hour = average kW), taken over each calendar month
+
+compile_plan() resolves the rules for every date of a range into
+(days, 24) arrays; evaluate() then prices (days, 24) hourly import/export
+kWh with array products, so a year costs the same few NumPy operations as
+a single day.
+"""
+
+from datetime import date, timedelta
+
+import numpy as np
+
+
+HOURS = 24
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+DAY_NAMES = set(WEEKDAYS) | {"weekday", "weekend", "holiday"}
+
+DEFAULT_EXPORT_LABEL = "export"
+
+
+def zerohero_plan(cfg):
+    """The ZeroHero VPP plan described by api_server.ZEROHERO_CONFIG"""
+    window = [cfg["zerohero_window_start"], cfg["zerohero_window_end"]]
+    rates = cfg["fit_rates"]
+    return {
+        "name": "ZeroHero",
+        "export": [
+            {"label": "shoulder", "rate": rates["shoulder"]},        # 9pm-10am, 2pm-4pm
+            {"label": "offpeak", "rate": rates["offpeak"], "hours": [10, 14]},
+            {"label": "peak", "rate": rates["peak"], "hours": [16, 18]},
+            {"label": "peak", "rate": rates["peak"], "hours": [20, 21]},
+            # Super Export replaces the regular FIT inside the window
+            {"label": "super_export", "rate": cfg["super_export_rate"], "hours": window,
+             "daily_cap_kwh": cfg["super_export_limit"]},
+        ],
+        "credits": [
+            {"label": "zerohero_day", "amount": cfg["zerohero_day_credit"], "hours": window,
+             "max_import_kwh": cfg["zerohero_import_threshold"]},
+        ],
+    }
+
+
+# ---------------------------------------------------------------------
+# Validation / rule matching
+# ---------------------------------------------------------------------
+def _check_spec(spec, where):
+    if not isinstance(spec, dict):
+        raise ValueError(f"{where}: expected an object")
+    hours = spec.get("hours")
+    if hours is not None:
+        if (not isinstance(hours, (list, tuple)) or len(hours) != 2
+                or not all(isinstance(h, int) and 0 <= h <= HOURS for h in hours)):
+            raise ValueError(f"{where}: hours must be [start, end) with 0 <= hour <= 24")
+    days = spec.get("days")
+    if days is not None:
+        unknown = set(days) - DAY_NAMES
+        if unknown:
+            raise ValueError(f"{where}: unknown days {sorted(unknown)}")
+
+
+def validate_plan(plan, name="plan"):
+    """Raise ValueError if a plan definition is malformed; returns the plan"""
+    if not isinstance(plan, dict):
+        raise ValueError(f"{name}: expected an object")
+    for section in ("import", "export"):
+        for i, rule in enumerate(plan.get(section, [])):
+            _check_spec(rule, f"{name}.{section}[{i}]")
+            if not isinstance(rule.get("rate"), (int, float)):
+                raise ValueError(f"{name}.{section}[{i}]: rate ($/kWh) is required")
+    for i, credit in enumerate(plan.get("credits", [])):
+        _check_spec(credit, f"{name}.credits[{i}]")
+        if not isinstance(credit.get("amount"), (int, float)):
+            raise ValueError(f"{name}.credits[{i}]: amount ($/day) is required")
+    if plan.get("demand") is not None:
+        _check_spec(plan["demand"], f"{name}.demand")
+        if not isinstance(plan["demand"].get("rate"), (int, float)):
+            raise ValueError(f"{name}.demand: rate ($/kW/day) is required")
+    for day in plan.get("holidays", []):
+        try:
+            date.fromisoformat(day)
+        except (TypeError, ValueError):
+            raise ValueError(f"{name}.holidays: invalid date {day!r}")
+    return plan
+
+
+def load_plans(plans, defaults=None):
+    """Validated {name: plan} from config["tariffs"] on top of defaults"""
+    result = dict(defaults or {})
+    for name, plan in (plans or {}).items():
+        validate_plan(plan, name)
+        result[name] = dict(plan, name=plan.get("name", name))
+    return result
+
+
+def _hour_mask(spec):
+    mask = np.zeros(HOURS, dtype=bool)
+    hours = spec.get("hours")
+    if hours is None:
+        mask[:] = True
+    elif hours[0] < hours[1]:
+        mask[hours[0]:hours[1]] = True
+    else:
+        # Wraps midnight ([21, 7]); [h, h] is all day
+        mask[hours[0]:] = True
+        mask[:hours[1]] = True
+    return mask
+
+
+def _day_tags(weekday, holiday):
+    if holiday:
+        return {WEEKDAYS[weekday], "holiday", "weekend"}
+    return {WEEKDAYS[weekday], "weekend" if weekday >= 5 else "weekday"}
+
+
+def _applies(spec, tags):
+    days = spec.get("days")
+    return days is None or bool(tags & set(days))
+
+
+# ---------------------------------------------------------------------
+# Compilation
+# ---------------------------------------------------------------------
+class CompiledPlan:
+    """
+    A plan resolved for every date of start_date..end_date:
+
+    import_rate, export_rate   (days, 24) $/kWh
+    export_band                (days, 24) index into export_labels (-1: no FIT)
+    credit_mask                (credits, days, 24) hours checked per credit
+    demand_mask                (days, 24) hours counted for demand
+    """
+
+    def __init__(self, plan, start_date, end_date):
+        self.plan = plan
+        self.name = plan.get("name")
+        self.start_date = start_date
+        self.n_days = (end_date - start_date).days + 1
+        self.days = [start_date + timedelta(days=i) for i in range(self.n_days)]
+
+        export_rules = plan.get("export", [])
+        self.export_labels = list(dict.fromkeys(
+            r.get("label", DEFAULT_EXPORT_LABEL) for r in export_rules))
+        caps = {}
+        for rule in export_rules:
+            if rule.get("daily_cap_kwh") is not None:
+                caps[rule.get("label", DEFAULT_EXPORT_LABEL)] = rule["daily_cap_kwh"]
+        self.band_caps = np.array([caps.get(label, np.inf) for label in self.export_labels],
+                                  dtype=np.float64)
+        self.credits = plan.get("credits", [])
+        self.demand = plan.get("demand")
+        self.supply_charge = plan.get("supply_charge", 0.0)
+
+        # Tables are resolved once per day type (weekday x holiday) and
+        # gathered per date, so a year costs at most 14 resolutions
+        holidays = {date.fromisoformat(d) for d in plan.get("holidays", [])}
+        keys = [(d.weekday(), d in holidays) for d in self.days]
+        kinds = list(dict.fromkeys(keys))
+        tables = [self._resolve(*kind) for kind in kinds]
+        index = np.array([kinds.index(k) for k in keys], dtype=np.intp)
+
+        def gather(i, axis=0):
+            return np.take(np.stack([t[i] for t in tables], axis=axis), index, axis=axis)
+
+        self.import_rate = gather(0)
+        self.export_rate = gather(1)
+        self.export_band = gather(2)
+        self.credit_mask = gather(3, axis=1)
+        self.demand_mask = gather(4)
+
+        # First day of each calendar month in the range (demand billing)
+        months = np.array([d.year * 12 + d.month for d in self.days])
+        self.month_starts = np.flatnonzero(np.diff(months, prepend=-1))
+
+    def _resolve(self, weekday, holiday):
+        tags = _day_tags(weekday, holiday)
+        plan = self.plan
+
+        import_rate = np.zeros(HOURS)
+        for rule in plan.get("import", []):
+            if _applies(rule, tags):
+                import_rate[_hour_mask(rule)] = rule["rate"]
+
+        export_rate = np.zeros(HOURS)
+        export_band = np.full(HOURS, -1, dtype=np.intp)
+        for rule in plan.get("export", []):
+            if _applies(rule, tags):
+                mask = _hour_mask(rule)
+                export_rate[mask] = rule["rate"]
+                export_band[mask] = self.export_labels.index(rule.get("label", DEFAULT_EXPORT_LABEL))
+
+        credit_mask = np.array([_hour_mask(c) & _applies(c, tags) for c in self.credits],
+                               dtype=bool).reshape(len(self.credits), HOURS)
+
+        demand_mask = np.zeros(HOURS, dtype=bool)
+        if self.demand is not None and _applies(self.demand, tags):
+            demand_mask = _hour_mask(self.demand)
+
+        return import_rate, export_rate, export_band, credit_mask, demand_mask
+
+
+def compile_plan(plan, start_date, end_date):
+    return CompiledPlan(plan, start_date, end_date)
+
+
+# ---------------------------------------------------------------------
+# Evaluation
+# ---------------------------------------------------------------------
+def hourly_matrix(buckets):
+    """
+    (counts, hourly_export, hourly_import) arrays of shape (days,) and
+    (days, 24) from storage.hourly_energy_range()-style buckets
+    """
+    counts = np.array([b[0] for b in buckets], dtype=np.int64)
+    export_kwh = np.zeros((len(buckets), HOURS))
+    import_kwh = np.zeros((len(buckets), HOURS))
+    for i, (_, hourly_export, hourly_import) in enumerate(buckets):
+        for hour, kwh in hourly_export.items():
+            export_kwh[i, hour] = kwh
+        for hour, kwh in hourly_import.items():
+            import_kwh[i, hour] = kwh
+    return counts, export_kwh, import_kwh
+
+
+def completed_hours(start_date, n_days, now):
+    """(days, 24) bool mask, False for the hours of today that have not ended yet"""
+    mask = np.ones((n_days, HOURS), dtype=bool)
+    today_index = (now.date() - start_date).days
+    if 0 <= today_index < n_days:
+        mask[today_index, now.hour:] = False
+    return mask
+
+
+def evaluate(compiled, hourly_import, hourly_export, hour_mask=None):
+    """
+    Price (days, 24) hourly import/export kWh with a compiled plan.
+
+    hour_mask: optional (days, 24) bool, False for hours to leave out
+    (e.g. the rest of today); a credit whose window is not fully inside
+    the mask is not paid. Returns per-day arrays:
+
+        import_kwh, export_kwh, import_cost, supply_charge, demand_kw,
+        demand_charge, export_earnings, credit_total, net_cost
+        bands:   {label: {"kwh", "credited_kwh", "earnings"}}
+        credits: {label: {"qualified", "amount"}}
+
+    net_cost = import_cost + supply_charge + demand_charge
+               - export_earnings - credit_total
+    """
+    imp = np.asarray(hourly_import, dtype=np.float64)
+    exp = np.asarray(hourly_export, dtype=np.float64)
+    if hour_mask is not None:
+        imp = np.where(hour_mask, imp, 0.0)
+        exp = np.where(hour_mask, exp, 0.0)
+    n_days = compiled.n_days
+
+    import_cost = np.einsum("dh,dh->d", imp, compiled.import_rate)
+
+    # Feed-in per label; capped labels are credited pro rata up to the cap
+    bands = {}
+    export_earnings = np.zeros(n_days)
+    raw_earnings = exp * compiled.export_rate
+    for b, label in enumerate(compiled.export_labels):
+        in_band = compiled.export_band == b
+        kwh = np.where(in_band, exp, 0.0).sum(axis=1)
+        earnings = np.where(in_band, raw_earnings, 0.0).sum(axis=1)
+        credited = kwh
+        cap = compiled.band_caps[b]
+        if np.isfinite(cap):
+            credited = np.minimum(kwh, cap)
+            ratio = np.divide(credited, kwh, out=np.zeros(n_days), where=kwh > 0)
+            earnings = earnings * ratio
+        bands[label] = {"kwh": kwh, "credited_kwh": credited, "earnings": earnings}
+        export_earnings += earnings
+
+    credits = {}
+    credit_total = np.zeros(n_days)
+    for k, credit in enumerate(compiled.credits):
+        mask = compiled.credit_mask[k]
+        threshold = credit.get("max_import_kwh", 0.0)
+        qualified = mask.any(axis=1) & ~((imp > threshold) & mask).any(axis=1)
+        if hour_mask is not None:
+            qualified &= ~(mask & ~hour_mask).any(axis=1)
+        amount = np.where(qualified, credit["amount"], 0.0)
+        label = credit.get("label", f"credit_{k}")
+        credits[label] = {"qualified": qualified, "amount": amount}
+        credit_total += amount
+
+    demand_kw = np.zeros(n_days)
+    demand_charge = np.zeros(n_days)
+    if compiled.demand is not None and n_days:
+        daily_peak = np.where(compiled.demand_mask, imp, 0.0).max(axis=1)
+        monthly_peak = np.maximum.reduceat(daily_peak, compiled.month_starts)
+        demand_kw = np.repeat(monthly_peak, np.diff(np.append(compiled.month_starts, n_days)))
+        demand_charge = demand_kw * compiled.demand["rate"]
+
+    supply_charge = np.full(n_days, float(compiled.supply_charge))
+
+    return {
+        "import_kwh": imp.sum(axis=1),
+        "export_kwh": exp.sum(axis=1),
+        "import_cost": import_cost,
+        "supply_charge": supply_charge,
+        "demand_kw": demand_kw,
+        "demand_charge": demand_charge,
+        "export_earnings": export_earnings,
+        "bands": bands,
+        "credits": credits,
+        "credit_total": credit_total,
+        "net_cost": import_cost + supply_charge + demand_charge - export_earnings - credit_total,
+    }
+
+
+# ---------------------------------------------------------------------
+# Plan comparison
+# ---------------------------------------------------------------------
+SUMMARY_FIELDS = ("import_kwh", "export_kwh", "import_cost", "supply_charge",
+                  "demand_charge", "export_earnings", "credit_total", "net_cost")
+
+
+def _summary(priced, days, select=slice(None)):
+    row = {field: round(float(priced[field][select].sum()), 4) for field in SUMMARY_FIELDS}
+    row["days"] = int(days[select].sum())
+    row["credit_days"] = {label: int(c["qualified"][select].sum())
+                          for label, c in priced["credits"].items()}
+    return row
+
+
+def compare(plans, start_date, counts, hourly_export, hourly_import, hour_mask=None):
+    """
+    Price the same hourly import/export history with every plan.
+
+    plans:  {name: plan}
+    counts: data points per day; days with fewer than 2 samples have no
+            integrated energy and are left out (no supply charge or credit)
+
+    Returns [{"name", "label", "totals", "monthly": [...]}, ...] cheapest
+    (lowest net_cost) first.
+    """
+    n_days = len(counts)
+    end_date = start_date + timedelta(days=n_days - 1)
+    has_data = np.asarray(counts) >= 2
+    if hour_mask is None:
+        hour_mask = np.ones((n_days, HOURS), dtype=bool)
+    hour_mask = hour_mask & has_data[:, None]
+
+    results = []
+    for name, plan in plans.items():
+        compiled = compile_plan(plan, start_date, end_date)
+        priced = evaluate(compiled, hourly_import, hourly_export, hour_mask)
+        for field in ("supply_charge", "demand_charge", "credit_total", "net_cost"):
+            priced[field] = np.where(has_data, priced[field], 0.0)
+        for credit in priced["credits"].values():
+            credit["qualified"] &= has_data
+        priced["net_cost"] = (priced["import_cost"] + priced["supply_charge"] + priced["demand_charge"]
+                              - priced["export_earnings"] - priced["credit_total"])
+
+        bounds = np.append(compiled.month_starts, n_days)
+        monthly = []
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            row = _summary(priced, has_data, slice(lo, hi))
+            row["month"] = compiled.days[lo].strftime("%Y-%m")
+            monthly.append(row)
+
+        results.append({
+            "name": name,
+            "label": plan.get("name", name),
+            "totals": _summary(priced, has_data),
+            "monthly": monthly,
+        })
+
+    results.sort(key=lambda r: r["totals"]["net_cost"])
+    return results
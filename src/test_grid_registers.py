@@ -12,6 +12,8 @@ import argparse
 from pymodbus.client import ModbusTcpClient
 from pymodbus.exceptions import ModbusIOException, ConnectionException
 
+from register_map import SPH_REGISTERS, POLL_REGISTERS
+
 # 默认配置
 DEFAULT_IP = "192.168.9.242"
 DEFAULT_PORT = 502
@@ -95,6 +97,10 @@ def run_monitor_mode(args):
     
     client = ModbusTcpClient(args.ip, port=args.port)
     client.connect()
+    poll_plan = SPH_REGISTERS.plan(POLL_REGISTERS)
+    
+    def read_block(addr, count):
+        return robust_read_input_registers(client, addr, count, args.unit)
     
     # 创建 CSV 日志文件
     log_filename = f"grid_monitor_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
@@ -139,10 +145,11 @@ def run_monitor_mode(args):
             now = datetime.now()
             time_str = now.strftime("%H:%M:%S")
             
-            # 读取基础数据
-            pv_raw = read_u32(client, 1, args.unit)
-            load_raw = read_s32(client, 1037, args.unit)
-            soc_bms = read_u16(client, 1086, args.unit)
+            # 读取基础数据 (register_map 中定义的轮询寄存器, 原始值)
+            base = poll_plan.read(read_block, scaled=False)
+            pv_raw = base["pv_power"]
+            load_raw = base["load_power"]
+            soc_bms = base["soc_bms"]
             
             # 读取 1021 的原始寄存器值 (两个 16 位)
             regs_1021 = robust_read_input_registers(client, 1021, 2, args.unit)
@@ -184,7 +191,7 @@ def run_monitor_mode(args):
             
             # 当前代码计算的 grid_import
             if r1029_s32 is not None:
-                grid_kw = r1029_s32 / 10.0 / 1000.0
+                grid_kw = r1029_s32 * SPH_REGISTERS["grid_power"].scale / 1000.0
                 current_import = max(-grid_kw, 0)
                 current_import_str = f"{current_import:.3f}"
             else:
@@ -280,21 +287,27 @@ def main():
     print("【1】当前 api_server.py 使用的寄存器:")
     print("-" * 60)
     
-    pv_raw = read_u32(client, 1, args.unit)
-    grid_raw = read_s32(client, 1029, args.unit)
-    load_raw = read_s32(client, 1037, args.unit)
-    soc_inv = read_u16(client, 1014, args.unit)
-    soc_bms = read_u16(client, 1086, args.unit)
-
-    print(f"  寄存器 1     (PV power):     {format_power(pv_raw)}")
-    print(f"  寄存器 1029  (Grid, s32):    {format_power(grid_raw)}")
-    print(f"  寄存器 1037  (Load, s32):    {format_power(load_raw)}")
-    print(f"  寄存器 1014  (SOC inv):      {soc_inv}%")
-    print(f"  寄存器 1086  (SOC BMS):      {soc_bms}%")
+    poll_plan = SPH_REGISTERS.plan(POLL_REGISTERS)
+    base = poll_plan.read(
+        lambda addr, count: robust_read_input_registers(client, addr, count, args.unit),
+        scaled=False,
+    )
+    print(f"  读取计划: {poll_plan.describe()}")
+    for name in POLL_REGISTERS:
+        reg = SPH_REGISTERS[name]
+        raw = base[name]
+        label = f"寄存器 {reg.addr:<5d} ({name}, {reg.kind}):"
+        if reg.unit == "W":
+            print(f"  {label:<42} {format_power(raw)}")
+        else:
+            scaled = None if raw is None else raw * reg.scale
+            print(f"  {label:<42} {scaled}{reg.unit}")
+    
+    grid_raw = base["grid_power"]
     
     # 计算当前代码的 grid import/export
     if grid_raw is not None:
-        grid_kw = grid_raw / 10.0 / 1000.0
+        grid_kw = grid_raw * SPH_REGISTERS["grid_power"].scale / 1000.0
         grid_export = max(grid_kw, 0)
         grid_import = max(-grid_kw, 0)
         print()
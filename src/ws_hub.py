@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+WebSocket hub for /api/ws: topic subscriptions with delta encoding.
+
+The poller publishes the state it writes (record_sample()) per topic:
+"current", "soc", "earnings", "fleet" and "device:<id>". Each publish
+bumps the topic's version. Clients subscribe to topics and, instead of
+the whole snapshot, receive only the fields that changed since the last
+version they acknowledged.
+
+Client -> server (JSON text messages):
+
+    {"subscribe": ["current", "earnings"]}    full snapshot now, deltas after
+    {"unsubscribe": ["earnings"]}
+    {"ack": {"current": 42}}                  version applied by the client
+
+Server -> client:
+
+    {"t": "current", "v": 42, "s": {...}}               full snapshot
+    {"t": "current", "v": 43, "b": 42, "d": {...}}      delta against version b
+    {"t": "current", "v": 43, "b": 42, "d": {...}, "r": ["key"]}   keys removed
+    {"error": "..."}
+
+A delta holds the top-level fields whose value differs from version b
+(nested objects are sent whole). Clients keep the snapshots they have
+not seen acknowledged yet; a client missing version b re-subscribes to
+the topic to get a full snapshot. Subscribing to a topic again always
+sends a full snapshot.
+
+Fan-out: every connection waits on its own event, publish() sets them
+all. A delta is encoded once per (topic, base version) and shared by all
+clients with that base, which for clients that keep up is all of them.
+"""
+
+import json
+from collections import deque
+from threading import Event, Lock, Thread
+
+
+HISTORY_VERSIONS = 16     # versions per topic kept as delta bases
+
+
+def encode(message):
+    return json.dumps(message, separators=(",", ":"))
+
+
+def delta(base, state):
+    """(changed fields, removed keys) turning base into state"""
+    changed = {k: v for k, v in state.items() if k not in base or base[k] != v}
+    removed = [k for k in base if k not in state]
+    return changed, removed
+
+
+class Topic:
+    """Recent versions of one topic's state"""
+
+    def __init__(self, history=HISTORY_VERSIONS):
+        self.version = 0
+        self.states = deque(maxlen=history)   # (version, state)
+        self.encoded = {}                     # base version (None = full) -> message
+
+    def publish(self, state):
+        self.version += 1
+        self.states.append((self.version, state))
+        self.encoded = {}
+
+    def state(self, version):
+        first = self.states[0][0] if self.states else 0
+        if version is None or not first <= version <= self.version:
+            return None
+        return self.states[version - first][1]
+
+    def message(self, name, base):
+        """Latest version as a delta against base (or full when base is unknown)"""
+        if base not in self.encoded:
+            state = self.states[-1][1]
+            base_state = self.state(base)
+            if base_state is None:
+                self.encoded[base] = encode({"t": name, "v": self.version, "s": state})
+            else:
+                changed, removed = delta(base_state, state)
+                message = {"t": name, "v": self.version, "b": base, "d": changed}
+                if removed:
+                    message["r"] = removed
+                self.encoded[base] = encode(message)
+        return self.encoded[base]
+
+
+class Subscriber:
+    """One connection: per topic the version last sent and last acknowledged"""
+
+    def __init__(self, wake):
+        self.wake = wake          # threading.Event-like, set on publish
+        self.sent = {}            # topic -> version sent (0 = nothing yet)
+        self.acked = {}           # topic -> version acknowledged
+
+
+class Hub:
+    """
+    Topic state shared by all connections.
+
+    valid_topic: callable returning True for valid topic names (e.g.
+    configured device ids), so typos get an error instead of silence.
+    """
+
+    def __init__(self, valid_topic=None):
+        self.valid_topic = valid_topic or (lambda name: True)
+        self._topics = {}
+        self._subscribers = set()
+        self._lock = Lock()
+
+    @property
+    def clients(self):
+        return len(self._subscribers)
+
+    def publish(self, name, state):
+        """Store a new version of a topic and wake every connection"""
+        with self._lock:
+            self._topics.setdefault(name, Topic()).publish(state)
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.wake.set()
+
+    def add(self, subscriber):
+        with self._lock:
+            self._subscribers.add(subscriber)
+
+    def remove(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def handle(self, subscriber, text):
+        """Apply one client message; returns error messages to send"""
+        try:
+            message = json.loads(text)
+            if not isinstance(message, dict):
+                raise ValueError
+        except ValueError:
+            return [encode({"error": "Invalid message"})]
+
+        errors = []
+        with self._lock:
+            for name in message.get("subscribe") or []:
+                if not self.valid_topic(name):
+                    errors.append(encode({"error": f"Unknown topic: {name}"}))
+                    continue
+                subscriber.sent[name] = 0
+                subscriber.acked.pop(name, None)
+            for name in message.get("unsubscribe") or []:
+                subscriber.sent.pop(name, None)
+                subscriber.acked.pop(name, None)
+            for name, version in (message.get("ack") or {}).items():
+                if name in subscriber.sent and isinstance(version, int):
+                    if version <= subscriber.sent[name]:
+                        subscriber.acked[name] = max(version, subscriber.acked.get(name, 0))
+        return errors
+
+    def pending(self, subscriber):
+        """Encoded messages for topics that changed since last sent"""
+        messages = []
+        with self._lock:
+            for name, sent in subscriber.sent.items():
+                topic = self._topics.get(name)
+                if topic is None or topic.version == sent:
+                    continue
+                messages.append(topic.message(name, subscriber.acked.get(name)))
+                subscriber.sent[name] = topic.version
+        return messages
+
+
+def serve(hub, ws):
+    """
+    Run one simple_websocket connection (flask-sock route handler; returns
+    when the client goes away).
+
+    A reader thread blocks in ws.receive() and queues client messages.
+    This thread sleeps on the subscriber's own event, which the reader and
+    publish() set, and is the only one sending, so replies and updates
+    keep their order.
+    """
+    subscriber = Subscriber(Event())
+    inbox = deque()
+    closed = Event()
+
+    def read():
+        try:
+            while True:
+                text = ws.receive(timeout=None)
+                if text is not None:
+                    inbox.append(text)
+                    subscriber.wake.set()
+        except Exception:
+            pass   # ConnectionClosed
+        finally:
+            closed.set()
+            subscriber.wake.set()
+
+    hub.add(subscriber)
+    Thread(target=read, name="ws-reader", daemon=True).start()
+    try:
+        while not closed.is_set():
+            subscriber.wake.wait()
+            subscriber.wake.clear()
+            outgoing = []
+            while inbox:
+                outgoing.extend(hub.handle(subscriber, inbox.popleft()))
+            outgoing.extend(hub.pending(subscriber))
+            for message in outgoing:
+                ws.send(message)
+    finally:
+        hub.remove(subscriber)
@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+"""
+WSGI entry point for the HTTP workers (production serving):
+
+    gunicorn -c src/gunicorn.conf.py wsgi:app
+
+Workers never poll the inverter. They read state from the poller process
+(poller_service.py, started by gunicorn.conf.py) over a Unix socket and
+mirror its live events for /api/stream and /api/ws.
+"""
+
+import os
+
+# Read by api_server on import
+os.environ["GROWATT_ROLE"] = "worker"
+
+import api_server
+
+api_server.follow_poller()
+app = api_server.app